@@ -10,15 +10,39 @@ __version__ = "0.1.0"
 from aggrada.core import (
     index,
     aggregate,
+    aggregate_chunks,
+    aggregate_lattice,
+    aggregate_rolling,
     evaluate_consistency,
     plot
 )
 
+from aggrada.aggregators import (
+    register_boundaries,
+    unregister_boundaries,
+    MaterializedAggregate,
+    set_backend,
+    get_backend
+)
+
+from aggrada.lazy import LazyFrame
+
+from aggrada.utils import (
+    ResultCache,
+    set_cache,
+    get_cache
+)
+
 from aggrada.readers import (
     read_csv,
+    scan_csv,
     read_excel,
     read_shapefile,
-    read_json
+    read_json,
+    read_parquet,
+    to_parquet,
+    DatasetStore,
+    read_many
 )
 
 # Make submodules available for import
@@ -6,5 +6,18 @@ This module provides functions for aggregating data.
 
 from aggrada.aggregators.spatial import aggregate_spatial
 from aggrada.aggregators.temporal import aggregate_temporal
+from aggrada.aggregators.boundaries import register_boundaries, unregister_boundaries
+from aggrada.aggregators.states import aggregate_states
+from aggrada.aggregators.materialized import MaterializedAggregate
+from aggrada.aggregators.backends import set_backend, get_backend
 
-__all__ = ["aggregate_spatial", "aggregate_temporal"]
+__all__ = [
+    "aggregate_spatial",
+    "aggregate_temporal",
+    "register_boundaries",
+    "unregister_boundaries",
+    "aggregate_states",
+    "MaterializedAggregate",
+    "set_backend",
+    "get_backend",
+]
@@ -0,0 +1,339 @@
+"""
+Compute backend module for the Aggrada package.
+
+This module provides the engines that run the non-geometric work of
+aggregation: factorizing group keys, bucketing times into periods and
+reducing columns by group. Geometry stays in GeoPandas and shapely
+whatever the backend.
+"""
+
+import pandas as pd
+from typing import Union, Dict, List, Optional, Tuple, Any
+import numpy as np
+
+
+class PandasBackend:
+    """
+    Default backend, on pandas hash tables and numpy kernels.
+
+    The other backends derive from it and fall back to it for the keys and
+    dtypes their engine does not handle.
+    """
+
+    name = "pandas"
+
+    def factorize(self, key: Any) -> Tuple[np.ndarray, Any]:
+        """
+        Factorize a per-row key into codes in the sorted order of its values.
+
+        Parameters
+        ----------
+        key : array-like
+            Per-row key; missing values get the code -1
+
+        Returns
+        -------
+        codes : ndarray
+            Code of every row
+        uniques : array-like
+            Key value of every code
+        """
+        return pd.factorize(key, sort=True)
+
+    def period_codes(self, values: np.ndarray, granularity: str) -> np.ndarray:
+        """
+        Convert datetime64 values into int64 period codes.
+
+        Parameters
+        ----------
+        values : ndarray
+            Naive datetime64 values; codes of NaT values are undefined
+        granularity : str
+            Temporal granularity level ("year", "quarter", "month", "week", "day", "hour")
+
+        Returns
+        -------
+        ndarray
+            Period code of every value, matching pandas Period ordinals
+        """
+        from aggrada.aggregators.temporal import _datetime_period_codes
+        return _datetime_period_codes(values, granularity)
+
+    def reduce(
+        self,
+        columns: Dict[str, np.ndarray],
+        agg_functions: Dict[str, str],
+        codes: np.ndarray,
+        n_groups: int
+    ) -> Dict[str, np.ndarray]:
+        """
+        Reduce 64-bit numeric columns by group code.
+
+        Parameters
+        ----------
+        columns : dict
+            Values of every column, aligned with ``codes``
+        agg_functions : dict
+            Function of every column: "sum", "mean", "count", "min", "max",
+            "std" or "var"
+        codes : ndarray
+            Group code of every row, all valid
+        n_groups : int
+            Number of groups
+
+        Returns
+        -------
+        dict
+            Reduced values of every column, one per group code. Results follow
+            pandas groupby: sums, min and max of integers stay integers,
+            missing values are skipped and groups without values are NaN.
+        """
+        from aggrada.aggregators.groupby import _GroupReducer
+        groups = _GroupReducer(codes, n_groups)
+        return {col: groups.reduce(values, agg_functions[col]) for col, values in columns.items()}
+
+
+# Arrow names of the sample standard deviation and variance
+_ARROW_VARIANCES = {"std": "stddev", "var": "variance"}
+
+
+class ArrowBackend(PandasBackend):
+    """
+    Backend on the multithreaded PyArrow compute engine.
+
+    Keys are dictionary-encoded and columns are reduced with the hash
+    aggregation of Acero, which runs on all cores.
+    """
+
+    name = "pyarrow"
+
+    def __init__(self):
+        try:
+            import pyarrow as pa
+            import pyarrow.compute as pc
+        except ImportError:
+            raise ImportError(
+                "The pyarrow backend requires pyarrow. Install it with: pip install aggrada[parquet]"
+            )
+        self.pa, self.pc = pa, pc
+
+    def factorize(self, key: Any) -> Tuple[np.ndarray, Any]:
+        pa, pc = self.pa, self.pc
+        try:
+            array = pa.array(key, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            # Mixed object keys
+            return super().factorize(key)
+        if isinstance(array, pa.ChunkedArray):
+            array = array.combine_chunks()
+
+        encoded = pc.dictionary_encode(array)
+        dictionary = encoded.dictionary
+        rank = np.empty(len(dictionary), dtype=np.int64)
+        rank[pc.array_sort_indices(dictionary).to_numpy()] = np.arange(len(dictionary))
+        indices = pc.fill_null(encoded.indices, -1).to_numpy()
+        codes = np.where(indices >= 0, rank[indices], -1)
+        return codes, _take_uniques(key, codes, len(dictionary))
+
+    def period_codes(self, values: np.ndarray, granularity: str) -> np.ndarray:
+        if granularity not in ["year", "quarter", "month"]:
+            # Days, weeks and hours are integer divisions of the time values
+            return super().period_codes(values, granularity)
+        times = self.pa.array(values, from_pandas=True)
+        years = self.pc.fill_null(self.pc.year(times), 1970).to_numpy()
+        if granularity == "year":
+            return years.astype(np.int64)
+        months = (years - 1970) * 12 + self.pc.fill_null(self.pc.month(times), 1).to_numpy() - 1
+        return months // 3 if granularity == "quarter" else months
+
+    def reduce(
+        self,
+        columns: Dict[str, np.ndarray],
+        agg_functions: Dict[str, str],
+        codes: np.ndarray,
+        n_groups: int
+    ) -> Dict[str, np.ndarray]:
+        pa, pc = self.pa, self.pc
+        # Columns are renamed so that their names cannot clash with the
+        # "<column>_<function>" names of the results
+        names = {col: f"c{i}" for i, col in enumerate(columns)}
+        table = pa.table({
+            "code": codes,
+            **{names[col]: pa.array(values, from_pandas=True) for col, values in columns.items()}
+        })
+        aggregations = []
+        for col, func in agg_functions.items():
+            if func == "sum":
+                options = pc.ScalarAggregateOptions(min_count=0)
+            elif func in _ARROW_VARIANCES:
+                options = pc.VarianceOptions(ddof=1)
+            else:
+                options = None
+            aggregations.append((names[col], _ARROW_VARIANCES.get(func, func), options))
+        reduced = table.group_by("code", use_threads=True).aggregate(aggregations)
+
+        groups = reduced["code"].to_numpy()
+        return {
+            col: _scatter(
+                reduced[f"{names[col]}_{_ARROW_VARIANCES.get(func, func)}"].to_numpy(zero_copy_only=False),
+                groups, n_groups
+            )
+            for col, func in agg_functions.items()
+        }
+
+
+class PolarsBackend(PandasBackend):
+    """
+    Backend on the multithreaded Polars engine.
+    """
+
+    name = "polars"
+
+    def __init__(self):
+        try:
+            import polars as pl
+        except ImportError:
+            raise ImportError(
+                "The polars backend requires polars. Install it with: pip install aggrada[polars]"
+            )
+        self.pl = pl
+
+    def factorize(self, key: Any) -> Tuple[np.ndarray, Any]:
+        pl = self.pl
+        try:
+            series = pl.Series(values=_to_numpy(key), nan_to_null=True)
+        except (TypeError, ValueError, pl.exceptions.PolarsError):
+            series = None
+        if series is None or series.dtype == pl.Object:
+            # Mixed object keys, which polars cannot sort
+            return super().factorize(key)
+        ranks = series.rank("dense").cast(pl.Int64)
+
+        n_uniques = int(ranks.max() or 0)
+        codes = ranks.fill_null(0).to_numpy() - 1
+        return codes, _take_uniques(key, codes, n_uniques)
+
+    def period_codes(self, values: np.ndarray, granularity: str) -> np.ndarray:
+        if granularity not in ["year", "quarter", "month"]:
+            # Days, weeks and hours are integer divisions of the time values
+            return super().period_codes(values, granularity)
+        times = self.pl.Series(values=values)
+        years = times.dt.year().fill_null(1970).to_numpy().astype(np.int64)
+        if granularity == "year":
+            return years
+        months = (years - 1970) * 12 + times.dt.month().fill_null(1).to_numpy().astype(np.int64) - 1
+        return months // 3 if granularity == "quarter" else months
+
+    def reduce(
+        self,
+        columns: Dict[str, np.ndarray],
+        agg_functions: Dict[str, str],
+        codes: np.ndarray,
+        n_groups: int
+    ) -> Dict[str, np.ndarray]:
+        pl = self.pl
+        names = {col: f"c{i}" for i, col in enumerate(columns)}
+        frame = pl.DataFrame({
+            "code": codes,
+            **{names[col]: pl.Series(values=values, nan_to_null=True) for col, values in columns.items()}
+        })
+        expressions = []
+        for col, func in agg_functions.items():
+            expression = getattr(pl.col(names[col]), func)()
+            if func == "count":
+                expression = expression.cast(pl.Int64)
+            expressions.append(expression)
+        reduced = frame.group_by("code").agg(expressions)
+
+        groups = reduced["code"].to_numpy()
+        return {
+            col: _scatter(reduced[names[col]].to_numpy(), groups, n_groups)
+            for col in agg_functions
+        }
+
+
+# Backends by name
+_BACKENDS = {
+    "pandas": PandasBackend,
+    "pyarrow": ArrowBackend,
+    "polars": PolarsBackend,
+}
+
+# Backend in use
+_BACKEND: PandasBackend = PandasBackend()
+
+
+def set_backend(name: str) -> None:
+    """
+    Set the compute backend of aggregation.
+
+    The backend factorizes group keys, buckets times into periods and
+    reduces columns by group. Results do not depend on the backend.
+
+    Parameters
+    ----------
+    name : str
+        Backend name: "pandas" (default), "pyarrow" or "polars"
+
+    Raises
+    ------
+    ValueError
+        If the backend is unknown
+    ImportError
+        If the library of the backend is not installed
+    """
+    global _BACKEND
+    if name.lower() not in _BACKENDS:
+        raise ValueError(f"Unknown backend: {name}. Valid options are: {', '.join(_BACKENDS)}")
+    _BACKEND = _BACKENDS[name.lower()]()
+
+
+def get_backend() -> PandasBackend:
+    """
+    Get the compute backend of aggregation.
+
+    Returns
+    -------
+    PandasBackend
+        The backend in use; its ``name`` attribute is the backend name
+    """
+    return _BACKEND
+
+
+def _to_numpy(key: Any) -> np.ndarray:
+    """
+    Key values as a numpy array, with missing values of nullable keys as None.
+    """
+    if isinstance(key, (pd.Series, pd.Index)):
+        key = key.array
+    if isinstance(key, pd.api.extensions.ExtensionArray):
+        return key.to_numpy(dtype=object, na_value=None) if key.isna().any() else key.to_numpy()
+    return np.asarray(key)
+
+
+def _take_uniques(key: Any, codes: np.ndarray, n_uniques: int) -> Any:
+    """
+    Key value of every code, taken from the first row with that code.
+
+    The values keep the type of the key, as in pandas.factorize.
+    """
+    rows = np.flatnonzero(codes >= 0)
+    first = np.full(n_uniques, len(codes), dtype=np.int64)
+    np.minimum.at(first, codes[rows], rows)
+    if isinstance(key, (pd.Series, pd.Index)):
+        return pd.Index(key.array.take(first))
+    if isinstance(key, pd.api.extensions.ExtensionArray):
+        return key.take(first)
+    return np.asarray(key).take(first)
+
+
+def _scatter(values: np.ndarray, groups: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    Place reduced values at their group codes, NaN for groups without rows.
+    """
+    if len(groups) == n_groups and values.dtype.kind != "O":
+        result = np.empty(n_groups, dtype=values.dtype)
+    else:
+        result = np.full(n_groups, np.nan)
+    result[groups] = values
+    return result
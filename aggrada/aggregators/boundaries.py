@@ -0,0 +1,205 @@
+"""
+Boundary registry module for the Aggrada package.
+
+This module keeps administrative boundary layers and their spatial indexes
+for aggregation by administrative level.
+"""
+
+import pandas as pd
+import geopandas as gpd
+from typing import Union, Dict, List, Optional, Tuple, Any
+import numpy as np
+import shapely
+from pyproj import CRS
+
+
+# Registered boundary layers by administrative level
+_BOUNDARIES: Dict[str, "BoundaryIndex"] = {}
+
+
+class BoundaryIndex:
+    """
+    Boundary layer with a cached spatial index for point-in-polygon lookups.
+
+    The STRtree and the prepared polygons are built on first use and reused
+    by every later lookup. A copy reprojected to the CRS of the queried data
+    is built and cached the first time that CRS is seen.
+
+    Parameters
+    ----------
+    boundaries : GeoDataFrame
+        Boundary polygons
+    id_column : str, optional
+        Column holding the boundary identifiers. Defaults to the index.
+    """
+
+    def __init__(self, boundaries: gpd.GeoDataFrame, id_column: Optional[str] = None):
+        if not isinstance(boundaries, gpd.GeoDataFrame):
+            raise TypeError("Boundaries must be a GeoDataFrame")
+        if id_column is not None and id_column not in boundaries.columns:
+            raise ValueError(f"Missing id column: {id_column}")
+        
+        self.boundaries = boundaries
+        self.ids = boundaries[id_column].to_numpy() if id_column else boundaries.index.to_numpy()
+        self._id_index = pd.Index(self.ids)
+        if not self._id_index.is_unique:
+            raise ValueError("Boundary identifiers must be unique")
+        self.crs = boundaries.crs
+        self._indexes: Dict[Any, Tuple[np.ndarray, shapely.STRtree]] = {}
+
+    def _index_for(self, crs: Any) -> Tuple[np.ndarray, shapely.STRtree]:
+        """
+        Get the prepared polygons and STRtree in the given CRS, building them once.
+        """
+        same_crs = crs is None or self.crs is None or self.crs == crs
+        key = None if same_crs else CRS.from_user_input(crs).to_wkt()
+        if key not in self._indexes:
+            geometry = self.boundaries.geometry
+            if key is not None:
+                geometry = geometry.to_crs(crs)
+            polygons = np.array(geometry.values, dtype=object)
+            shapely.prepare(polygons)
+            self._indexes[key] = (polygons, shapely.STRtree(polygons))
+        return self._indexes[key]
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Spatial indexes are rebuilt on first use after unpickling (e.g. in worker processes)
+        state = self.__dict__.copy()
+        state["_indexes"] = {}
+        return state
+
+    def geometry(self, crs: Any = None) -> np.ndarray:
+        """
+        Get the boundary polygons in the given CRS.
+
+        Parameters
+        ----------
+        crs : optional
+            Target CRS. Defaults to the CRS of the boundaries.
+
+        Returns
+        -------
+        ndarray
+            Boundary polygons in the order of the layer
+        """
+        return self._index_for(crs)[0]
+
+    def positions(self, ids: Any) -> np.ndarray:
+        """
+        Get the position of the boundaries with the given identifiers.
+
+        Parameters
+        ----------
+        ids : array-like
+            Boundary identifiers
+
+        Returns
+        -------
+        ndarray
+            Position of each boundary in the layer
+        """
+        return self._id_index.get_indexer(ids)
+
+    def assign(self, points: np.ndarray, crs: Any = None) -> np.ndarray:
+        """
+        Find the boundary containing each point.
+
+        Candidate boundaries are found with a bounding box query on the
+        STRtree and then tested against the prepared polygons. A point on a
+        shared border is assigned to the first boundary containing it.
+
+        Parameters
+        ----------
+        points : ndarray
+            Point geometries
+        crs : optional
+            CRS of the points. Defaults to the CRS of the boundaries.
+
+        Returns
+        -------
+        ndarray
+            Position of the containing boundary for each point, -1 if none
+        """
+        polygons, tree = self._index_for(crs)
+        
+        # Bounding box pre-filter, then an exact test on prepared polygons
+        point_idx, polygon_idx = tree.query(points)
+        hits = shapely.intersects(polygons[polygon_idx], points[point_idx])
+        point_idx, polygon_idx = point_idx[hits], polygon_idx[hits]
+        
+        # Keep the lowest boundary position per point
+        order = np.lexsort((polygon_idx, point_idx))
+        point_idx, polygon_idx = point_idx[order], polygon_idx[order]
+        first = np.ones(len(point_idx), dtype=bool)
+        first[1:] = point_idx[1:] != point_idx[:-1]
+        
+        positions = np.full(len(points), -1, dtype=np.int64)
+        positions[point_idx[first]] = polygon_idx[first]
+        return positions
+
+
+def register_boundaries(
+    admin_level: str,
+    boundaries: Union[str, gpd.GeoDataFrame],
+    id_column: Optional[str] = None,
+    **kwargs
+) -> BoundaryIndex:
+    """
+    Register a boundary layer for aggregation by an administrative level.
+
+    Parameters
+    ----------
+    admin_level : str
+        Administrative level (e.g., "country", "state", "municipality")
+    boundaries : str or GeoDataFrame
+        Boundary polygons or a path to a file readable by
+        :func:`aggrada.readers.read_shapefile`
+    id_column : str, optional
+        Column holding the boundary identifiers. Defaults to the index.
+    **kwargs
+        Additional arguments to pass to read_shapefile() when reading from a path
+
+    Returns
+    -------
+    BoundaryIndex
+        The registered boundary layer
+    """
+    if isinstance(boundaries, str):
+        from aggrada.readers.shapefile import read_shapefile
+        boundaries = read_shapefile(boundaries, **kwargs)
+    
+    index = BoundaryIndex(boundaries, id_column)
+    _BOUNDARIES[admin_level.lower()] = index
+    return index
+
+
+def unregister_boundaries(admin_level: Optional[str] = None) -> None:
+    """
+    Remove a registered boundary layer, or all of them.
+
+    Parameters
+    ----------
+    admin_level : str, optional
+        Administrative level to remove. If None, all layers are removed.
+    """
+    if admin_level is None:
+        _BOUNDARIES.clear()
+    else:
+        _BOUNDARIES.pop(admin_level.lower(), None)
+
+
+def get_boundaries(admin_level: str) -> Optional[BoundaryIndex]:
+    """
+    Get the boundary layer registered for an administrative level.
+
+    Parameters
+    ----------
+    admin_level : str
+        Administrative level
+
+    Returns
+    -------
+    BoundaryIndex or None
+        The registered boundary layer, or None if there is none
+    """
+    return _BOUNDARIES.get(admin_level.lower())
@@ -0,0 +1,263 @@
+"""
+Group-by engine module for the Aggrada package.
+
+This module provides functions for grouping rows by one or more keys and
+aggregating each group.
+"""
+
+import pandas as pd
+import geopandas as gpd
+from typing import Union, Dict, List, Optional, Tuple, Any
+import numpy as np
+
+from aggrada.aggregators.sketches import parse_quantile, compute_registers, estimate_cardinality
+from aggrada.aggregators.backends import get_backend
+
+
+def factorize_keys(*keys: Any) -> Tuple[np.ndarray, List[Any]]:
+    """
+    Factorize one or more per-row keys into a single int64 group code.
+
+    Each key is factorized on its own and the codes are combined
+    arithmetically, so no composite tuple index is built. Groups are
+    numbered in the sorted order of their key values. Keys are factorized
+    by the backend set with :func:`aggrada.set_backend`.
+
+    Parameters
+    ----------
+    *keys : array-like
+        Per-row group keys of equal length. Missing values (NaN, None, NA)
+        exclude the row from every group.
+
+    Returns
+    -------
+    codes : ndarray
+        Group code of every row, -1 for excluded rows
+    group_keys : list
+        For each key, the key value of every group
+    """
+    if not keys:
+        raise ValueError("At least one key is required")
+    
+    backend = get_backend()
+    codes = None
+    group_keys = []
+    for key in keys:
+        key_codes, uniques = backend.factorize(key)
+        if isinstance(uniques.dtype, pd.api.extensions.ExtensionDtype) and uniques.dtype.kind in "iufb":
+            # Group keys never include missing values, so nullable keys become plain numpy
+            uniques = uniques.to_numpy(dtype=uniques.dtype.numpy_dtype)
+        if codes is None:
+            codes = key_codes.astype(np.int64)
+            group_keys.append(uniques)
+            continue
+        
+        # Combine with the previous codes and renumber the occupied pairs densely
+        n_uniques = max(len(uniques), 1)
+        valid = (codes >= 0) & (key_codes >= 0)
+        combined = codes[valid] * n_uniques + key_codes[valid]
+        dense, pairs = backend.factorize(combined)
+        codes = np.full(len(key_codes), -1, dtype=np.int64)
+        codes[valid] = dense
+        group_keys = [values[pairs // n_uniques] for values in group_keys]
+        group_keys.append(uniques[pairs % n_uniques])
+    
+    return codes, group_keys
+
+
+def aggregate_groups(
+    data: pd.DataFrame,
+    codes: np.ndarray,
+    n_groups: int,
+    agg_functions: Dict[str, str]
+) -> pd.DataFrame:
+    """
+    Aggregate columns by precomputed group codes.
+
+    Parameters
+    ----------
+    data : DataFrame
+        Data to aggregate
+    codes : ndarray
+        Group code of every row as returned by :func:`factorize_keys`
+    n_groups : int
+        Number of groups
+    agg_functions : dict
+        Dictionary mapping column names to aggregation functions. A "size"
+        entry for a column that does not exist yields the group sizes, and
+        quantile functions ("p90", "quantile(0.9)") give exact quantiles.
+        "approx_nunique" estimates distinct counts with HyperLogLog.
+
+    Returns
+    -------
+    DataFrame
+        One row per group code, in code order
+    """
+    valid = codes >= 0
+    all_valid = valid.all()
+    group_codes = codes if all_valid else codes[valid]
+    
+    functions = {
+        col: func for col, func in agg_functions.items()
+        if not (func == "size" and col not in data.columns)
+    }
+    
+    # Standard reductions of numeric columns run on the group codes in the
+    # backend (numpy kernels by default); anything else (strings, nullable
+    # dtypes, "first", ...) is handed to groupby
+    kernel_functions = {
+        col: func for col, func in functions.items()
+        if _is_kernel_function(data[col].dtype, func)
+    }
+    quantiles = {
+        col: parse_quantile(func) for col, func in functions.items()
+        if col not in kernel_functions and parse_quantile(func) is not None
+    }
+    distinct = [col for col, func in functions.items() if func == "approx_nunique"]
+    other_functions = {
+        col: func for col, func in functions.items()
+        if col not in kernel_functions and col not in quantiles and col not in distinct
+    }
+    
+    columns = {}
+    if kernel_functions:
+        values = {col: data[col].to_numpy() for col in kernel_functions}
+        if not all_valid:
+            values = {col: column[valid] for col, column in values.items()}
+        columns.update(get_backend().reduce(values, kernel_functions, group_codes, n_groups))
+    if other_functions:
+        # Only the aggregated columns are handed to groupby
+        frame = pd.DataFrame(data[list(other_functions)])
+        if not all_valid:
+            frame = frame[valid]
+        aggregated = frame.groupby(group_codes).agg(other_functions)
+        aggregated = aggregated.reindex(pd.RangeIndex(n_groups))
+        columns.update({col: aggregated[col].array for col in other_functions})
+    for col, q in quantiles.items():
+        # Exact quantiles, as the rows are all here
+        values = data[col] if all_valid else data[col][valid]
+        quantile = values.groupby(group_codes).quantile(q)
+        columns[col] = quantile.reindex(pd.RangeIndex(n_groups)).to_numpy()
+    for col in distinct:
+        values = data[col] if all_valid else data[col][valid]
+        columns[col] = estimate_cardinality(compute_registers(values, group_codes, n_groups))
+    
+    sizes = None
+    result = {}
+    for col in agg_functions:
+        if col in columns:
+            result[col] = columns[col]
+        else:
+            if sizes is None:
+                sizes = np.bincount(group_codes, minlength=n_groups)
+            result[col] = sizes
+    
+    return pd.DataFrame(result, index=pd.RangeIndex(n_groups))
+
+
+# Aggregation functions computed by the array kernels
+KERNEL_FUNCTIONS = ["sum", "mean", "count", "min", "max", "std", "var"]
+
+# ufunc.at became a fast scatter in numpy 1.25; before that min, max and
+# integer sums are left to groupby
+_FAST_UFUNC_AT = np.lib.NumpyVersion(np.__version__) >= "1.25.0"
+
+
+def _is_kernel_function(dtype: Any, func: str) -> bool:
+    """
+    Whether the kernels reduce a column of a dtype with a function.
+
+    The kernels take 64-bit numpy numbers; narrower dtypes are left to
+    groupby, whose result dtypes depend on the function.
+    """
+    if func not in KERNEL_FUNCTIONS:
+        return False
+    if not (isinstance(dtype, np.dtype) and dtype.kind in "iuf" and dtype.itemsize == 8):
+        return False
+    return _FAST_UFUNC_AT or not (func in ["min", "max"] or (func == "sum" and dtype.kind != "f"))
+
+
+class _GroupReducer:
+    """
+    Column reductions by group code with bincount and ufunc.at scatters.
+
+    Every reduction is a single pass over contiguous column values into
+    per-group accumulators; the rows are never sorted or gathered. Results
+    follow pandas groupby: sums, min and max of integers stay integers,
+    missing values are skipped and groups without values are NaN.
+    """
+
+    def __init__(self, codes: np.ndarray, n_groups: int):
+        self.codes = codes
+        self.n_groups = n_groups
+        self.sizes = np.bincount(codes, minlength=n_groups)
+
+    def reduce(self, values: np.ndarray, func: str) -> np.ndarray:
+        """
+        Reduce the values of the rows, aligned with the codes, by group.
+        """
+        codes, n_groups = self.codes, self.n_groups
+        missing = np.isnan(values) if values.dtype.kind == "f" else None
+        if missing is not None and missing.any():
+            codes, values = codes[~missing], values[~missing]
+            count = np.bincount(codes, minlength=n_groups)
+        else:
+            count = self.sizes
+        
+        occupied = (self.sizes > 0).all()
+        if func == "count":
+            return count if occupied else np.where(self.sizes > 0, count, np.nan)
+        
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if func in ["min", "max"]:
+                reducer = np.minimum if func == "min" else np.maximum
+                if values.dtype.kind == "f":
+                    result = np.full(n_groups, np.inf if func == "min" else -np.inf)
+                else:
+                    info = np.iinfo(values.dtype)
+                    result = np.full(n_groups, info.max if func == "min" else info.min, dtype=values.dtype)
+                reducer.at(result, codes, values)
+                return result if (count > 0).all() else np.where(count > 0, result, np.nan)
+            
+            if func in ["std", "var"]:
+                # Sample variance from the squared deviations from the group
+                # means, which do not cancel like a sum of squares does
+                means = np.bincount(codes, weights=values, minlength=n_groups) / count
+                deviations = values - means[codes]
+                squares = np.bincount(codes, weights=deviations * deviations, minlength=n_groups)
+                variance = np.where(count > 1, squares / (count - 1), np.nan)
+                return np.sqrt(variance) if func == "std" else variance
+            
+            if func == "sum" and values.dtype.kind != "f":
+                # Integer sums stay exact
+                total = np.zeros(n_groups, dtype=values.dtype)
+                np.add.at(total, codes, values)
+                return total if occupied else np.where(self.sizes > 0, total, np.nan)
+            
+            total = np.bincount(codes, weights=values, minlength=n_groups)
+            if func == "sum":
+                return total if occupied else np.where(self.sizes > 0, total, np.nan)
+            return np.where(count > 0, total / count, np.nan)
+
+
+def first_rows(codes: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    Find the position of the first row of every group.
+
+    Parameters
+    ----------
+    codes : ndarray
+        Group code of every row, -1 for excluded rows
+    n_groups : int
+        Number of groups
+
+    Returns
+    -------
+    ndarray
+        Row position of the first row of each group
+    """
+    positions = np.flatnonzero(codes >= 0)
+    first = pd.Series(codes[positions]).drop_duplicates()
+    result = np.empty(n_groups, dtype=np.int64)
+    result[first.to_numpy()] = positions[first.index.to_numpy()]
+    return result
@@ -0,0 +1,342 @@
+"""
+Materialized aggregate module for the Aggrada package.
+
+This module provides an aggregate that is kept up to date by merging the
+states of new batches instead of re-aggregating the whole history.
+"""
+
+import pandas as pd
+import geopandas as gpd
+from typing import Union, Dict, List, Optional, Tuple, Any
+import numpy as np
+
+from aggrada.aggregators.states import (
+    SIZE_STATE,
+    STATE_SEPARATOR,
+    STATE_STATISTICS,
+    SKETCH_STATISTICS,
+    check_mergeable,
+    aggregate_states,
+    finalize_states,
+    state_column,
+)
+from aggrada.aggregators.sketches import merge_sketches
+from aggrada.aggregators.temporal import _temporal_group_labels
+
+
+class MaterializedAggregate:
+    """
+    Aggregate keyed by (spatial group, period) that grows batch by batch.
+
+    Every batch is aggregated on its own into mergeable states, which are
+    merged into the stored states of the groups it touches. Groups the batch
+    does not touch are left alone, so the cost of an update grows with the
+    batch and not with the history.
+
+    Parameters
+    ----------
+    spatial_granularity : str
+        Spatial granularity level, as in :func:`aggrada.aggregate`
+    temporal_granularity : str
+        Temporal granularity level, as in :func:`aggrada.aggregate`
+    agg_functions : dict, optional
+        Dictionary mapping column names to mergeable aggregation functions
+    **kwargs
+        Options for the spatial granularity. Grids need a fixed ``cell_size``
+        or ``hex_size`` so that cells are the same for every batch.
+
+    Examples
+    --------
+    >>> store = MaterializedAggregate("grid", "day", {"value": "mean"}, cell_size=0.01)
+    >>> store.append(first_batch)
+    >>> store.append(second_batch)
+    >>> aggregated = store.result()
+    """
+
+    def __init__(
+        self,
+        spatial_granularity: str,
+        temporal_granularity: str,
+        agg_functions: Dict[str, str] = None,
+        **kwargs
+    ):
+        granularity = spatial_granularity.lower()
+        if granularity in ["grid", "hexgrid"] and kwargs.get("cell_size") is None and kwargs.get("hex_size") is None:
+            raise ValueError(f"A materialized {granularity} aggregate needs a fixed cell_size or hex_size")
+        if agg_functions is None:
+            agg_functions = {}
+        check_mergeable(agg_functions)
+
+        self.spatial_granularity = spatial_granularity
+        self.temporal_granularity = temporal_granularity
+        self.agg_functions = dict(agg_functions)
+        self.options = kwargs
+        self.crs = None
+
+        self._spatial_name = None
+        self._temporal_name = None
+        self._positions = {}
+        self._spatial_keys = []
+        self._temporal_keys = []
+        self._geometry = []
+        self._states = {}
+        # Groups holding a value, for integer min/max states
+        self._seen = {}
+        self._n_groups = 0
+
+    def __len__(self) -> int:
+        return self._n_groups
+
+    def append(self, data: gpd.GeoDataFrame) -> int:
+        """
+        Aggregate a batch of indexed data and merge it into the aggregate.
+
+        Parameters
+        ----------
+        data : GeoDataFrame
+            Indexed data with geometry and temporal_range columns
+
+        Returns
+        -------
+        int
+            Number of groups created or updated
+        """
+        functions = {col: func for col, func in self.agg_functions.items() if col != data.geometry.name}
+        states = aggregate_states(
+            data, self.spatial_granularity, self.temporal_granularity, functions, **self.options
+        )
+        return self.merge(states)
+
+    def merge(self, states: Union[gpd.GeoDataFrame, "MaterializedAggregate"]) -> int:
+        """
+        Merge states into the aggregate.
+
+        Parameters
+        ----------
+        states : GeoDataFrame or MaterializedAggregate
+            States from :func:`aggrada.aggregators.states.aggregate_states`
+            (or :attr:`states`) at the same granularities, or another
+            materialized aggregate
+
+        Returns
+        -------
+        int
+            Number of groups created or updated
+        """
+        if isinstance(states, MaterializedAggregate):
+            states = states.states
+        if len(states) == 0:
+            return 0
+
+        spatial_name, temporal_name = states.columns[0], states.columns[1]
+        columns = [col for col in states.columns[2:] if col != states.geometry.name]
+        if self._spatial_name is None:
+            self._spatial_name, self._temporal_name = spatial_name, temporal_name
+            self.crs = states.crs
+            for col in columns:
+                self._states[col] = np.empty(0, dtype=_state_dtype(col, states))
+                if _how(col) in ["min", "max"] and self._states[col].dtype.kind == "i":
+                    self._seen[col] = np.empty(0, dtype=bool)
+        elif (spatial_name, temporal_name) != (self._spatial_name, self._temporal_name) or set(columns) != set(self._states):
+            raise ValueError("States do not match the granularities and functions of this aggregate")
+
+        # Find the stored position of every group, adding the new ones at the end
+        positions = np.empty(len(states), dtype=np.int64)
+        geometry = np.asarray(states.geometry.values)
+        keys = zip(states[spatial_name].tolist(), states[temporal_name].tolist())
+        start = self._n_groups
+        for i, key in enumerate(keys):
+            position = self._positions.get(key)
+            if position is None:
+                position = self._n_groups
+                self._positions[key] = position
+                self._spatial_keys.append(key[0])
+                self._temporal_keys.append(key[1])
+                self._geometry.append(geometry[i])
+                self._n_groups += 1
+            positions[i] = position
+        if self._n_groups > start:
+            self._grow(self._n_groups)
+
+        # Merge the states of the touched groups only
+        for col in columns:
+            how = _how(col)
+            if self._states[col].dtype.kind == "i" and _state_dtype(col, states) == float:
+                # The column holds floats in this batch
+                self._to_float(col)
+            elif self._states[col].dtype.kind == "f" and _state_dtype(col, states) == object:
+                # The column holds values other than numbers in this batch
+                self._states[col] = self._states[col].astype(object)
+            stored = self._states[col]
+            if stored.dtype.kind == "O" and how in ["min", "max"]:
+                _merge_object_extremes(how, stored, positions, states[col].to_numpy(dtype=object))
+                continue
+            if how in SKETCH_STATISTICS:
+                # Every state row is a distinct group, so positions are unique
+                n = len(positions)
+                sketches = np.concatenate([stored[positions], states[col].to_numpy(dtype=object)])
+                stored[positions] = merge_sketches(how, sketches, np.tile(np.arange(n), 2), n)
+                continue
+            if col in self._seen:
+                # Integer states keep every digit; missing values take the identity
+                # (min and max come as floats for batches with groups without values)
+                incoming = states[col] if states[col].dtype.kind == "i" else states[col].astype("Int64")
+                present = incoming.notna().to_numpy()
+                values = incoming.to_numpy(dtype=np.int64, na_value=_identity(how, np.int64))
+                # Every state row is a distinct group, so positions are unique
+                self._seen[col][positions] |= present
+            else:
+                values = states[col].to_numpy(dtype=stored.dtype, na_value=np.nan if stored.dtype.kind == "f" else 0)
+            if how == "min":
+                np.fmin.at(stored, positions, values)
+            elif how == "max":
+                np.fmax.at(stored, positions, values)
+            else:
+                np.add.at(stored, positions, values)
+
+        return len(np.unique(positions))
+
+    @property
+    def states(self) -> gpd.GeoDataFrame:
+        """
+        Stored states, one row per group, in the layout of ``aggregate_states``.
+        """
+        n = self._n_groups
+        result = pd.DataFrame({col: values[:n] for col, values in self._states.items()})
+        for col, seen in self._seen.items():
+            if not seen[:n].all():
+                result[col] = pd.arrays.IntegerArray(self._states[col][:n].copy(), ~seen[:n])
+        if self._spatial_name is not None:
+            result.insert(0, self._spatial_name, pd.array(self._spatial_keys))
+            result.insert(1, self._temporal_name, pd.array(self._temporal_keys))
+        result["geometry"] = np.array(self._geometry, dtype=object)
+        return gpd.GeoDataFrame(result, geometry="geometry", crs=self.crs)
+
+    def result(self) -> gpd.GeoDataFrame:
+        """
+        Compute the aggregated data from the stored states.
+
+        Returns
+        -------
+        GeoDataFrame
+            Aggregated data in the layout returned by :func:`aggrada.aggregate`
+        """
+        states = self.states
+        if self._spatial_name is None:
+            return states
+
+        order = np.lexsort((
+            pd.factorize(states[self._temporal_name], sort=True)[0],
+            pd.factorize(states[self._spatial_name], sort=True)[0],
+        ))
+        states = states.take(order).reset_index(drop=True)
+
+        result = finalize_states(states, {
+            col: func for col, func in self.agg_functions.items() if col != "geometry"
+        })
+        temporal = states[self._temporal_name]
+        if self._temporal_name == "temporal_group":
+            temporal = _temporal_group_labels(temporal.to_numpy(), self.temporal_granularity)
+        result.insert(0, self._spatial_name, states[self._spatial_name].to_numpy())
+        result.insert(1, self._temporal_name, temporal)
+        result["geometry"] = states.geometry.values
+        return gpd.GeoDataFrame(result, geometry="geometry", crs=self.crs)
+
+    def _grow(self, n_groups: int) -> None:
+        """
+        Make room for new groups, doubling the state arrays when full.
+        """
+        for col, values in self._states.items():
+            if len(values) >= n_groups:
+                continue
+            grown = np.empty(max(n_groups, 2 * len(values)), dtype=values.dtype)
+            grown[:len(values)] = values
+            # New groups start from the identity of their merge function;
+            # missing sketches are empty
+            how = _how(col)
+            grown[len(values):] = None if how in SKETCH_STATISTICS else _identity(how, values.dtype)
+            self._states[col] = grown
+            if col in self._seen:
+                seen = np.zeros(len(grown), dtype=bool)
+                seen[:len(values)] = self._seen[col]
+                self._seen[col] = seen
+
+    def _to_float(self, col: str) -> None:
+        """
+        Convert the integer states of a column to floats, with NaN for groups without values.
+        """
+        values = self._states[col].astype(float)
+        seen = self._seen.pop(col, None)
+        if seen is not None:
+            values[~seen[:len(values)]] = np.nan
+        self._states[col] = values
+
+
+def _how(column: str) -> str:
+    """
+    Merge function of a state column.
+    """
+    return STATE_STATISTICS.get(column.rsplit(STATE_SEPARATOR, 1)[-1], "sum")
+
+
+def _identity(how: str, dtype: np.dtype) -> Any:
+    """
+    Identity of a merge function: NaN for float min/max, the extreme values for integers, 0 for sums.
+    """
+    if how not in ["min", "max"]:
+        return 0
+    if np.dtype(dtype).kind != "i":
+        return np.nan
+    info = np.iinfo(dtype)
+    return info.max if how == "min" else info.min
+
+
+def _state_dtype(column: str, states: pd.DataFrame) -> Any:
+    """
+    Storage dtype of a state column: object for sketches and for the minima
+    and maxima of non-numeric columns, int64 for counts and for the sums,
+    minima and maxima of integer columns, float otherwise.
+
+    A column is integer when its sum state is: its min and max states are
+    floats as soon as a group has no values.
+    """
+    if _is_sketch_state(column):
+        return object
+    if _is_count_state(column):
+        return np.int64
+    base, statistic = column.rsplit(STATE_SEPARATOR, 1)
+    if statistic in ["sum", "min", "max"] and states[state_column(base, "sum")].dtype.kind in "iu":
+        return np.int64
+    if statistic in ["min", "max"] and not pd.api.types.is_numeric_dtype(states[column].dtype):
+        # Minima and maxima of strings and other comparable values
+        return object
+    return float
+
+
+def _merge_object_extremes(how: str, stored: np.ndarray, positions: np.ndarray, values: np.ndarray) -> None:
+    """
+    Merge minima or maxima of non-numeric values into the stored ones, skipping missing values.
+
+    Every state row is a distinct group, so positions are unique.
+    """
+    current = stored[positions]
+    current_missing, missing = pd.isna(current), pd.isna(values)
+    both = ~current_missing & ~missing
+    better = np.zeros(len(values), dtype=bool)
+    better[both] = values[both] < current[both] if how == "min" else values[both] > current[both]
+    replace = better | (current_missing & ~missing)
+    stored[positions[replace]] = values[replace]
+
+
+def _is_sketch_state(column: str) -> bool:
+    """
+    Check whether a state column holds sketches (digests or registers).
+    """
+    return column.rsplit(STATE_SEPARATOR, 1)[-1] in SKETCH_STATISTICS
+
+
+def _is_count_state(column: str) -> bool:
+    """
+    Check whether a state column holds counts.
+    """
+    return column == SIZE_STATE or column.endswith(STATE_SEPARATOR + "count")
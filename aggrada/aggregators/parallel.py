@@ -0,0 +1,271 @@
+"""
+Parallel aggregation module for the Aggrada package.
+
+This module provides functions for aggregating data in a pool of worker
+processes, each computing mergeable states for a partition of the rows.
+"""
+
+import os
+import hashlib
+import pandas as pd
+import geopandas as gpd
+from typing import Union, Dict, List, Optional, Tuple, Any
+import numpy as np
+import shapely
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+from aggrada.aggregators.spatial import (
+    ADMIN_LEVELS,
+    _registered_boundaries,
+    _representative_coordinates,
+    _grid_spec,
+    _assign_grid_cells,
+    _grid_cell_polygons,
+    _hex_spec,
+    _assign_hex_cells,
+    _hex_cell_polygons,
+)
+from aggrada.aggregators.boundaries import BoundaryIndex
+from aggrada.aggregators.temporal import assign_temporal_groups
+from aggrada.aggregators.groupby import factorize_keys, first_rows
+from aggrada.aggregators.states import (
+    check_mergeable,
+    state_columns,
+    sketch_columns,
+    compute_states,
+    merge_states,
+    finalize_states,
+)
+
+
+# Column of the partial states holding the first row of each group
+_FIRST_ROW = "__first_row"
+
+# Boundary layers of a worker process, by token, with their spatial index
+# built on first use
+_WORKER_BOUNDARIES: Dict[str, BoundaryIndex] = {}
+
+
+def aggregate_parallel(
+    data: gpd.GeoDataFrame,
+    spatial_granularity: str,
+    temporal_granularity: str,
+    agg_functions: Dict[str, str] = None,
+    n_jobs: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    **kwargs
+) -> gpd.GeoDataFrame:
+    """
+    Aggregate data with cell assignment and partial aggregation in worker processes.
+
+    The rows are split into one contiguous partition per job. Workers get
+    coordinate, time and value buffers rather than geometry objects, assign
+    the rows of their partition to groups and return mergeable states, which
+    are merged in the calling process. Boundary layers are reprojected
+    once and sent to every worker of the pool once, as WKB, when it starts;
+    each worker then builds its spatial index once. On a caller-provided
+    executor, every task carries the WKB instead.
+
+    Parameters
+    ----------
+    data : GeoDataFrame
+        Indexed data with geometry and temporal_range columns
+    spatial_granularity : str
+        Spatial granularity level, as in :func:`aggrada.aggregate`
+    temporal_granularity : str
+        Temporal granularity level, as in :func:`aggrada.aggregate`
+    agg_functions : dict, optional
+        Dictionary mapping column names to mergeable aggregation functions
+    n_jobs : int, optional
+        Number of partitions and worker processes; -1 uses all CPUs.
+        Defaults to the number of CPUs.
+    executor : Executor, optional
+        Executor to run the partitions on, e.g. a reused
+        ``ProcessPoolExecutor``. A process pool with ``n_jobs`` workers is
+        created and shut down when not given.
+    **kwargs
+        Options for the spatial granularity (e.g. ``cell_size``)
+
+    Returns
+    -------
+    GeoDataFrame
+        Aggregated data, as returned by :func:`aggrada.aggregate`
+    """
+    if agg_functions is None:
+        agg_functions = {}
+    functions = {col: func for col, func in agg_functions.items() if col != data.geometry.name}
+    check_mergeable(functions)
+    if n_jobs is None or n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    if n_jobs < 1:
+        raise ValueError("n_jobs must be a positive number of jobs or -1")
+
+    # Coordinates are the only geometry the workers need
+    x = y = None
+    if spatial_granularity.lower() != "custom":
+        x, y = _representative_coordinates(data)
+    spatial_name, assigner, geometry_of = _spatial_assigner(data, x, y, spatial_granularity, **kwargs)
+    temporal_name, temporal_keys, labels_of = assign_temporal_groups(data, temporal_granularity)
+    columns = {col: data[col].array for col, func in functions.items() if func != "size"}
+
+    # Boundaries go to the workers once, not with every task
+    task_assigner, initargs = assigner, ()
+    if assigner[0] == "admin":
+        token, wkb = assigner[1]
+        initargs = (token, wkb)
+        if executor is None:
+            task_assigner = ("admin", (token, None))
+
+    # One task per contiguous partition; only plain numpy buffers are sent
+    bounds = np.linspace(0, len(data), n_jobs + 1).astype(np.int64)
+    tasks = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        if stop <= start:
+            continue
+        part = slice(start, stop)
+        tasks.append((
+            None if x is None else x[part],
+            None if y is None else y[part],
+            task_assigner if task_assigner[0] != "keys" else ("keys", task_assigner[1][part]),
+            temporal_keys[part],
+            {col: values[part] for col, values in columns.items()},
+            functions,
+            int(start),
+        ))
+
+    if executor is None:
+        initializer = _load_boundaries if initargs else None
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=initializer, initargs=initargs) as pool:
+            partials = list(pool.map(_partial_states, tasks))
+    else:
+        partials = list(executor.map(_partial_states, tasks))
+
+    # Merge the partial states of groups found in several partitions
+    states = pd.concat(partials, ignore_index=True) if partials else _partial_states(
+        (x, y, assigner, temporal_keys, columns, functions, 0)
+    )
+    spatial_keys = states.pop("spatial")
+    if assigner[0] == "admin":
+        # Workers return boundary positions; groups are keyed by identifier
+        ids = _registered_boundaries(spatial_granularity.lower()).ids
+        spatial_keys = pd.array(ids).take(spatial_keys.to_numpy(dtype=np.int64))
+    codes, (spatial_values, temporal_values) = factorize_keys(spatial_keys, states.pop("temporal"))
+    first = states.pop(_FIRST_ROW).groupby(codes).min().to_numpy()
+    merged = merge_states(states, codes, len(spatial_values))
+
+    result = finalize_states(merged, functions)
+    result.insert(0, spatial_name, spatial_values)
+    result.insert(1, temporal_name, labels_of(temporal_values) if labels_of else temporal_values)
+    if geometry_of is not None:
+        result["geometry"] = geometry_of(spatial_values)
+    else:
+        result["geometry"] = np.asarray(data.geometry.values)[first]
+
+    return gpd.GeoDataFrame(result, geometry="geometry", crs=data.crs)
+
+
+def _spatial_assigner(
+    data: gpd.GeoDataFrame,
+    x: Optional[np.ndarray],
+    y: Optional[np.ndarray],
+    spatial_granularity: str,
+    **kwargs
+) -> Tuple[str, Tuple[str, Any], Any]:
+    """
+    Resolve a spatial granularity into a picklable assignment spec.
+
+    Grids are resolved over the whole data so that every partition uses the
+    same cells.
+
+    Returns
+    -------
+    key_name : str
+        Name of the spatial group column
+    assigner : tuple
+        ``(kind, spec)`` understood by :func:`_assign_partition`
+    geometry_of : callable or None
+        Function building the geometry of given group keys
+    """
+    granularity = spatial_granularity.lower()
+    if granularity in ADMIN_LEVELS:
+        boundaries = _registered_boundaries(granularity)
+        if boundaries is not None:
+            polygons = boundaries.geometry(data.crs)
+
+            def geometry_of(ids):
+                return polygons[boundaries.positions(ids)]
+            # Polygons in the CRS of the data, so that workers do not reproject
+            wkb = shapely.to_wkb(polygons)
+            token = hashlib.blake2b(b"".join(wkb), digest_size=16).hexdigest()
+            return "admin_id", ("admin", (token, wkb)), geometry_of
+        granularity, kwargs = "grid", {}
+
+    if granularity in ["grid", "hexgrid"]:
+        if granularity == "hexgrid":
+            if kwargs.get("cell_size") is not None or kwargs.get("shape") is not None:
+                raise ValueError("Use hex_size to configure a hexgrid; cell_size and shape apply to square grids")
+            grid = _hex_spec(x, y, kwargs.get("hex_size"), kwargs.get("origin"))
+            make_polygons = _hex_cell_polygons
+        else:
+            grid = _grid_spec(x, y, kwargs.get("cell_size"), kwargs.get("shape"), kwargs.get("origin"))
+            make_polygons = _grid_cell_polygons
+
+        def geometry_of(ids):
+            return make_polygons(np.asarray(ids, dtype=np.int64), grid)
+        return "cell_id", (granularity, grid), geometry_of
+
+    if granularity == "custom":
+        if "spatial_group" not in data.columns:
+            raise ValueError("For custom spatial granularity, data must have a 'spatial_group' column")
+        return "spatial_group", ("keys", data["spatial_group"].to_numpy()), None
+
+    raise ValueError(f"Unsupported spatial granularity: {spatial_granularity}")
+
+
+def _assign_partition(
+    x: Optional[np.ndarray],
+    y: Optional[np.ndarray],
+    assigner: Tuple[str, Any]
+) -> Any:
+    """
+    Compute the spatial key of every row of a partition.
+    """
+    kind, spec = assigner
+    if kind == "grid":
+        return _assign_grid_cells(x, y, spec)
+    elif kind == "hexgrid":
+        return _assign_hex_cells(x, y, spec)
+    elif kind == "admin":
+        token, wkb = spec
+        if token not in _WORKER_BOUNDARIES:
+            _load_boundaries(token, wkb)
+        positions = _WORKER_BOUNDARIES[token].assign(shapely.points(x, y))
+        # Points outside every boundary are missing keys
+        return pd.arrays.IntegerArray(positions, positions < 0)
+    return spec
+
+
+def _load_boundaries(token: str, wkb: np.ndarray) -> None:
+    """
+    Load a boundary layer into a worker process (pool initializer).
+    """
+    polygons = gpd.GeoDataFrame(geometry=shapely.from_wkb(wkb))
+    _WORKER_BOUNDARIES[token] = BoundaryIndex(polygons)
+
+
+def _partial_states(task: Tuple) -> pd.DataFrame:
+    """
+    Compute the mergeable states of one partition (runs in a worker process).
+    """
+    x, y, assigner, temporal_keys, columns, functions, offset = task
+    spatial_keys = _assign_partition(x, y, assigner)
+    codes, (spatial_values, temporal_values) = factorize_keys(spatial_keys, temporal_keys)
+    n_groups = len(spatial_values)
+
+    states = compute_states(
+        pd.DataFrame(columns), codes, n_groups, state_columns(functions), sketches=sketch_columns(functions)
+    )
+    states.insert(0, "spatial", spatial_values)
+    states.insert(1, "temporal", temporal_values)
+    states[_FIRST_ROW] = offset + first_rows(codes, n_groups)
+    return states
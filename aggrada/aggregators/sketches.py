@@ -0,0 +1,496 @@
+"""
+Sketch module for the Aggrada package.
+
+This module provides compact mergeable sketches for statistics that cannot
+be merged exactly across partial aggregates: t-digests for quantiles and
+HyperLogLog registers for distinct counts. Sketches of many groups are
+built and merged at once with vectorized numpy operations.
+"""
+
+import re
+import pandas as pd
+from typing import Union, Dict, List, Optional, Tuple, Any
+import numpy as np
+
+
+# Compression of quantile digests: a digest keeps about half as many
+# centroids, and quantile errors shrink as it grows
+DIGEST_COMPRESSION = 200
+
+# HyperLogLog precision: 2 ** precision one-byte registers per group, for a
+# relative standard error of about 1.04 / sqrt(2 ** precision)
+HLL_PRECISION = 12
+
+_PERCENTILE = re.compile(r"^p(\d+(?:\.\d+)?)$")
+_QUANTILE = re.compile(r"^quantile\(\s*(\d*\.?\d+)\s*\)$")
+
+
+def parse_quantile(func: Any) -> Optional[float]:
+    """
+    Read the quantile of a quantile aggregation function.
+
+    Parameters
+    ----------
+    func : str
+        Aggregation function: "p50", "p90", "p99", any other "p<percent>",
+        or "quantile(q)" with ``0 <= q <= 1``
+
+    Returns
+    -------
+    float or None
+        The quantile in [0, 1], or None if ``func`` is not a quantile function
+    """
+    if not isinstance(func, str):
+        return None
+    match = _PERCENTILE.match(func)
+    if match:
+        q = float(match.group(1)) / 100
+    else:
+        match = _QUANTILE.match(func)
+        if not match:
+            return None
+        q = float(match.group(1))
+    return q if 0 <= q <= 1 else None
+
+
+def compute_digests(
+    values: np.ndarray,
+    codes: np.ndarray,
+    n_groups: int,
+    weights: Optional[np.ndarray] = None,
+    compression: int = DIGEST_COMPRESSION
+) -> np.ndarray:
+    """
+    Build a t-digest of the values of every group.
+
+    A digest is a float array of shape (3, k) holding the means, weights
+    and single-value flags of at most about ``compression / 2`` centroids,
+    sorted by mean. A flag is 1 for a centroid of a single value repeated
+    (or weighted) and 0 for a centroid merging distinct values.
+    Centroids are small near the extremes and larger around the median, so
+    tail quantiles such as p99 stay accurate. Groups with a handful of
+    values keep every value as its own centroid, and their quantiles are
+    exact.
+
+    Parameters
+    ----------
+    values : ndarray
+        Value of every row
+    codes : ndarray
+        Group code of every row, -1 for excluded rows
+    n_groups : int
+        Number of groups
+    weights : ndarray, optional
+        Weight of every row; rows without weight are left out
+    compression : int, default 200
+        Compression of the digests
+
+    Returns
+    -------
+    ndarray
+        Object array with the digest of every group
+    """
+    values = np.asarray(values, dtype=float)
+    keep = (codes >= 0) & ~np.isnan(values)
+    if weights is None:
+        weights = np.ones(len(values))
+    else:
+        keep &= weights > 0
+    groups, values, weights = codes[keep], values[keep], np.asarray(weights, dtype=float)[keep]
+
+    order = np.lexsort((values, groups))
+    single = np.ones(len(order))
+    return _split(*_compress(groups[order], values[order], weights[order], single, n_groups, compression), n_groups)
+
+
+def merge_digests(
+    digests: Any,
+    codes: np.ndarray,
+    n_groups: int,
+    compression: int = DIGEST_COMPRESSION
+) -> np.ndarray:
+    """
+    Merge digests that share a group code.
+
+    Parameters
+    ----------
+    digests : array-like
+        Digests as returned by :func:`compute_digests`; missing entries are
+        empty digests
+    codes : ndarray
+        Target group code of every digest, -1 to drop it
+    n_groups : int
+        Number of target groups
+    compression : int, default 200
+        Compression of the merged digests
+
+    Returns
+    -------
+    ndarray
+        Object array with the merged digest of every target group
+    """
+    groups, means, weights, single = _flatten(digests, np.asarray(codes))
+    order = np.lexsort((means, groups))
+    return _split(
+        *_compress(groups[order], means[order], weights[order], single[order], n_groups, compression), n_groups
+    )
+
+
+def digest_quantiles(digests: Any, q: float) -> np.ndarray:
+    """
+    Estimate a quantile from every digest.
+
+    Quantiles interpolate linearly between value ranks as in
+    ``numpy.quantile``. A centroid of a single value stands for its weight
+    in values at that value, so weights act as repeat counts, fractional
+    ones included; a centroid merging distinct values is placed at the
+    center of its ranks. Digests of unweighted values that were not
+    compressed give the same results as ``pandas.Series.quantile``.
+
+    Parameters
+    ----------
+    digests : array-like
+        Digests as returned by :func:`compute_digests`
+    q : float
+        Quantile in [0, 1]
+
+    Returns
+    -------
+    ndarray
+        Quantile of every digest, NaN for empty digests
+    """
+    digests = np.asarray(digests, dtype=object)
+    groups, means, weights, single = _flatten(digests, np.arange(len(digests)))
+    result = np.full(len(digests), np.nan)
+    if not len(groups):
+        return result
+
+    # A centroid covers the value ranks [start, start + weight - 1] of one
+    # cumulative weight axis across all digests. A single value is flat over
+    # them; distinct values merged into a centroid are taken at its center.
+    starts = np.cumsum(weights) - weights
+    flat = single > 0
+    ranks = np.empty(2 * len(weights))
+    ranks[0::2] = np.where(flat, starts, starts + (weights - 1) / 2)
+    ranks[1::2] = np.where(flat, starts + np.maximum(weights - 1, 0), ranks[0::2])
+    values = np.repeat(means, 2)
+
+    sizes = np.bincount(groups, minlength=len(digests))
+    present = np.flatnonzero(sizes)
+    last = np.cumsum(sizes)[present] - 1
+    first = last - sizes[present] + 1
+    totals = starts[last] + weights[last] - starts[first]
+
+    # Rank q * (n - 1) of every digest, as in numpy.quantile
+    target = starts[first] + q * np.maximum(totals - 1, 0)
+    lower = np.clip(np.searchsorted(ranks, target, side="right") - 1, 2 * first, 2 * last + 1)
+    upper = np.minimum(lower + 1, 2 * last + 1)
+    span = ranks[upper] - ranks[lower]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fraction = np.where(span > 0, np.clip((target - ranks[lower]) / span, 0, 1), 0.0)
+    result[present] = values[lower] + fraction * (values[upper] - values[lower])
+    return result
+
+
+def compute_registers(
+    values: Any,
+    codes: np.ndarray,
+    n_groups: int,
+    precision: int = HLL_PRECISION
+) -> np.ndarray:
+    """
+    Build the HyperLogLog registers of the distinct values of every group.
+
+    Every value is hashed to 64 bits; the first ``precision`` bits pick a
+    register, which keeps the highest position of the first set bit seen
+    in the remaining bits. Registers are fixed-size uint8 arrays, so the
+    memory per group does not grow with the number of distinct values.
+
+    Parameters
+    ----------
+    values : array-like
+        Value of every row; missing values are left out
+    codes : ndarray
+        Group code of every row, -1 for excluded rows
+    n_groups : int
+        Number of groups
+    precision : int, default 12
+        Number of index bits: 4096 registers (4 KiB) per group for a
+        relative standard error of 1.6%
+
+    Returns
+    -------
+    ndarray
+        Object array with the registers of every group
+    """
+    values = values if isinstance(values, pd.Series) else pd.Series(values)
+    keep = (codes >= 0) & values.notna().to_numpy()
+    hashes = _hash_values(values[keep].to_numpy())
+    groups = codes[keep]
+
+    # Register index from the top bits, rank from the leading zeros of the rest
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    rest = hashes & np.uint64((1 << (64 - precision)) - 1)
+    rank = (64 - precision) - _bit_length(rest) + 1
+
+    registers = np.zeros((n_groups, 1 << precision), dtype=np.uint8)
+    np.maximum.at(registers.reshape(-1), groups * (1 << precision) + index, rank.astype(np.uint8))
+    return _rows(registers)
+
+
+def merge_registers(registers: Any, codes: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    Merge HyperLogLog registers that share a group code.
+
+    Parameters
+    ----------
+    registers : array-like
+        Registers as returned by :func:`compute_registers`, all of the same
+        precision; missing entries are empty registers
+    codes : ndarray
+        Target group code of every entry, -1 to drop it
+    n_groups : int
+        Number of target groups
+
+    Returns
+    -------
+    ndarray
+        Object array with the merged registers of every target group
+    """
+    codes = np.asarray(codes)
+    present = np.flatnonzero((codes >= 0) & np.array([isinstance(r, np.ndarray) for r in registers], dtype=bool))
+    size = registers[present[0]].shape[0] if len(present) else 1 << HLL_PRECISION
+    merged = np.zeros((n_groups, size), dtype=np.uint8)
+    if len(present):
+        order = present[np.argsort(codes[present], kind="stable")]
+        targets = codes[order]
+        starts = np.flatnonzero(np.r_[True, targets[1:] != targets[:-1]])
+        stacked = np.vstack([registers[i] for i in order])
+        merged[targets[starts]] = np.maximum.reduceat(stacked, starts, axis=0)
+    return _rows(merged)
+
+
+def estimate_cardinality(registers: Any) -> np.ndarray:
+    """
+    Estimate the number of distinct values from every set of registers.
+
+    Uses the improved raw estimator of Ertl (2017), which needs no bias
+    correction tables and stays unbiased from a few to billions of distinct
+    values. The relative standard error is about ``1.04 / sqrt(m)`` for
+    ``m`` registers: 1.6% at the default precision, so 95% of estimates are
+    within 3.3% of the exact count. Estimates are rounded to whole counts,
+    so counts of a handful of values are nearly always exact.
+
+    Parameters
+    ----------
+    registers : array-like
+        Registers as returned by :func:`compute_registers`
+
+    Returns
+    -------
+    ndarray
+        Estimated distinct count of every entry, NaN for missing registers
+    """
+    registers = np.asarray(registers, dtype=object)
+    result = np.full(len(registers), np.nan)
+    present = np.flatnonzero([isinstance(r, np.ndarray) for r in registers])
+    if not len(present):
+        return result
+
+    stacked = np.vstack([registers[i] for i in present]).astype(np.int64)
+    n, m = stacked.shape
+    q = 64 - (m.bit_length() - 1)
+    counts = np.bincount(
+        (np.arange(n)[:, None] * (q + 2) + stacked).ravel(), minlength=n * (q + 2)
+    ).reshape(n, q + 2).astype(float)
+
+    z = m * _tau(1 - counts[:, q + 1] / m)
+    for k in range(q, 0, -1):
+        z = 0.5 * (z + counts[:, k])
+    z = z + m * _sigma(counts[:, 0] / m)
+    with np.errstate(divide="ignore"):
+        result[present] = np.round(m * m / (2 * np.log(2)) / z)
+    return result
+
+
+def merge_sketches(kind: str, sketches: Any, codes: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    Merge sketches of a kind ("digest" or "hll") that share a group code.
+
+    Parameters
+    ----------
+    kind : str
+        "digest" for quantile digests, "hll" for HyperLogLog registers
+    sketches : array-like
+        Sketches of that kind
+    codes : ndarray
+        Target group code of every sketch, -1 to drop it
+    n_groups : int
+        Number of target groups
+
+    Returns
+    -------
+    ndarray
+        Object array with the merged sketch of every target group
+    """
+    if kind == "digest":
+        return merge_digests(sketches, codes, n_groups)
+    if kind == "hll":
+        return merge_registers(np.asarray(sketches, dtype=object), codes, n_groups)
+    raise ValueError(f"Unknown sketch kind: {kind}")
+
+
+def _hash_values(values: np.ndarray) -> np.ndarray:
+    """
+    Hash values to uint64 so that equal values hash alike in every chunk.
+
+    Every value is hashed on its own terms: integral floats, such as
+    integers in a chunk with missing values, hash as integers and other
+    floats as floats, whatever the rest of the chunk holds. Numbers held in
+    object columns hash as the same numbers in numeric columns.
+    """
+    if values.dtype.kind == "O":
+        inferred = pd.api.types.infer_dtype(values, skipna=True)
+        try:
+            if inferred in ["integer", "boolean"]:
+                values = values.astype(np.int64)
+            elif inferred in ["floating", "mixed-integer-float"]:
+                values = values.astype(np.float64)
+        except OverflowError:
+            # Integers beyond 64 bits keep their object hashes
+            pass
+    if values.dtype.kind in "bu":
+        values = values.astype(np.int64)
+    if values.dtype.kind != "f":
+        return pd.util.hash_array(values, categorize=False)
+    
+    values = values.astype(np.float64)
+    integral = (values == np.floor(values)) & (np.abs(values) < 2 ** 63)
+    hashes = pd.util.hash_array(values, categorize=False)
+    if integral.any():
+        hashes[integral] = pd.util.hash_array(values[integral].astype(np.int64), categorize=False)
+    return hashes
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """
+    Number of significant bits of every uint64 value, computed exactly.
+    """
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, np.frexp(high)[1] + 32, np.frexp(low)[1]).astype(np.int64)
+
+
+def _rows(registers: np.ndarray) -> np.ndarray:
+    """
+    Object array holding every row of a 2-d register array.
+    """
+    result = np.empty(len(registers), dtype=object)
+    for i, row in enumerate(registers):
+        result[i] = row
+    return result
+
+
+def _sigma(x: np.ndarray) -> np.ndarray:
+    """
+    The sigma function of the improved HyperLogLog estimator.
+    """
+    result = x.copy()
+    power, y = x.copy(), 1.0
+    for _ in range(64):
+        power = power * power
+        result += power * y
+        y += y
+    return np.where(x == 1, np.inf, result)
+
+
+def _tau(x: np.ndarray) -> np.ndarray:
+    """
+    The tau function of the improved HyperLogLog estimator.
+    """
+    result = 1 - x
+    root, y = x.copy(), 1.0
+    for _ in range(64):
+        root = np.sqrt(root)
+        y *= 0.5
+        result -= (1 - root) ** 2 * y
+    return np.where((x == 0) | (x == 1), 0.0, result / 3)
+
+
+def _compress(
+    groups: np.ndarray,
+    means: np.ndarray,
+    weights: np.ndarray,
+    single: np.ndarray,
+    n_groups: int,
+    compression: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Merge neighbouring centroids of every group, sorted by group and mean.
+
+    Every centroid falls in the unit interval of the arcsine scale function
+    k(q) = compression / (2 pi) * asin(2q - 1) at the quantile of its
+    center; the centroids of an interval are merged into one, which holds a
+    single value if they all hold the same one.
+    """
+    if not len(groups):
+        return groups, means, weights, single
+
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    sizes = np.diff(np.r_[starts, len(groups)])
+    cumulative = np.cumsum(weights)
+    before = cumulative - weights
+    offset = np.repeat(before[starts], sizes)
+    total = np.repeat(cumulative[starts + sizes - 1] - before[starts], sizes)
+
+    quantile = (before - offset + weights / 2) / total
+    scale = np.floor(compression / (2 * np.pi) * np.arcsin(np.clip(2 * quantile - 1, -1, 1)))
+    change = np.r_[True, (groups[1:] != groups[:-1]) | (scale[1:] != scale[:-1])]
+    if change.all():
+        return groups, means, weights, single
+
+    ids = np.cumsum(change) - 1
+    merged_weights = np.bincount(ids, weights=weights)
+    merged_means = np.bincount(ids, weights=weights * means) / merged_weights
+    # Means are sorted within a merge, so its first and last are its extremes
+    first = np.flatnonzero(change)
+    last = np.r_[first[1:], len(groups)] - 1
+    merged_single = (np.minimum.reduceat(single, first) > 0) & (means[first] == means[last])
+    return groups[change], merged_means, merged_weights, merged_single.astype(float)
+
+
+def _split(
+    groups: np.ndarray,
+    means: np.ndarray,
+    weights: np.ndarray,
+    single: np.ndarray,
+    n_groups: int
+) -> np.ndarray:
+    """
+    Split flat centroids sorted by group into one digest per group.
+    """
+    result = np.empty(n_groups, dtype=object)
+    if not n_groups:
+        return result
+    bounds = np.cumsum(np.bincount(groups, minlength=n_groups))[:-1]
+    for i, digest in enumerate(np.split(np.vstack([means, weights, single]), bounds, axis=1)):
+        result[i] = digest
+    return result
+
+
+def _flatten(digests: Any, codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Concatenate digests into flat centroid arrays with the code of each digest.
+    """
+    digests = [
+        digest if isinstance(digest, np.ndarray) and code >= 0 else _EMPTY_DIGEST
+        for digest, code in zip(digests, codes)
+    ]
+    if not digests:
+        return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0), np.zeros(0)
+    sizes = np.fromiter((digest.shape[1] for digest in digests), dtype=np.int64, count=len(digests))
+    centroids = np.hstack(digests)
+    return np.repeat(np.asarray(codes, dtype=np.int64), sizes), centroids[0], centroids[1], centroids[2]
+
+
+_EMPTY_DIGEST = np.zeros((3, 0))
@@ -6,14 +6,23 @@ This module provides functions for spatial aggregation.
 
 import pandas as pd
 import geopandas as gpd
-from typing import Union, Dict, List, Optional, Tuple, Any
+from typing import Union, Dict, List, Optional, Tuple, Any, Callable
 import numpy as np
+import shapely
+
+from aggrada.aggregators.boundaries import get_boundaries
+from aggrada.aggregators.groupby import factorize_keys, aggregate_groups, first_rows
+
+
+# Spatial granularities aggregated by registered administrative boundaries
+ADMIN_LEVELS = ["country", "state", "province", "municipality", "county"]
 
 
 def aggregate_spatial(
     data: gpd.GeoDataFrame,
     spatial_granularity: str,
-    agg_functions: Dict[str, str] = None
+    agg_functions: Dict[str, str] = None,
+    **kwargs
 ) -> gpd.GeoDataFrame:
     """
     Aggregate data at specified spatial granularity.
@@ -26,6 +35,12 @@ def aggregate_spatial(
         Spatial granularity level (e.g., "country", "state", "municipality", "custom")
     agg_functions : dict, optional
         Dictionary mapping column names to aggregation functions
+    **kwargs
+        Options for the spatial granularity. For "grid": ``cell_size``
+        (a number or an ``(x, y)`` tuple in CRS units), ``shape`` (number of
+        cells ``(nx, ny)`` spanning the data bounds) and ``origin`` (the
+        ``(x, y)`` corner the grid is aligned to). For "hexgrid":
+        ``hex_size`` (hexagon circumradius in CRS units) and ``origin``
 
     Returns
     -------
@@ -48,168 +63,490 @@ def aggregate_spatial(
         data = data.copy()
         data["count"] = 1
     
-    # Make sure geometry is included in aggregation functions
-    if "geometry" not in agg_functions:
-        agg_functions["geometry"] = "first"
+    if spatial_granularity.lower() == "custom" and "spatial_group" not in data.columns:
+        raise ValueError("For custom spatial granularity, data must have a 'spatial_group' column")
     
-    # Different aggregation strategies based on granularity
-    if spatial_granularity.lower() in ["country", "state", "province", "municipality", "county"]:
-        return _aggregate_by_admin_level(data, spatial_granularity, agg_functions)
-    elif spatial_granularity.lower() in ["grid", "hexgrid"]:
-        return _aggregate_by_grid(data, spatial_granularity, agg_functions)
-    elif spatial_granularity.lower() == "custom":
+    groups = assign_spatial_groups(data, spatial_granularity, **kwargs)
+    return _aggregate_by_key(data, *groups, agg_functions)
+
+
+def assign_spatial_groups(
+    data: gpd.GeoDataFrame,
+    spatial_granularity: str,
+    **kwargs
+) -> Tuple[str, Any, Optional[Callable[[Any], np.ndarray]]]:
+    """
+    Assign every row to a spatial group without aggregating.
+
+    Parameters
+    ----------
+    data : GeoDataFrame
+        Indexed data with geometry column
+    spatial_granularity : str
+        Spatial granularity level (e.g., "country", "state", "municipality", "custom")
+    **kwargs
+        Options for the spatial granularity, as in :func:`aggregate_spatial`
+
+    Returns
+    -------
+    key_name : str
+        Name of the spatial group column ("admin_id", "cell_id" or "spatial_group")
+    keys : array-like
+        Spatial group of every row, missing for rows outside every group
+    group_geometry : callable or None
+        Function building the geometry of given group keys, or None when
+        each group takes the geometry of its first row
+    """
+    granularity = spatial_granularity.lower()
+    if granularity in ADMIN_LEVELS:
+        return _assign_admin_groups(data, granularity)
+    elif granularity in ["grid", "hexgrid"]:
+        return _assign_grid_groups(data, granularity, **kwargs)
+    elif granularity == "custom":
         # For custom, we assume the data already has a column indicating the aggregation level
         if "spatial_group" not in data.columns:
             raise ValueError("For custom spatial granularity, data must have a 'spatial_group' column")
-        return _aggregate_by_column(data, "spatial_group", agg_functions)
+        return "spatial_group", data["spatial_group"].to_numpy(), None
     else:
         raise ValueError(f"Unsupported spatial granularity: {spatial_granularity}")
 
 
-def _aggregate_by_admin_level(
+def group_geometry(
     data: gpd.GeoDataFrame,
-    admin_level: str,
-    agg_functions: Dict[str, str]
-) -> gpd.GeoDataFrame:
+    codes: np.ndarray,
+    group_keys: Any,
+    geometry_of: Optional[Callable[[Any], np.ndarray]]
+) -> np.ndarray:
     """
-    Aggregate data by administrative level.
-    
+    Get the geometry of every group.
+
     Parameters
     ----------
     data : GeoDataFrame
-        Data to aggregate
-    admin_level : str
-        Administrative level (e.g., "country", "state")
-    agg_functions : dict
-        Dictionary mapping column names to aggregation functions
-        
+        Grouped data
+    codes : ndarray
+        Group code of every row as returned by ``factorize_keys``
+    group_keys : array-like
+        Spatial group key of every group
+    geometry_of : callable or None
+        Group geometry function returned by :func:`assign_spatial_groups`
+
     Returns
     -------
-    GeoDataFrame
-        Aggregated data
+    ndarray
+        Group geometries
+    """
+    if geometry_of is not None:
+        return geometry_of(group_keys)
+    # Geometry of the first row of each group, picked by position
+    return np.asarray(data.geometry.values)[first_rows(codes, len(group_keys))]
+
+
+def coarsen_spatial_groups(
+    geometry: np.ndarray,
+    crs: Any,
+    spatial_granularity: str,
+    **kwargs
+) -> Tuple[str, Any, Optional[Callable[[Any], np.ndarray]]]:
+    """
+    Assign spatial groups to a coarser granularity.
+
+    Each group is placed by a point on its surface, so a fine grid cell or
+    a municipality falls in the coarse cell or state that contains it.
+
+    Parameters
+    ----------
+    geometry : ndarray
+        Geometry of every group, as returned by :func:`group_geometry`
+    crs : CRS or str
+        Coordinate reference system of ``geometry``
+    spatial_granularity : str
+        Coarser spatial granularity level (e.g., "state", "grid")
+    **kwargs
+        Options for the spatial granularity, as in :func:`aggregate_spatial`.
+        Grids need a fixed ``cell_size`` or ``hex_size``, since a default
+        grid would be fitted to the groups instead of the data.
+
+    Returns
+    -------
+    tuple
+        As returned by :func:`assign_spatial_groups`, with one key per group
     """
-    # This is a simplified implementation
-    # In a real implementation, you would use a shapefile of administrative boundaries
-    # and perform a spatial join
+    granularity = spatial_granularity.lower()
+    if granularity == "custom":
+        raise ValueError("Custom spatial groups cannot be derived from other spatial groups")
+    if granularity in ["grid", "hexgrid"] and kwargs.get("cell_size") is None and kwargs.get("hex_size") is None:
+        raise ValueError(f"A derived {granularity} level needs a fixed cell_size or hex_size")
     
-    # For demonstration purposes, we'll just create a warning
-    import warnings
-    warnings.warn(
-        f"Aggregation by {admin_level} is not fully implemented. "
-        "In a production environment, you would use administrative boundary shapefiles. "
-        "Returning data aggregated by dummy regions."
-    )
+    points = shapely.point_on_surface(np.asarray(geometry))
+    groups = gpd.GeoDataFrame(geometry=points, crs=crs)
+    return assign_spatial_groups(groups, granularity, **kwargs)
+
+
+def _assign_admin_groups(
+    data: gpd.GeoDataFrame,
+    admin_level: str
+) -> Tuple[str, Any, Optional[Callable[[Any], np.ndarray]]]:
+    """
+    Assign every row to the registered boundary containing its point (or centroid).
+    
+    Rows outside every boundary get a missing key.
+    """
+    boundaries = _registered_boundaries(admin_level)
+    if boundaries is None:
+        # Create dummy regions based on grid cells
+        return _assign_grid_groups(data, "grid")
+    
+    positions = boundaries.assign(_representative_points(data), data.crs)
+    keys = pd.array(boundaries.ids).take(positions, allow_fill=True)
     
-    # Create dummy regions based on grid cells
-    return _aggregate_by_grid(data, "grid", agg_functions)
+    def geometry_of(ids):
+        return boundaries.geometry(data.crs)[boundaries.positions(ids)]
+    
+    return "admin_id", keys, geometry_of
+
+
+def _registered_boundaries(admin_level: str) -> Optional[Any]:
+    """
+    Get the boundaries registered for a level, warning if there are none.
+    """
+    boundaries = get_boundaries(admin_level)
+    if boundaries is None:
+        import warnings
+        warnings.warn(
+            f"No boundaries registered for {admin_level}. "
+            "Register them with aggrada.register_boundaries(). "
+            "Returning data aggregated by dummy regions."
+        )
+    return boundaries
 
 
-def _aggregate_by_grid(
+def _assign_grid_groups(
     data: gpd.GeoDataFrame,
     grid_type: str,
-    agg_functions: Dict[str, str]
-) -> gpd.GeoDataFrame:
+    cell_size: Optional[Union[float, Tuple[float, float]]] = None,
+    shape: Optional[Tuple[int, int]] = None,
+    origin: Optional[Tuple[float, float]] = None,
+    hex_size: Optional[float] = None
+) -> Tuple[str, Any, Optional[Callable[[Any], np.ndarray]]]:
     """
-    Aggregate data by grid cells.
+    Assign every row to a grid cell.
     
     Parameters
     ----------
     data : GeoDataFrame
-        Data to aggregate
+        Data to assign
     grid_type : str
         Type of grid ("grid" for square, "hexgrid" for hexagonal)
-    agg_functions : dict
-        Dictionary mapping column names to aggregation functions
+    cell_size : float or tuple of float, optional
+        Square cell width and height in CRS units. Takes precedence over ``shape``.
+    shape : tuple of int, optional
+        Number of square cells ``(nx, ny)`` spanning the data bounds. Defaults
+        to ``(10, 10)`` when neither ``cell_size`` nor ``shape`` is given.
+    origin : tuple of float, optional
+        Point the grid is aligned to: the lower-left corner of a square grid
+        or the center of hexagon ``(0, 0)``. Defaults to ``(0, 0)`` when the
+        cell or hex size is given and to the lower-left data bound otherwise.
+    hex_size : float, optional
+        Hexagon circumradius in CRS units. Defaults to a size giving about
+        10 hexagons across the data bounds.
+    """
+    x, y = _representative_coordinates(data)
+    
+    if grid_type.lower() == "hexgrid":
+        if cell_size is not None or shape is not None:
+            raise ValueError("Use hex_size to configure a hexgrid; cell_size and shape apply to square grids")
+        grid = _hex_spec(x, y, hex_size, origin)
+        cell_ids = _assign_hex_cells(x, y, grid)
+        make_polygons = _hex_cell_polygons
+    else:
+        grid = _grid_spec(x, y, cell_size, shape, origin)
+        cell_ids = _assign_grid_cells(x, y, grid)
+        make_polygons = _grid_cell_polygons
+    
+    def geometry_of(ids):
+        return make_polygons(np.asarray(ids, dtype=np.int64), grid)
+    
+    return "cell_id", cell_ids, geometry_of
+
+
+def _representative_points(
+    data: gpd.GeoDataFrame
+) -> np.ndarray:
+    """
+    Get one point per row: the point itself or the centroid.
+    
+    Parameters
+    ----------
+    data : GeoDataFrame
+        Data with geometry column
         
     Returns
     -------
-    GeoDataFrame
-        Aggregated data
+    ndarray
+        Point geometries; missing for missing geometries
     """
-    from shapely.geometry import box
+    geometry = np.asarray(data.geometry.values)
+    type_ids = shapely.get_type_id(geometry)
+    if not (type_ids[type_ids >= 0] == 0).all():
+        geometry = shapely.centroid(geometry)
+    return geometry
+
+
+def _representative_coordinates(
+    data: gpd.GeoDataFrame
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get one (x, y) coordinate per row: the point itself or the centroid.
     
-    # Get the bounds of the data
-    minx, miny, maxx, maxy = data.total_bounds
+    Parameters
+    ----------
+    data : GeoDataFrame
+        Data with geometry column
+        
+    Returns
+    -------
+    tuple of ndarray
+        X and Y coordinates; NaN for missing or empty geometries
+    """
+    points = _representative_points(data)
+    return shapely.get_x(points), shapely.get_y(points)
+
+
+def _grid_spec(
+    x: np.ndarray,
+    y: np.ndarray,
+    cell_size: Optional[Union[float, Tuple[float, float]]] = None,
+    shape: Optional[Tuple[int, int]] = None,
+    origin: Optional[Tuple[float, float]] = None
+) -> Tuple[float, float, float, float, Optional[Tuple[int, int]]]:
+    """
+    Resolve grid options into ``(origin_x, origin_y, size_x, size_y, shape)``.
     
-    # Create a grid (simplified for demonstration)
-    # In a real implementation, you would create a proper grid
+    ``shape`` is returned only for grids spanning the data bounds, where
+    points on the upper bounds are kept in the last row or column.
+    """
+    if cell_size is not None:
+        size_x, size_y = (cell_size, cell_size) if np.isscalar(cell_size) else cell_size
+        if size_x <= 0 or size_y <= 0:
+            raise ValueError("cell_size must be positive")
+        origin_x, origin_y = origin if origin is not None else (0.0, 0.0)
+        return float(origin_x), float(origin_y), float(size_x), float(size_y), None
     
-    # For demonstration, we'll create a 10x10 grid
-    cell_size_x = (maxx - minx) / 10
-    cell_size_y = (maxy - miny) / 10
+    nx, ny = shape if shape is not None else (10, 10)
+    if nx < 1 or ny < 1:
+        raise ValueError("shape must have at least one cell in each direction")
     
-    # Create grid cells
-    grid_cells = []
-    for i in range(10):
-        for j in range(10):
-            cell_minx = minx + i * cell_size_x
-            cell_miny = miny + j * cell_size_y
-            cell_maxx = minx + (i + 1) * cell_size_x
-            cell_maxy = miny + (j + 1) * cell_size_y
-            cell = box(cell_minx, cell_miny, cell_maxx, cell_maxy)
-            grid_cells.append({"geometry": cell, "cell_id": f"{i}_{j}"})
+    with np.errstate(invalid="ignore"):
+        minx, maxx = np.nanmin(x), np.nanmax(x)
+        miny, maxy = np.nanmin(y), np.nanmax(y)
+    origin_x, origin_y = origin if origin is not None else (minx, miny)
     
-    # Create a GeoDataFrame from the grid cells
-    grid = gpd.GeoDataFrame(grid_cells, crs=data.crs)
+    # A degenerate extent (e.g. a single point) gets unit-sized cells
+    size_x = (maxx - origin_x) / nx
+    size_y = (maxy - origin_y) / ny
+    size_x = size_x if size_x > 0 else 1.0
+    size_y = size_y if size_y > 0 else 1.0
+    return float(origin_x), float(origin_y), float(size_x), float(size_y), (int(nx), int(ny))
+
+
+def _assign_grid_cells(
+    x: np.ndarray,
+    y: np.ndarray,
+    grid: Tuple[float, float, float, float, Optional[Tuple[int, int]]]
+) -> np.ndarray:
+    """
+    Compute the integer cell id of every coordinate by floor division.
     
-    # Spatial join with the data
-    joined = gpd.sjoin(data, grid, how="left", predicate="within")
+    Returns
+    -------
+    IntegerArray
+        Cell ids, missing for rows without coordinates
+    """
+    origin_x, origin_y, size_x, size_y, shape = grid
     
-    # Group by cell_id and aggregate
-    grouped = joined.groupby("cell_id")
+    with np.errstate(invalid="ignore"):
+        ix = np.floor((x - origin_x) / size_x)
+        iy = np.floor((y - origin_y) / size_y)
+        if shape is not None:
+            # Points on the upper data bound belong to the last cell
+            ix = np.where(ix == shape[0], shape[0] - 1, ix)
+            iy = np.where(iy == shape[1], shape[1] - 1, iy)
     
-    # Apply aggregation functions
-    aggregated = grouped.agg(agg_functions)
+    return _masked_cells(ix, iy)
+
+
+def _masked_cells(i: np.ndarray, j: np.ndarray) -> pd.arrays.IntegerArray:
+    """
+    Encode float cell coordinates into cell ids, masking non-finite ones.
+    """
+    missing = ~(np.isfinite(i) & np.isfinite(j))
+    i = np.where(missing, 0, i)
+    j = np.where(missing, 0, j)
+    return pd.arrays.IntegerArray(_encode_cells(i, j), missing)
+
+
+def _encode_cells(i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """
+    Pack integer cell coordinates into a single int64 id.
     
-    # Reset index to make cell_id a column
-    aggregated = aggregated.reset_index()
+    The id does not depend on the data extent, so the same cell gets the
+    same id across datasets that share the grid origin and cell size.
+
+    Raises
+    ------
+    ValueError
+        If a coordinate is outside the int32 range, where ids would collide
+    """
+    limits = np.iinfo(np.int32)
+    for values in (i, j):
+        if len(values) and (values.min() < limits.min or values.max() > limits.max):
+            raise ValueError(
+                "Cell coordinates are outside the int32 range; use a larger cell size or an origin closer to the data"
+            )
+    return (i.astype(np.int64) << 32) | (j.astype(np.int64) & 0xFFFFFFFF)
+
+
+def _decode_cells(cell_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Unpack int64 cell ids into integer cell coordinates.
+    """
+    cell_ids = np.asarray(cell_ids, dtype=np.int64)
+    i = cell_ids >> 32
+    j = (cell_ids & 0xFFFFFFFF).astype(np.uint32).view(np.int32).astype(np.int64)
+    return i, j
+
+
+def _grid_cell_polygons(
+    cell_ids: np.ndarray,
+    grid: Tuple[float, float, float, float, Optional[Tuple[int, int]]]
+) -> np.ndarray:
+    """
+    Build the square polygon of each given cell.
+    """
+    origin_x, origin_y, size_x, size_y, _ = grid
+    i, j = _decode_cells(cell_ids)
+    minx = origin_x + i * size_x
+    miny = origin_y + j * size_y
+    return shapely.box(minx, miny, minx + size_x, miny + size_y)
+
+
+def _hex_spec(
+    x: np.ndarray,
+    y: np.ndarray,
+    hex_size: Optional[float] = None,
+    origin: Optional[Tuple[float, float]] = None
+) -> Tuple[float, float, float]:
+    """
+    Resolve hexgrid options into ``(origin_x, origin_y, hex_size)``.
+    """
+    if hex_size is not None:
+        if hex_size <= 0:
+            raise ValueError("hex_size must be positive")
+        origin_x, origin_y = origin if origin is not None else (0.0, 0.0)
+        return float(origin_x), float(origin_y), float(hex_size)
     
-    # Convert back to GeoDataFrame
-    if "geometry" in aggregated.columns:
-        return gpd.GeoDataFrame(aggregated, crs=data.crs)
-    else:
-        # If geometry column was lost during aggregation, use a dummy point
-        from shapely.geometry import Point
-        aggregated["geometry"] = Point(0, 0)
-        return gpd.GeoDataFrame(aggregated, crs=data.crs)
+    with np.errstate(invalid="ignore"):
+        minx, maxx = np.nanmin(x), np.nanmax(x)
+        miny = np.nanmin(y)
+    origin_x, origin_y = origin if origin is not None else (minx, miny)
+    
+    # About 10 pointy-top hexagons (width sqrt(3) * size) across the data
+    hex_size = (maxx - minx) / (10 * np.sqrt(3))
+    return float(origin_x), float(origin_y), float(hex_size if hex_size > 0 else 1.0)
 
 
-def _aggregate_by_column(
+def _assign_hex_cells(
+    x: np.ndarray,
+    y: np.ndarray,
+    grid: Tuple[float, float, float]
+) -> np.ndarray:
+    """
+    Compute the axial (q, r) hexagon of every coordinate and pack it into an id.
+    
+    Uses pointy-top hexagons: fractional axial coordinates are rounded in
+    cube coordinates, which picks the nearest hexagon center.
+    
+    Returns
+    -------
+    IntegerArray
+        Cell ids, missing for rows without coordinates
+    """
+    origin_x, origin_y, size = grid
+    px = (x - origin_x) / size
+    py = (y - origin_y) / size
+    
+    # Fractional cube coordinates (q + r + s == 0)
+    q = np.sqrt(3) / 3 * px - py / 3
+    r = 2 / 3 * py
+    s = -q - r
+    
+    with np.errstate(invalid="ignore"):
+        rq, rr, rs = np.round(q), np.round(r), np.round(s)
+        dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+        # Restore q + r + s == 0 by fixing the component with the largest error
+        fix_q = (dq > dr) & (dq > ds)
+        fix_r = ~fix_q & (dr > ds)
+        rq = np.where(fix_q, -rr - rs, rq)
+        rr = np.where(fix_r, -rq - rs, rr)
+    
+    return _masked_cells(rq, rr)
+
+
+def _hex_cell_polygons(
+    cell_ids: np.ndarray,
+    grid: Tuple[float, float, float]
+) -> np.ndarray:
+    """
+    Build the pointy-top hexagon polygon of each given cell.
+    """
+    origin_x, origin_y, size = grid
+    q, r = _decode_cells(cell_ids)
+    center_x = origin_x + size * np.sqrt(3) * (q + r / 2)
+    center_y = origin_y + size * 1.5 * r
+    
+    angles = np.radians(30 + 60 * np.arange(7))
+    coords = np.empty((len(q), 7, 2))
+    coords[:, :, 0] = center_x[:, None] + size * np.cos(angles)
+    coords[:, :, 1] = center_y[:, None] + size * np.sin(angles)
+    coords[:, 6] = coords[:, 0]
+    return shapely.polygons(coords)
+
+
+def _aggregate_by_key(
     data: gpd.GeoDataFrame,
-    column: str,
+    key_name: str,
+    keys: Any,
+    geometry_of: Optional[Callable[[Any], np.ndarray]],
     agg_functions: Dict[str, str]
 ) -> gpd.GeoDataFrame:
     """
-    Aggregate data by a column.
+    Aggregate data by per-row spatial group keys.
     
     Parameters
     ----------
     data : GeoDataFrame
         Data to aggregate
-    column : str
-        Column to group by
+    key_name : str
+        Name of the key column in the result
+    keys : array-like
+        Group key of every row; rows with a missing key are dropped
+    geometry_of : callable or None
+        Function building the geometry of given group keys, or None to use
+        the geometry of the first row of each group
     agg_functions : dict
-        Dictionary mapping column names to aggregation functions
+        Dictionary mapping column names to aggregation functions. The
+        geometry column is ignored since group geometry is built separately.
         
     Returns
     -------
     GeoDataFrame
-        Aggregated data
+        Aggregated data with the key as first column
     """
-    # Group by the specified column and aggregate
-    grouped = data.groupby(column)
-    
-    # Apply aggregation functions
-    aggregated = grouped.agg(agg_functions)
+    agg_functions = {col: func for col, func in agg_functions.items() if col != data.geometry.name}
     
-    # Reset index to make the grouping column a regular column
-    aggregated = aggregated.reset_index()
-    
-    # Convert back to GeoDataFrame
-    if "geometry" in aggregated.columns:
-        return gpd.GeoDataFrame(aggregated, crs=data.crs)
-    else:
-        # If geometry column was lost during aggregation, use a dummy point
-        from shapely.geometry import Point
-        aggregated["geometry"] = Point(0, 0)
-        return gpd.GeoDataFrame(aggregated, crs=data.crs)
+    codes, (group_keys,) = factorize_keys(keys)
+    aggregated = aggregate_groups(data, codes, len(group_keys), agg_functions)
+    aggregated.insert(0, key_name, group_keys)
+    aggregated["geometry"] = group_geometry(data, codes, group_keys, geometry_of)
+    return gpd.GeoDataFrame(aggregated, geometry="geometry", crs=data.crs)
@@ -0,0 +1,505 @@
+"""
+Mergeable aggregate state module for the Aggrada package.
+
+This module provides functions for computing partial aggregates that can be
+merged across groups, chunks or partitions and finalized afterwards.
+"""
+
+import pandas as pd
+import geopandas as gpd
+from typing import Union, Dict, List, Optional, Tuple, Any
+import numpy as np
+
+from aggrada.aggregators.spatial import assign_spatial_groups, group_geometry
+from aggrada.aggregators.temporal import assign_temporal_groups
+from aggrada.aggregators.groupby import factorize_keys, aggregate_groups
+from aggrada.aggregators.sketches import (
+    parse_quantile, compute_digests, digest_quantiles, compute_registers, estimate_cardinality, merge_sketches
+)
+
+
+# Separator between the column name and the statistic in state columns
+STATE_SEPARATOR = "__"
+
+# State column holding the number of rows of each group
+SIZE_STATE = "__size"
+
+# Mergeable statistics kept for every aggregated column, with their merge function
+STATE_STATISTICS = {
+    "count": "sum",
+    "sum": "sum",
+    "sumsq": "sum",
+    "min": "min",
+    "max": "max",
+    "digest": "digest",
+    "hll": "hll",
+}
+
+# State statistics holding a sketch per group, merged with merge_sketches
+SKETCH_STATISTICS = ["digest", "hll"]
+
+# Aggregation functions that can be computed from mergeable states, besides
+# the approximate quantiles "p50", "p90", "p99", ... and "quantile(q)"
+MERGEABLE_FUNCTIONS = ["size", "count", "sum", "mean", "min", "max", "std", "var", "approx_nunique"]
+
+
+def state_column(column: str, statistic: str) -> str:
+    """
+    Name of the state column holding a statistic of a column.
+
+    Parameters
+    ----------
+    column : str
+        Aggregated column
+    statistic : str
+        Statistic name (e.g. "sum")
+
+    Returns
+    -------
+    str
+        State column name (e.g. "value__sum")
+    """
+    return f"{column}{STATE_SEPARATOR}{statistic}"
+
+
+def is_mergeable(func: str) -> bool:
+    """
+    Check whether an aggregation function can be computed from mergeable states.
+
+    Parameters
+    ----------
+    func : str
+        Aggregation function
+
+    Returns
+    -------
+    bool
+        True for the functions of ``MERGEABLE_FUNCTIONS`` and for quantiles
+    """
+    return func in MERGEABLE_FUNCTIONS or parse_quantile(func) is not None
+
+
+def check_mergeable(agg_functions: Dict[str, str]) -> None:
+    """
+    Check that aggregation functions can be computed from mergeable states.
+
+    Parameters
+    ----------
+    agg_functions : dict
+        Dictionary mapping column names to aggregation functions
+
+    Raises
+    ------
+    ValueError
+        If a function cannot be merged across partial aggregates
+    """
+    invalid = {col: func for col, func in agg_functions.items() if not is_mergeable(func)}
+    if invalid:
+        raise ValueError(
+            f"Aggregation functions cannot be merged across partial aggregates: {invalid}. "
+            f"Mergeable options are: {', '.join(MERGEABLE_FUNCTIONS)}, "
+            f"and quantiles such as p50, p90, p99 or quantile(0.95)"
+        )
+
+
+def state_columns(agg_functions: Dict[str, str]) -> List[str]:
+    """
+    Columns whose states are needed for the given aggregation functions.
+
+    Group sizes are always kept, so "size" entries need no column state,
+    and distinct counts only need the sketch of :func:`sketch_columns`.
+
+    Parameters
+    ----------
+    agg_functions : dict
+        Dictionary mapping column names to aggregation functions
+
+    Returns
+    -------
+    list of str
+        Columns to compute states for
+    """
+    return [col for col, func in agg_functions.items() if func not in ["size", "approx_nunique"]]
+
+
+def sketch_columns(agg_functions: Dict[str, str]) -> Dict[str, str]:
+    """
+    Columns whose values are sketched, with the kind of their sketch.
+
+    Quantile functions keep a "digest" and "approx_nunique" keeps HyperLogLog
+    registers ("hll").
+
+    Parameters
+    ----------
+    agg_functions : dict
+        Dictionary mapping column names to aggregation functions
+
+    Returns
+    -------
+    dict
+        Columns to sketch, mapped to the sketch kind
+    """
+    sketches = {}
+    for col, func in agg_functions.items():
+        if parse_quantile(func) is not None:
+            sketches[col] = "digest"
+        elif func == "approx_nunique":
+            sketches[col] = "hll"
+    return sketches
+
+
+def compute_states(
+    data: pd.DataFrame,
+    codes: np.ndarray,
+    n_groups: int,
+    columns: List[str],
+    weights: Optional[np.ndarray] = None,
+    sketches: Optional[Dict[str, str]] = None
+) -> pd.DataFrame:
+    """
+    Compute mergeable partial aggregates of columns by group codes.
+
+    Parameters
+    ----------
+    data : DataFrame
+        Data to aggregate
+    codes : ndarray
+        Group code of every row, -1 for excluded rows
+    n_groups : int
+        Number of groups
+    columns : list of str
+        Numeric columns to compute states for
+    weights : ndarray, optional
+        Weight of every row. Sizes, counts, sums and sums of squares are
+        then weighted (so means are weighted means); min and max are not.
+    sketches : dict, optional
+        Columns to sketch, mapped to the sketch kind, as from
+        :func:`sketch_columns`. Digests are weighted; distinct counts are not.
+
+    Returns
+    -------
+    DataFrame
+        One row per group code with the group size, for every column its
+        count, sum, sum of squares, min and max, and the requested sketches
+    """
+    valid = codes >= 0
+    group_codes = codes[valid]
+    index = pd.RangeIndex(n_groups)
+    
+    if weights is not None:
+        states = _compute_weighted_states(data, group_codes, valid, index, columns, weights[valid])
+    else:
+        states = _compute_plain_states(data, group_codes, valid, index, columns)
+    
+    for col, kind in (sketches or {}).items():
+        if kind == "digest":
+            values = data[col].to_numpy(dtype=float, na_value=np.nan)[valid]
+            row_weights = None if weights is None else weights[valid]
+            states[state_column(col, kind)] = compute_digests(values, group_codes, n_groups, row_weights)
+        else:
+            states[state_column(col, kind)] = compute_registers(data[col][valid], group_codes, n_groups)
+    return states
+
+
+def _compute_plain_states(
+    data: pd.DataFrame,
+    group_codes: np.ndarray,
+    valid: np.ndarray,
+    index: pd.RangeIndex,
+    columns: List[str]
+) -> pd.DataFrame:
+    """
+    Compute unweighted partial aggregates of the valid rows with groupby.
+    """
+    n_groups = len(index)
+    states = {SIZE_STATE: np.bincount(group_codes, minlength=n_groups)}
+    if columns:
+        frame = pd.DataFrame(data[columns])
+        if not valid.all():
+            frame = frame[valid]
+        grouped = frame.groupby(group_codes)
+        # Strings and other non-numeric columns only have counts, minima and maxima
+        numeric = [col for col in columns if _is_numeric(frame[col].dtype)]
+        sums = frame[numeric].groupby(group_codes).sum()
+        squares = frame[numeric].astype(float).pow(2).groupby(group_codes).sum()
+        statistics = {
+            "count": grouped.count(),
+            "sum": sums,
+            "sumsq": squares,
+            "min": grouped.min(),
+            "max": grouped.max(),
+        }
+        for col in columns:
+            for statistic, values in statistics.items():
+                if col in values.columns:
+                    # Non-numeric minima and maxima keep their dtype so that
+                    # missing groups merge as missing values, not floats
+                    extremes = values[col].reindex(index)
+                    states[state_column(col, statistic)] = (
+                        extremes.to_numpy() if col in numeric else extremes.array
+                    )
+                else:
+                    states[state_column(col, statistic)] = np.full(n_groups, np.nan)
+    
+    return pd.DataFrame(states, index=index)
+
+
+def _compute_weighted_states(
+    data: pd.DataFrame,
+    group_codes: np.ndarray,
+    valid: np.ndarray,
+    index: pd.RangeIndex,
+    columns: List[str],
+    weights: np.ndarray
+) -> pd.DataFrame:
+    """
+    Compute weighted partial aggregates of the valid rows with bincount.
+    """
+    n_groups = len(index)
+    states = {SIZE_STATE: np.bincount(group_codes, weights=weights, minlength=n_groups)}
+    for col in columns:
+        column = data[col]
+        present = column.notna().to_numpy()[valid]
+        present_weights = np.where(present, weights, 0.0)
+        states[state_column(col, "count")] = np.bincount(group_codes, weights=present_weights, minlength=n_groups)
+        if _is_numeric(column.dtype):
+            values = column.to_numpy(dtype=float, na_value=np.nan)[valid]
+            filled = np.where(present, values, 0.0)
+            states[state_column(col, "sum")] = np.bincount(group_codes, weights=present_weights * filled, minlength=n_groups)
+            states[state_column(col, "sumsq")] = np.bincount(
+                group_codes, weights=present_weights * filled * filled, minlength=n_groups
+            )
+            grouped = pd.Series(values).groupby(group_codes)
+        else:
+            # Strings and other non-numeric columns only have counts, minima and maxima
+            for statistic in ["sum", "sumsq"]:
+                states[state_column(col, statistic)] = np.full(n_groups, np.nan)
+            grouped = pd.Series(column.array[valid]).groupby(group_codes)
+        states[state_column(col, "min")] = grouped.min().reindex(index).array
+        states[state_column(col, "max")] = grouped.max().reindex(index).array
+    return pd.DataFrame(states, index=index)
+
+
+def _is_numeric(dtype: Any) -> bool:
+    """
+    Check whether a column has sums and sums of squares: numbers and booleans.
+    """
+    return pd.api.types.is_numeric_dtype(dtype)
+
+
+def merge_states(
+    states: pd.DataFrame,
+    codes: np.ndarray,
+    n_groups: int
+) -> pd.DataFrame:
+    """
+    Merge partial aggregates that share a group code.
+
+    Parameters
+    ----------
+    states : DataFrame
+        Partial aggregates as returned by :func:`compute_states`
+    codes : ndarray
+        Target group code of every state row, -1 to drop the row
+    n_groups : int
+        Number of target groups
+
+    Returns
+    -------
+    DataFrame
+        One row of merged states per target group code
+    """
+    codes = np.asarray(codes)
+    functions = {
+        col: STATE_STATISTICS.get(col.rsplit(STATE_SEPARATOR, 1)[-1], "sum")
+        for col in states.columns
+    }
+    merged = aggregate_groups(states, codes, n_groups, {
+        col: func for col, func in functions.items() if func not in SKETCH_STATISTICS
+    })
+    for col, func in functions.items():
+        if func in SKETCH_STATISTICS:
+            merged[col] = merge_sketches(func, states[col].to_numpy(), codes, n_groups)
+    return merged[list(states.columns)]
+
+
+def window_states(
+    states: pd.DataFrame,
+    groups: np.ndarray,
+    periods: np.ndarray,
+    window: int
+) -> pd.DataFrame:
+    """
+    Merge the states of trailing windows of periods within every group.
+
+    The state row of period ``p`` of a group becomes the merge of the rows
+    of that group with periods in ``[p - window + 1, p]``. Counts and sums
+    are differences of cumulative sums and min and max come from a sparse
+    table, so the cost does not grow with the window length.
+
+    Parameters
+    ----------
+    states : DataFrame
+        Partial aggregates as returned by :func:`compute_states`, sorted by
+        group and then by period
+    groups : ndarray
+        Integer group code of every state row
+    periods : ndarray
+        Integer period code of every state row, unique within a group
+    window : int
+        Number of periods per window, ending at the period of the row
+
+    Returns
+    -------
+    DataFrame
+        One row of windowed states per state row
+    """
+    n = len(states)
+    groups = np.asarray(groups, dtype=np.int64)
+    periods = np.asarray(periods, dtype=np.int64)
+    if n == 0:
+        return states.copy()
+    
+    # A single sorted key orders the rows by group, then period, with gaps
+    # between groups wider than any window so windows never cross groups
+    first = periods.min()
+    stride = periods.max() - first + window
+    key = groups * stride + (periods - first)
+    stop = np.arange(1, n + 1)
+    start = np.searchsorted(key, key - (window - 1), side="left")
+    
+    # Min and max of a window cover it with two overlapping power-of-two spans
+    lengths = stop - start
+    n_levels = int(lengths.max()).bit_length()
+    level = np.frexp(lengths)[1] - 1
+    
+    result = {}
+    for col in states.columns:
+        values = states[col].to_numpy()
+        statistic = STATE_STATISTICS.get(col.rsplit(STATE_SEPARATOR, 1)[-1], "sum")
+        if statistic in SKETCH_STATISTICS:
+            raise ValueError("Sketches cannot be merged over rolling windows")
+        if statistic == "sum":
+            if values.dtype.kind == "f":
+                # Missing sums are skipped, as in merge_states; running totals
+                # are kept in extended precision so that differences of
+                # large totals keep the precision of small windows
+                values = np.nan_to_num(values, nan=0.0).astype(np.longdouble)
+            totals = np.concatenate([np.zeros(1, dtype=values.dtype), np.cumsum(values)])
+            windowed = totals[stop] - totals[start]
+            result[col] = windowed.astype(np.float64) if windowed.dtype == np.longdouble else windowed
+        else:
+            merge = np.fmin if statistic == "min" else np.fmax
+            table = [values]
+            for k in range(1, n_levels):
+                previous = table[-1]
+                span = 1 << (k - 1)
+                table.append(np.concatenate([merge(previous[:-span], previous[span:]), previous[-span:]]))
+            table = np.stack(table)
+            result[col] = merge(table[level, start], table[level, stop - (1 << level)])
+    
+    return pd.DataFrame(result, index=states.index)
+
+
+def finalize_states(
+    states: pd.DataFrame,
+    agg_functions: Dict[str, str]
+) -> pd.DataFrame:
+    """
+    Compute final aggregates from merged states.
+
+    Parameters
+    ----------
+    states : DataFrame
+        Merged partial aggregates
+    agg_functions : dict
+        Dictionary mapping column names to mergeable aggregation functions
+
+    Returns
+    -------
+    DataFrame
+        One column per aggregation function, aligned with ``states``
+    """
+    check_mergeable(agg_functions)
+    
+    result = {}
+    for col, func in agg_functions.items():
+        if func == "size":
+            result[col] = states[SIZE_STATE].to_numpy()
+            continue
+        
+        q = parse_quantile(func)
+        if q is not None:
+            result[col] = digest_quantiles(states[state_column(col, "digest")].to_numpy(), q)
+            continue
+        if func == "approx_nunique":
+            result[col] = estimate_cardinality(states[state_column(col, "hll")].to_numpy())
+            continue
+        
+        count = states[state_column(col, "count")].to_numpy()
+        if func in ["count", "sum", "min", "max"]:
+            # The array keeps nullable integer minima and maxima exact
+            result[col] = states[state_column(col, func)].array
+        else:
+            total = states[state_column(col, "sum")].to_numpy(dtype=float)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                if func == "mean":
+                    result[col] = np.where(count > 0, total / count, np.nan)
+                else:
+                    squares = states[state_column(col, "sumsq")].to_numpy(dtype=float)
+                    variance = (squares - total * total / count) / (count - 1)
+                    variance = np.where(count > 1, np.maximum(variance, 0), np.nan)
+                    result[col] = variance if func == "var" else np.sqrt(variance)
+    
+    return pd.DataFrame(result, index=states.index)
+
+
+def aggregate_states(
+    data: gpd.GeoDataFrame,
+    spatial_granularity: str,
+    temporal_granularity: str,
+    agg_functions: Dict[str, str] = None,
+    **kwargs
+) -> gpd.GeoDataFrame:
+    """
+    Aggregate data into mergeable states per (spatial group, period).
+
+    Parameters
+    ----------
+    data : GeoDataFrame
+        Indexed data with geometry and temporal_range columns
+    spatial_granularity : str
+        Spatial granularity level, as in :func:`aggrada.aggregate`
+    temporal_granularity : str
+        Temporal granularity level, as in :func:`aggrada.aggregate`
+    agg_functions : dict, optional
+        Dictionary mapping column names to mergeable aggregation functions
+    **kwargs
+        Options for the spatial granularity (e.g. ``cell_size``)
+
+    Returns
+    -------
+    GeoDataFrame
+        One row per occupied group with the spatial key, the temporal key
+        (integer period codes, or the custom group), the state columns and
+        the group geometry. States of the same granularities can be merged
+        with :func:`merge_states` and turned into results with
+        :func:`finalize_states`.
+    """
+    if agg_functions is None:
+        agg_functions = {}
+    functions = {col: func for col, func in agg_functions.items() if col != data.geometry.name}
+    check_mergeable(functions)
+    
+    spatial_name, spatial_keys, geometry_of = assign_spatial_groups(data, spatial_granularity, **kwargs)
+    temporal_name, temporal_keys, _ = assign_temporal_groups(data, temporal_granularity)
+    codes, (spatial_values, temporal_values) = factorize_keys(spatial_keys, temporal_keys)
+    
+    result = compute_states(
+        data, codes, len(spatial_values), state_columns(functions), sketches=sketch_columns(functions)
+    )
+    result.insert(0, spatial_name, spatial_values)
+    result.insert(1, temporal_name, temporal_values)
+    result["geometry"] = group_geometry(data, codes, spatial_values, geometry_of)
+    
+    return gpd.GeoDataFrame(result, geometry="geometry", crs=data.crs)
@@ -6,10 +6,13 @@ This module provides functions for temporal aggregation.
 
 import pandas as pd
 import geopandas as gpd
-from typing import Union, Dict, List, Optional, Tuple, Any
+from typing import Union, Dict, List, Optional, Tuple, Any, Callable, Iterator
 import numpy as np
 from datetime import datetime, timedelta
 
+from aggrada.aggregators.groupby import factorize_keys, aggregate_groups, first_rows
+from aggrada.aggregators.backends import get_backend
+
 
 def aggregate_temporal(
     data: Union[pd.DataFrame, gpd.GeoDataFrame],
@@ -44,44 +47,229 @@ def aggregate_temporal(
     
     # Add a count column if it doesn't exist
     if "count" in agg_functions and "count" not in data.columns:
-        data = data.copy()
+        data = data.copy(deep=False)
         data["count"] = 1
     
-    # Keep geometry if it exists
-    if isinstance(data, gpd.GeoDataFrame) and "geometry" in data.columns and "geometry" not in agg_functions:
-        agg_functions["geometry"] = "first"
+    agg_functions = dict(agg_functions)
     
     # Preserve spatial_group if it exists
     if "spatial_group" in data.columns and "spatial_group" not in agg_functions:
         agg_functions["spatial_group"] = "first"
     
-    # Create a temporal grouping column based on granularity
-    data = data.copy() if not isinstance(data, pd.DataFrame) else data.copy()
+    # Keep geometry if it exists; it is taken from the first row of each group
+    keep_geometry = isinstance(data, gpd.GeoDataFrame) and "geometry" in data.columns
+    agg_functions.pop("geometry", None)
+    
+    # Group on integer period codes; labels are built for the groups only
+    group_col, keys, labels_of = assign_temporal_groups(data, temporal_granularity)
+    codes, (group_keys,) = factorize_keys(keys)
+    aggregated = aggregate_groups(data, codes, len(group_keys), agg_functions)
+    aggregated.insert(0, group_col, labels_of(group_keys) if labels_of else group_keys)
     
+    # Convert back to GeoDataFrame if input was a GeoDataFrame
+    if keep_geometry:
+        aggregated["geometry"] = np.asarray(data.geometry.values)[first_rows(codes, len(group_keys))]
+        return gpd.GeoDataFrame(aggregated, geometry="geometry", crs=data.crs)
+    else:
+        return aggregated
+
+
+def assign_temporal_groups(
+    data: pd.DataFrame,
+    temporal_granularity: str
+) -> Tuple[str, Any, Optional[Callable[[Any], Any]]]:
+    """
+    Assign every row to a temporal group without aggregating.
+
+    Parameters
+    ----------
+    data : DataFrame
+        Indexed data with time_start and time_end columns
+    temporal_granularity : str
+        Temporal granularity level (e.g., "year", "month", "week", "day", "custom")
+
+    Returns
+    -------
+    key_name : str
+        Name of the temporal group column ("temporal_group" or "custom_temporal_group")
+    keys : array-like
+        Temporal group of every row: int64 period codes, or the custom group
+    labels_of : callable or None
+        Function turning period codes into output labels, or None when the
+        keys are already the labels
+    """
     if temporal_granularity.lower() == "custom":
-        # For custom, we use the existing custom_temporal_group column
         if "custom_temporal_group" not in data.columns:
             raise ValueError("For custom temporal granularity, data must have a 'custom_temporal_group' column")
-        group_col = "custom_temporal_group"
-    else:
-        # Create a temporal grouping column based on granularity
-        data["temporal_group"] = _create_temporal_groups(data, temporal_granularity)
-        group_col = "temporal_group"
-    
-    # Group by the temporal group and aggregate
-    grouped = data.groupby(group_col)
+        return "custom_temporal_group", data["custom_temporal_group"].to_numpy(), None
     
-    # Apply aggregation functions
-    aggregated = grouped.agg(agg_functions)
+    if "time_start" not in data.columns:
+        raise ValueError("Data must have time_start and time_end columns")
     
-    # Reset index to make grouping column a column
-    aggregated = aggregated.reset_index()
+    def labels_of(codes):
+        return _temporal_group_labels(codes, temporal_granularity)
     
-    # Convert back to GeoDataFrame if input was a GeoDataFrame
-    if isinstance(data, gpd.GeoDataFrame) and "geometry" in aggregated.columns:
-        return gpd.GeoDataFrame(aggregated, geometry="geometry", crs=data.crs)
+    return "temporal_group", _create_temporal_groups(data, temporal_granularity).values, labels_of
+
+
+def coarsen_temporal_codes(
+    codes: np.ndarray,
+    granularity: str,
+    target_granularity: str
+) -> np.ndarray:
+    """
+    Map period codes of one granularity onto a coarser granularity.
+
+    Parameters
+    ----------
+    codes : ndarray
+        Period codes from :func:`assign_temporal_groups`
+    granularity : str
+        Granularity of ``codes``
+    target_granularity : str
+        Coarser granularity; every period of ``granularity`` must fall in a
+        single period of it (weeks do not nest in months)
+
+    Returns
+    -------
+    ndarray
+        Period code of the coarser period containing each period
+    """
+    granularity = granularity.lower()
+    target_granularity = target_granularity.lower()
+    codes = np.asarray(codes, dtype=np.int64)
+    if granularity == target_granularity:
+        return codes
+    starts = _periods_from_codes(codes, granularity).start_time.to_numpy()
+    return _period_codes(starts, target_granularity)
+
+
+# (row, period) pairs built at a time when apportioning intervals
+APPORTION_CHUNK_ROWS = 1_000_000
+
+
+def apportion_periods(
+    data: pd.DataFrame,
+    temporal_granularity: str,
+    max_rows: Optional[int] = None
+) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Split the time interval of every row across the periods it overlaps.
+
+    A row from 2024-01-20 to 2024-03-10 gets a January, a February and a
+    March part, weighted 12/50, 29/50 and 9/50 of its duration. Intervals
+    are half-open, ``[time_start, time_end)``; rows without a duration (or
+    without a time_end) get a single part of weight 1. The (row, period)
+    pairs are built with vectorized arithmetic, in chunks of at most
+    ``max_rows`` pairs so that long intervals do not exhaust memory.
+
+    Parameters
+    ----------
+    data : DataFrame
+        Indexed data with time_start and time_end columns
+    temporal_granularity : str
+        Temporal granularity level (e.g., "year", "month", "week", "day");
+        custom groups cannot be apportioned
+    max_rows : int, optional
+        Maximum number of (row, period) pairs per chunk; a single row with
+        more periods still forms a chunk of its own. Defaults to
+        ``APPORTION_CHUNK_ROWS``.
+
+    Yields
+    ------
+    rows : ndarray
+        Position of the row of every pair
+    codes : ndarray
+        Period code of every pair, as from :func:`assign_temporal_groups`
+    weights : ndarray
+        Fraction of the row's duration falling in the period
+    """
+    granularity = temporal_granularity.lower()
+    if granularity not in _PERIOD_FREQUENCIES:
+        raise ValueError(f"Cannot apportion intervals over temporal granularity: {temporal_granularity}")
+    if "time_start" not in data.columns:
+        raise ValueError("Data must have time_start and time_end columns")
+    if max_rows is None:
+        max_rows = APPORTION_CHUNK_ROWS
+
+    start = _wall_times(data["time_start"])
+    unit = np.datetime_data(start.dtype)[0]
+    end = _wall_times(data["time_end"]).astype(start.dtype) if "time_end" in data.columns else start
+
+    # Rows without a start are left out; rows without a duration are points
+    rows = np.flatnonzero(~np.isnat(start))
+    start, end = start[rows], end[rows]
+    point = np.isnat(end) | (end <= start)
+    end = np.where(point, start, end)
+
+    first = _period_codes(start, granularity)
+    last = np.where(point, first, _period_codes(end - np.timedelta64(1, unit), granularity))
+    counts = last - first + 1
+    stops = np.cumsum(counts)
+    offsets = stops - counts
+
+    i = 0
+    while i < len(rows):
+        # Rows whose pairs fit in the chunk, and at least one
+        j = max(int(np.searchsorted(stops, offsets[i] + max_rows, side="right")), i + 1)
+        sizes = counts[i:j]
+        owners = np.repeat(np.arange(i, j), sizes)
+        codes = first[owners] + (np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes))
+
+        period_start, period_end = _period_bounds(codes, granularity, start.dtype)
+        row_start, row_end = start[owners], end[owners]
+        overlap = (np.minimum(row_end, period_end) - np.maximum(row_start, period_start)).astype(np.int64)
+        duration = (row_end - row_start).astype(np.int64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weights = np.where(point[owners], 1.0, overlap / duration)
+
+        yield rows[owners], codes, weights
+        i = j
+
+
+def _wall_times(times: pd.Series) -> np.ndarray:
+    """
+    Times as naive datetime64 values, on local wall time for timezone-aware data.
+    """
+    if getattr(times.dt, "tz", None) is not None:
+        times = times.dt.tz_localize(None)
+    return times.to_numpy()
+
+
+def _period_bounds(codes: np.ndarray, granularity: str, dtype: Any) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Start and (exclusive) end times of the periods with the given codes.
+    """
+    if granularity == "year":
+        start = (codes - 1970).astype("datetime64[Y]")
+        end = start + np.timedelta64(1, "Y")
+    elif granularity == "quarter":
+        start = (codes * 3).astype("datetime64[M]")
+        end = start + np.timedelta64(3, "M")
+    elif granularity == "month":
+        start = codes.astype("datetime64[M]")
+        end = start + np.timedelta64(1, "M")
+    elif granularity == "week":
+        start = ((codes - 1) * 7 - 3).astype("datetime64[D]")
+        end = start + np.timedelta64(7, "D")
+    elif granularity == "day":
+        start = codes.astype("datetime64[D]")
+        end = start + np.timedelta64(1, "D")
     else:
-        return aggregated
+        start = codes.astype("datetime64[h]")
+        end = start + np.timedelta64(1, "h")
+    return start.astype(dtype), end.astype(dtype)
+
+
+# Period frequency of each temporal granularity
+_PERIOD_FREQUENCIES = {
+    "year": "Y",
+    "quarter": "Q",
+    "month": "M",
+    "week": "W",
+    "day": "D",
+    "hour": "h",
+}
 
 
 def _create_temporal_groups(
@@ -91,6 +279,10 @@ def _create_temporal_groups(
     """
     Create temporal groups based on granularity.
     
+    Groups are integer period codes computed with datetime64 arithmetic,
+    matching pandas Period ordinals (years are calendar years). No string
+    is created per row; use :func:`_temporal_group_labels` to label groups.
+    
     Parameters
     ----------
     data : DataFrame
@@ -101,28 +293,85 @@ def _create_temporal_groups(
     Returns
     -------
     Series
-        Series of temporal group labels
+        Series of int64 temporal group codes ("Int64" if time_start has NaT)
     """
-    # Use time_start for grouping
-    times = data["time_start"]
-    
-    if granularity.lower() == "year":
-        return times.dt.year
-    elif granularity.lower() == "quarter":
-        return times.dt.to_period("Q").astype(str)
-    elif granularity.lower() == "month":
-        return times.dt.to_period("M").astype(str)
-    elif granularity.lower() == "week":
-        return times.dt.to_period("W").astype(str)
-    elif granularity.lower() == "day":
-        return times.dt.to_period("D").astype(str)
-    elif granularity.lower() == "hour":
-        return times.dt.to_period("H").astype(str)
-    elif granularity.lower() == "custom":
+    granularity = granularity.lower()
+    if granularity == "custom":
         # This should not be called for custom granularity
         # as we use the existing custom_temporal_group column
         if "custom_temporal_group" not in data.columns:
             raise ValueError("For custom temporal granularity, data must have a 'custom_temporal_group' column")
         return data["custom_temporal_group"]
-    else:
+    if granularity not in _PERIOD_FREQUENCIES:
         raise ValueError(f"Unsupported temporal granularity: {granularity}")
+    
+    # Use time_start for grouping, on local wall time for timezone-aware data
+    values = _wall_times(data["time_start"])
+    missing = np.isnat(values)
+    
+    codes = _period_codes(values, granularity)
+    if missing.any():
+        codes = pd.arrays.IntegerArray(np.where(missing, 0, codes), missing)
+    return pd.Series(codes, index=data.index, name="temporal_group")
+
+
+def _period_codes(values: np.ndarray, granularity: str) -> np.ndarray:
+    """
+    Convert datetime64 values into int64 period codes in the compute backend.
+    """
+    return get_backend().period_codes(values, granularity)
+
+
+def _datetime_period_codes(values: np.ndarray, granularity: str) -> np.ndarray:
+    """
+    Convert datetime64 values into int64 period codes with datetime64 arithmetic.
+    """
+    if granularity == "year":
+        return values.astype("datetime64[Y]").astype(np.int64) + 1970
+    elif granularity == "quarter":
+        return values.astype("datetime64[M]").astype(np.int64) // 3
+    elif granularity == "month":
+        return values.astype("datetime64[M]").astype(np.int64)
+    elif granularity == "week":
+        # Weeks run Monday to Sunday; 1970-01-01 was a Thursday
+        return (values.astype("datetime64[D]").astype(np.int64) + 3) // 7 + 1
+    elif granularity == "day":
+        return values.astype("datetime64[D]").astype(np.int64)
+    else:
+        return values.astype("datetime64[h]").astype(np.int64)
+
+
+def _temporal_group_labels(
+    codes: Any,
+    granularity: str
+) -> Union[np.ndarray, pd.Index]:
+    """
+    Turn temporal group codes into human-readable labels.
+    
+    Parameters
+    ----------
+    codes : array-like
+        Temporal group codes from :func:`_create_temporal_groups`
+    granularity : str
+        Temporal granularity level
+        
+    Returns
+    -------
+    ndarray or Index
+        Calendar years for "year", period strings (e.g. "2023-01") otherwise
+    """
+    granularity = granularity.lower()
+    codes = np.asarray(codes, dtype=np.int64)
+    if granularity == "year":
+        return codes
+    return _periods_from_codes(codes, granularity).astype(str)
+
+
+def _periods_from_codes(codes: np.ndarray, granularity: str) -> pd.PeriodIndex:
+    """
+    Build a PeriodIndex from period codes.
+    """
+    freq = _PERIOD_FREQUENCIES[granularity.lower()]
+    if granularity.lower() == "year":
+        codes = codes - 1970
+    return pd.PeriodIndex.from_ordinals(codes, freq=freq)
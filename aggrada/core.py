@@ -6,18 +6,46 @@ This module provides the main functions for indexing, aggregating, and analyzing
 
 import pandas as pd
 import geopandas as gpd
-from typing import Union, Dict, List, Optional, Tuple, Any
+from typing import Union, Dict, List, Optional, Tuple, Any, Iterable
 import numpy as np
 from datetime import datetime, timedelta
+from concurrent.futures import Executor
 
 from aggrada.transformers.spatial import create_geometry
 from aggrada.transformers.temporal import create_temporal_range
-from aggrada.aggregators.spatial import aggregate_spatial
-from aggrada.aggregators.temporal import aggregate_temporal
+from aggrada.aggregators.spatial import (
+    assign_spatial_groups, group_geometry, coarsen_spatial_groups
+)
+from aggrada.aggregators.temporal import (
+    assign_temporal_groups, coarsen_temporal_codes, apportion_periods,
+    APPORTION_CHUNK_ROWS, _temporal_group_labels
+)
+from aggrada.aggregators.groupby import factorize_keys, aggregate_groups, first_rows
+from aggrada.aggregators.materialized import MaterializedAggregate
+from aggrada.aggregators.parallel import aggregate_parallel
+from aggrada.aggregators.states import (
+    check_mergeable, state_columns, sketch_columns, compute_states, merge_states, finalize_states,
+    window_states, aggregate_states
+)
+from aggrada.aggregators.boundaries import get_boundaries
 from aggrada.utils.validation import validate_data
+from aggrada.utils.cache import cached
 from aggrada.utils.visualization import plot_data as _plot_data # Import the utility function
 
 
+def _copy_on_write() -> bool:
+    """
+    Whether pandas Copy-on-Write is in effect.
+
+    It is always on from pandas 3.0; on pandas 2.x it is opt-in through
+    ``pd.options.mode.copy_on_write``.
+    """
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    return pd.options.mode.copy_on_write is True
+
+
+@cached("index", skip=lambda arguments: arguments["inplace"])
 def index(
     data: Union[pd.DataFrame, gpd.GeoDataFrame],
     spatial_column: Union[str, List[str]],
@@ -25,6 +53,7 @@ def index(
     spatial_type: str = "auto",
     temporal_format: str = "auto",
     crs: str = "EPSG:4326",
+    inplace: bool = False,
 ) -> gpd.GeoDataFrame:
     """
     Index data spatially and temporally.
@@ -43,32 +72,66 @@ def index(
         Format of temporal data. Options: "auto", "iso", "timestamp", "custom"
     crs : str, default "EPSG:4326"
         Coordinate reference system
+    inplace : bool, default False
+        If True, add the geometry, time_start and time_end columns to ``data``
+        itself and leave all other columns (including the source temporal
+        columns) untouched. The returned GeoDataFrame shares memory with
+        ``data``.
 
     Returns
     -------
     GeoDataFrame
         Indexed data with geometry and temporal_range columns
+
+    Notes
+    -----
+    Under Copy-on-Write (always on from pandas 3.0) no column of the input
+    is copied: the result shares the input's column data and only the new
+    geometry and time columns are allocated. Without it the input is copied,
+    so that writes to the result never reach ``data``.
     """
     # Validate input data
     validate_data(data, spatial_column, temporal_column)
     
-    # Create a copy to avoid modifying the original
-    result = data.copy()
+    if inplace:
+        # Build the new columns first so that ``data`` is left untouched on error
+        geometry = create_geometry(data, spatial_column, spatial_type, crs, copy=False).geometry
+        temporal_columns = [temporal_column] if isinstance(temporal_column, str) else list(temporal_column)
+        times = create_temporal_range(data[temporal_columns], temporal_column, temporal_format, copy=False)
+        
+        data["geometry"] = geometry.array
+        data["time_start"] = times["time_start"].array
+        data["time_end"] = times["time_end"].array
+        return gpd.GeoDataFrame(data, geometry="geometry", crs=geometry.crs, copy=False)
     
-    # Create geometry from spatial column(s)
-    result = create_geometry(result, spatial_column, spatial_type, crs)
+    # Create geometry from spatial column(s) on a copy of the input; a shallow
+    # copy is only safe when Copy-on-Write keeps writes from reaching ``data``
+    result = create_geometry(data, spatial_column, spatial_type, crs, copy=not _copy_on_write())
     
-    # Create temporal range from temporal column(s)
-    result = create_temporal_range(result, temporal_column, temporal_format)
+    # Create temporal range from temporal column(s), sharing the same column data
+    result = create_temporal_range(result, temporal_column, temporal_format, copy=False)
     
     return result
 
 
+def _boundary_context(arguments: Dict[str, Any]) -> List[Any]:
+    """
+    Boundary layer an aggregation by administrative level depends on, for the result cache.
+    """
+    boundaries = get_boundaries(arguments["spatial_granularity"])
+    return [] if boundaries is None else [boundaries.boundaries]
+
+
+@cached("aggregate", ignore=["n_jobs", "executor"], context=_boundary_context)
 def aggregate(
     data: gpd.GeoDataFrame,
     spatial_granularity: str,
     temporal_granularity: str,
     agg_functions: Dict[str, str] = None,
+    n_jobs: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    apportion: bool = False,
+    **kwargs
 ) -> gpd.GeoDataFrame:
     """
     Aggregate data at specified spatial and temporal granularities.
@@ -82,63 +145,424 @@ def aggregate(
     temporal_granularity : str
         Temporal granularity level (e.g., "year", "month", "week", "day", "custom")
     agg_functions : dict, optional
-        Dictionary mapping column names to aggregation functions
+        Dictionary mapping column names to aggregation functions. Besides
+        the pandas functions, "p50", "p90", "p99" (any "p<percent>") and
+        "quantile(q)" give quantiles; they are exact here and estimated
+        from mergeable digests when partial aggregates are merged.
+        "approx_nunique" estimates the number of distinct values from
+        mergeable HyperLogLog registers, within about 1.6% (one standard
+        error).
+    n_jobs : int, optional
+        Number of worker processes for cell assignment and partial
+        aggregation; -1 uses all CPUs. Parallel aggregation supports the
+        mergeable functions "size", "count", "sum", "mean", "min", "max",
+        "std", "var", "approx_nunique" and the quantiles.
+    executor : Executor, optional
+        Executor to run the partitions on instead of a new process pool
+    apportion : bool, default False
+        If True, split every row across all the periods its
+        ``[time_start, time_end)`` interval overlaps, weighted by the
+        overlap duration, instead of counting it in the period of its
+        time_start. Sums are then split, means are duration-weighted and
+        sizes and counts are fractional. Supports the mergeable functions
+        except "std" and "var", and calendar temporal granularities,
+        without ``n_jobs``.
+    **kwargs
+        Options for the spatial granularity passed to
+        :func:`aggrada.aggregators.aggregate_spatial` (e.g. ``cell_size``
+        and ``origin`` for "grid")
 
     Returns
     -------
     GeoDataFrame
-        Aggregated data
+        Aggregated data with one row per occupied (spatial group, temporal group)
+        pair, carrying the spatial group geometry
+
+    Notes
+    -----
+    The spatial and temporal group of every row are computed once and
+    combined into a single int64 key, so the data is grouped in one pass.
     """
     if agg_functions is None:
         agg_functions = {}
 
-    # --- Spatial Aggregation --- 
-    spatial_agg_functions = agg_functions.copy()
-    # Ensure time columns and geometry are preserved during spatial aggregation
-    if "time_start" not in spatial_agg_functions:
-        spatial_agg_functions["time_start"] = "first"
-    if "time_end" not in spatial_agg_functions:
-        spatial_agg_functions["time_end"] = "first"
-    if "geometry" not in spatial_agg_functions:
-        spatial_agg_functions["geometry"] = "first"
     # If spatial granularity is custom, spatial_group must be in data
     if spatial_granularity.lower() == "custom" and "spatial_group" not in data.columns:
         raise ValueError("For custom spatial granularity, data must have a 'spatial_group' column")
+    # If temporal granularity is custom, custom_temporal_group must be in data
+    if temporal_granularity.lower() == "custom" and "custom_temporal_group" not in data.columns:
+        raise ValueError("For custom temporal granularity, data must have a 'custom_temporal_group' column")
+
+    if apportion:
+        if executor is not None or (n_jobs is not None and n_jobs != 1):
+            raise ValueError("apportion does not support n_jobs or executor")
+        return _aggregate_apportioned(data, spatial_granularity, temporal_granularity, agg_functions, **kwargs)
+
+    if executor is not None or (n_jobs is not None and n_jobs != 1):
+        return aggregate_parallel(
+            data, spatial_granularity, temporal_granularity, agg_functions,
+            n_jobs=n_jobs, executor=executor, **kwargs
+        )
+
+    # Compute the spatial and temporal key of every row once
+    spatial_name, spatial_keys, geometry_of = assign_spatial_groups(data, spatial_granularity, **kwargs)
+    temporal_name, temporal_keys, temporal_labels_of = assign_temporal_groups(data, temporal_granularity)
+
+    # A single groupby over the combined (spatial, temporal) int64 key
+    codes, (spatial_values, temporal_values) = factorize_keys(spatial_keys, temporal_keys)
+    functions = {col: func for col, func in agg_functions.items() if col != data.geometry.name}
+    result = aggregate_groups(data, codes, len(spatial_values), functions)
+
+    result.insert(0, spatial_name, spatial_values)
+    result.insert(1, temporal_name, temporal_labels_of(temporal_values) if temporal_labels_of else temporal_values)
+    result["geometry"] = group_geometry(data, codes, spatial_values, geometry_of)
+
+    return gpd.GeoDataFrame(result, geometry="geometry", crs=data.crs)
+
+
+def _aggregate_apportioned(
+    data: gpd.GeoDataFrame,
+    spatial_granularity: str,
+    temporal_granularity: str,
+    agg_functions: Dict[str, str],
+    **kwargs
+) -> gpd.GeoDataFrame:
+    """
+    Aggregate rows split across the periods their intervals overlap.
+
+    Every chunk of (row, period) pairs is reduced to weighted mergeable
+    states before the next one is built, and the pending states are merged
+    whenever they grow past a chunk.
+    """
+    functions = {col: func for col, func in agg_functions.items() if col != data.geometry.name}
+    check_mergeable(functions)
+    # Duration weights are shares of rows, not repeated observations, so the
+    # (count - 1) sample correction of std and var does not hold for them
+    dispersions = {col: func for col, func in functions.items() if func in ["std", "var"]}
+    if dispersions:
+        raise ValueError(f"apportion does not support std or var: {dispersions}")
+    columns = state_columns(functions)
+    sketches = sketch_columns(functions)
+
+    # The spatial key of every row is computed once and shared by its parts
+    spatial_name, spatial_keys, geometry_of = assign_spatial_groups(data, spatial_granularity, **kwargs)
+    spatial_codes, (spatial_values,) = factorize_keys(spatial_keys)
+    frame = pd.DataFrame({col: data[col].array for col, func in functions.items() if func != "size"})
 
-    spatially_aggregated = aggregate_spatial(data, spatial_granularity, spatial_agg_functions)
-
-    # Identify the spatial grouping column created (if any)
-    spatial_group_col = None
-    if spatial_granularity.lower() == "custom" and "spatial_group" in spatially_aggregated.columns:
-        spatial_group_col = "spatial_group"
-    elif spatial_granularity.lower() in ["grid", "hexgrid"] and "cell_id" in spatially_aggregated.columns:
-        spatial_group_col = "cell_id" # Assuming grid aggregation adds 'cell_id'
-
-    # --- Temporal Aggregation --- 
-    temporal_agg_functions = agg_functions.copy()
-    # Ensure geometry is preserved if it exists and wasn't specified
-    if "geometry" in spatially_aggregated.columns and "geometry" not in temporal_agg_functions:
-         temporal_agg_functions["geometry"] = "first"
-    # Ensure the spatial grouping column is preserved if it exists and wasn't specified
-    if spatial_group_col and spatial_group_col not in temporal_agg_functions:
-         temporal_agg_functions[spatial_group_col] = "first"
-    # Remove time columns from temporal agg functions as they are used for grouping/indexing
-    temporal_agg_functions.pop("time_start", None)
-    temporal_agg_functions.pop("time_end", None)
-
-    # If temporal granularity is custom, custom_temporal_group must be in spatially_aggregated
-    if temporal_granularity.lower() == "custom" and "custom_temporal_group" not in spatially_aggregated.columns:
-         # Try to carry it over from original data if spatial aggregation didn't
-         if "custom_temporal_group" in data.columns:
-             # This requires merging back based on some ID, which is complex.
-             # For now, assume spatial aggregation preserves it if needed or raise error.
-             raise ValueError("Custom temporal group column lost during spatial aggregation.")
-         else:
-             raise ValueError("For custom temporal granularity, data must have a 'custom_temporal_group' column")
-
-    result = aggregate_temporal(spatially_aggregated, temporal_granularity, temporal_agg_functions)
+    def combine(partials):
+        # Merge the partial states of groups found in several chunks
+        states = pd.concat(partials, ignore_index=True)
+        codes, (group_spatial, group_periods) = factorize_keys(states.pop("spatial"), states.pop("temporal"))
+        states = merge_states(states, codes, len(group_spatial))
+        states.insert(0, "spatial", group_spatial)
+        states.insert(1, "temporal", group_periods)
+        return states
+
+    partials = [compute_states(frame.iloc[:0], np.zeros(0, dtype=np.int64), 0, columns, np.zeros(0), sketches)]
+    partials[0].insert(0, "spatial", np.zeros(0, dtype=np.int64))
+    partials[0].insert(1, "temporal", np.zeros(0, dtype=np.int64))
+    for rows, periods, weights in apportion_periods(data, temporal_granularity):
+        keep = spatial_codes[rows] >= 0
+        rows, periods, weights = rows[keep], periods[keep], weights[keep]
+        codes, (group_spatial, group_periods) = factorize_keys(spatial_codes[rows], periods)
+        states = compute_states(frame.take(rows), codes, len(group_spatial), columns, weights, sketches)
+        states.insert(0, "spatial", group_spatial)
+        states.insert(1, "temporal", group_periods)
+        partials.append(states)
+        # Keep the pending states bounded when chunks touch many groups
+        if sum(len(partial) for partial in partials) > APPORTION_CHUNK_ROWS:
+            partials = [combine(partials)]
+
+    states = combine(partials)
+    group_spatial, group_periods = states.pop("spatial").to_numpy(), states.pop("temporal").to_numpy()
+    result = finalize_states(states, functions)
+
+    result.insert(0, spatial_name, spatial_values[group_spatial])
+    result.insert(1, "temporal_group", _temporal_group_labels(group_periods, temporal_granularity))
+    if geometry_of is not None:
+        result["geometry"] = geometry_of(spatial_values[group_spatial])
+    else:
+        first = first_rows(spatial_codes, len(spatial_values))
+        result["geometry"] = np.asarray(data.geometry.values)[first][group_spatial]
+
+    return gpd.GeoDataFrame(result, geometry="geometry", crs=data.crs)
+
+
+def aggregate_rolling(
+    data: gpd.GeoDataFrame,
+    spatial_granularity: str,
+    windows: Union[int, List[int]],
+    temporal_granularity: str = "day",
+    agg_functions: Dict[str, str] = None,
+    **kwargs
+) -> gpd.GeoDataFrame:
+    """
+    Aggregate data over trailing windows of periods per spatial group.
+
+    The rows are aggregated once into mergeable states per (spatial group,
+    period). Every window is then derived from these states, with
+    cumulative sums for sizes, counts and sums, so the cost of a window
+    does not depend on its length.
+
+    Parameters
+    ----------
+    data : GeoDataFrame
+        Indexed data with geometry and temporal_range columns
+    spatial_granularity : str
+        Spatial granularity level, as in :func:`aggregate`
+    windows : int or list of int
+        Window length(s) in periods of ``temporal_granularity`` (e.g.
+        ``[7, 28]`` for 7- and 28-day windows)
+    temporal_granularity : str, default "day"
+        Granularity of the periods windows are made of (e.g. "hour", "day",
+        "week", "month")
+    agg_functions : dict, optional
+        Dictionary mapping column names to aggregation functions. Only
+        mergeable functions are supported: "size", "count", "sum", "mean",
+        "min", "max", "std" and "var".
+    **kwargs
+        Options for the spatial granularity (e.g. ``cell_size``)
+
+    Returns
+    -------
+    GeoDataFrame
+        One row per window length and occupied (spatial group, period), in
+        long format: the spatial key, the period ending the window as
+        "temporal_group", the window length as "window", the aggregated
+        columns and the group geometry. Periods without rows are not
+        reported, but windows ending at a period with rows include every
+        earlier period within their length.
+
+    Examples
+    --------
+    >>> trailing = ag.aggregate_rolling(
+    ...     indexed_data, "grid", [7, 28], "day", {"value": "sum"}, cell_size=0.01
+    ... )
+    >>> trailing.pivot_table(index=["cell_id", "temporal_group"], columns="window", values="value")
+    """
+    if agg_functions is None:
+        agg_functions = {}
+    functions = {col: func for col, func in agg_functions.items() if col != data.geometry.name}
+    check_mergeable(functions)
+    if sketch_columns(functions):
+        raise ValueError("Quantile and approx_nunique functions are not supported over rolling windows")
+    if temporal_granularity.lower() == "custom":
+        raise ValueError("Rolling windows need ordered periods; custom temporal groups are not supported")
+    if isinstance(windows, (int, np.integer)):
+        windows = [windows]
+    if not windows or any(not isinstance(window, (int, np.integer)) or window < 1 for window in windows):
+        raise ValueError("windows must be positive numbers of periods")
     
-    return result
+    # Groups are numbered in (spatial key, period) order, so the states are
+    # already sorted as every window needs them
+    states = aggregate_states(data, spatial_granularity, temporal_granularity, functions, **kwargs)
+    spatial_name = states.columns[0]
+    spatial_codes, _ = pd.factorize(states[spatial_name], sort=True)
+    periods = states["temporal_group"].to_numpy(dtype=np.int64)
+    labels = _temporal_group_labels(periods, temporal_granularity)
+    columns = [col for col in states.columns if col not in [spatial_name, "temporal_group", "geometry"]]
+    
+    results = []
+    for window in windows:
+        result = finalize_states(window_states(states[columns], spatial_codes, periods, int(window)), functions)
+        result.insert(0, spatial_name, states[spatial_name].to_numpy())
+        result.insert(1, "temporal_group", labels)
+        result.insert(2, "window", int(window))
+        result["geometry"] = states.geometry.to_numpy()
+        results.append(result)
+    
+    result = pd.concat(results, ignore_index=True)
+    return gpd.GeoDataFrame(result, geometry="geometry", crs=data.crs)
+
+
+def aggregate_chunks(
+    chunks: Iterable[gpd.GeoDataFrame],
+    spatial_granularity: str,
+    temporal_granularity: str,
+    agg_functions: Dict[str, str] = None,
+    **kwargs
+) -> gpd.GeoDataFrame:
+    """
+    Aggregate indexed data that arrives in chunks.
+
+    Every chunk is reduced to mergeable (spatial group, period) states that
+    are combined as the chunks arrive, so only one chunk and the states are
+    held in memory at a time.
+
+    Parameters
+    ----------
+    chunks : iterable of GeoDataFrame
+        Indexed chunks, e.g. from ``read_csv(..., index_data=True, chunksize=...)``
+    spatial_granularity : str
+        Spatial granularity level, as in :func:`aggregate`
+    temporal_granularity : str
+        Temporal granularity level, as in :func:`aggregate`
+    agg_functions : dict, optional
+        Dictionary mapping column names to aggregation functions. Only
+        decomposable functions are supported: "size", "count", "sum",
+        "mean", "min", "max", "std", "var" and approximate quantiles
+        ("p50", "p90", "p99", "quantile(q)").
+    **kwargs
+        Options for the spatial granularity. Grids need a fixed ``cell_size``
+        or ``hex_size`` so that every chunk uses the same cells.
+
+    Returns
+    -------
+    GeoDataFrame
+        Aggregated data, as returned by :func:`aggregate`
+
+    Examples
+    --------
+    >>> chunks = ag.read_csv("extract.csv", ["latitude", "longitude"], "timestamp",
+    ...                      index_data=True, chunksize=1_000_000)
+    >>> aggregated = ag.aggregate_chunks(chunks, "grid", "month", {"value": "mean"}, cell_size=0.1)
+    """
+    store = MaterializedAggregate(spatial_granularity, temporal_granularity, agg_functions, **kwargs)
+    for chunk in chunks:
+        store.append(chunk)
+    return store.result()
+
+
+def aggregate_lattice(
+    data: gpd.GeoDataFrame,
+    spatial_granularities: List[Union[str, Tuple[str, Dict[str, Any]]]],
+    temporal_granularities: List[str],
+    agg_functions: Dict[str, str] = None
+) -> Dict[Tuple[str, str], gpd.GeoDataFrame]:
+    """
+    Aggregate data at every combination of several granularities.
+
+    Mergeable partial aggregates are computed once at the finest levels and
+    every coarser level is derived by merging them, so the rows are only
+    grouped once for the whole lattice.
+
+    Parameters
+    ----------
+    data : GeoDataFrame
+        Indexed data with geometry and temporal_range columns
+    spatial_granularities : list
+        Spatial granularity levels, finest first. Each level is either a
+        name (e.g. "municipality") or a ``(name, options)`` tuple with the
+        options of :func:`aggregate` (e.g. ``("grid", {"cell_size": 0.1})``).
+        Coarser levels are derived from the groups of the first one.
+    temporal_granularities : list of str
+        Temporal granularity levels (e.g. ["day", "week", "month", "year"])
+    agg_functions : dict, optional
+        Dictionary mapping column names to aggregation functions. Only
+        mergeable functions are supported: "size", "count", "sum", "mean",
+        "min", "max", "std", "var" and approximate quantiles ("p50", "p90",
+        "p99", "quantile(q)").
+
+    Returns
+    -------
+    dict
+        Aggregated GeoDataFrames, as returned by :func:`aggregate`, keyed by
+        ``(spatial level, temporal granularity)``. Levels given with options
+        are labelled like "grid(cell_size=0.1)".
+
+    Notes
+    -----
+    A coarser spatial group takes every fine group whose surface point it
+    contains, so levels should nest (fine grid cells inside coarse ones,
+    municipalities inside states). Weeks do not nest in months, so days are
+    used as the finest temporal level when both are requested.
+    """
+    if agg_functions is None:
+        agg_functions = {}
+    functions = {col: func for col, func in agg_functions.items() if col != data.geometry.name}
+    check_mergeable(functions)
+    
+    spatial_levels = [_lattice_level(level) for level in spatial_granularities]
+    temporal_levels = [granularity.lower() for granularity in temporal_granularities]
+    if not spatial_levels or not temporal_levels:
+        raise ValueError("At least one spatial and one temporal granularity are required")
+    base_temporal = _lattice_base_temporal(temporal_levels)
+    _, base_spatial, base_options = spatial_levels[0]
+    
+    # Partial states of every (finest spatial, finest temporal) group, in one pass over the rows
+    spatial_name, spatial_keys, geometry_of = assign_spatial_groups(data, base_spatial, **base_options)
+    _, temporal_keys, _ = assign_temporal_groups(data, base_temporal)
+    codes, (group_spatial, group_temporal) = factorize_keys(spatial_keys, temporal_keys)
+    states = compute_states(
+        data, codes, len(group_spatial), state_columns(functions), sketches=sketch_columns(functions)
+    )
+    
+    # Everything below works on the groups, not on the rows
+    spatial_codes, spatial_values = pd.factorize(group_spatial, sort=True)
+    temporal_codes, temporal_values = pd.factorize(group_temporal, sort=True)
+    if geometry_of is None:
+        first = pd.Series(first_rows(codes, len(group_spatial))).groupby(spatial_codes).min()
+        base_geometry = np.asarray(data.geometry.values)[first.to_numpy()]
+    else:
+        base_geometry = geometry_of(spatial_values)
+    
+    # Group key of every finest spatial group and the geometry of every key, per spatial level
+    spatial_groups = []
+    for label, granularity, options in spatial_levels:
+        if (granularity, options) == (base_spatial, base_options):
+            spatial_groups.append((label, spatial_name, pd.array(spatial_values), pd.Index(spatial_values), base_geometry))
+        else:
+            name, keys, level_geometry_of = coarsen_spatial_groups(base_geometry, data.crs, granularity, **options)
+            keys = pd.array(keys)
+            uniques = pd.Index(keys.unique()).dropna()
+            spatial_groups.append((label, name, keys, uniques, level_geometry_of(uniques)))
+    
+    # Period code of every finest period and the label of every period, per temporal level
+    temporal_groups = []
+    for granularity in temporal_levels:
+        periods = coarsen_temporal_codes(temporal_values, base_temporal, granularity)
+        uniques = pd.Index(np.unique(periods))
+        temporal_groups.append((granularity, periods, uniques, _temporal_group_labels(uniques, granularity)))
+    
+    results = {}
+    for label, name, keys, spatial_uniques, geometry in spatial_groups:
+        level_keys = keys.take(spatial_codes)
+        for granularity, periods, temporal_uniques, labels in temporal_groups:
+            group_codes, (level_spatial, level_temporal) = factorize_keys(level_keys, periods[temporal_codes])
+            merged = merge_states(states, group_codes, len(level_spatial))
+            
+            result = finalize_states(merged, functions)
+            result.insert(0, name, level_spatial)
+            result.insert(1, "temporal_group", labels[temporal_uniques.get_indexer(level_temporal)])
+            result["geometry"] = geometry[spatial_uniques.get_indexer(level_spatial)]
+            results[(label, granularity)] = gpd.GeoDataFrame(result, geometry="geometry", crs=data.crs)
+    
+    return results
+
+
+# Temporal granularities from finest to coarsest
+_TEMPORAL_ORDER = ["hour", "day", "week", "month", "quarter", "year"]
+
+
+def _lattice_level(level: Union[str, Tuple[str, Dict[str, Any]]]) -> Tuple[str, str, Dict[str, Any]]:
+    """
+    Normalize a spatial lattice level into (label, granularity, options).
+    """
+    if isinstance(level, str):
+        return level, level.lower(), {}
+    granularity, options = level
+    options = dict(options or {})
+    if not options:
+        return granularity, granularity.lower(), options
+    label = "{}({})".format(granularity, ", ".join(f"{k}={v}" for k, v in options.items()))
+    return label, granularity.lower(), options
+
+
+def _lattice_base_temporal(granularities: List[str]) -> str:
+    """
+    Pick the finest temporal granularity every requested level derives from.
+    """
+    unsupported = [g for g in granularities if g not in _TEMPORAL_ORDER]
+    if unsupported:
+        raise ValueError(
+            f"Unsupported temporal granularity for a lattice: {unsupported}. "
+            f"Options are: {', '.join(_TEMPORAL_ORDER)}"
+        )
+    base = min(granularities, key=_TEMPORAL_ORDER.index)
+    if base == "week" and any(g in ["month", "quarter", "year"] for g in granularities):
+        # Weeks straddle month and year boundaries
+        return "day"
+    return base
 
 
 def evaluate_consistency(
@@ -0,0 +1,317 @@
+"""
+Lazy query module for the Aggrada package.
+
+This module provides a lazy front end that records reading, indexing,
+filtering and aggregation steps and runs them only when collected, reading
+only the columns and keeping only the rows the query needs.
+"""
+
+import copy
+import pandas as pd
+import geopandas as gpd
+from typing import Union, Dict, List, Optional, Tuple, Any
+
+from aggrada.aggregators.states import is_mergeable
+
+
+class LazyFrame:
+    """
+    Query plan over a data source, executed by :meth:`collect`.
+
+    Every method returns a new plan, so plans can be reused and extended.
+    Use :func:`aggrada.scan_csv` to create one.
+
+    Parameters
+    ----------
+    source : str
+        Path to the data source
+    reader : str, default "csv"
+        Reader used for the source
+    **kwargs
+        Additional arguments for the reader
+
+    Examples
+    --------
+    >>> plan = (
+    ...     ag.scan_csv("extract.csv")
+    ...     .index(["latitude", "longitude"], "timestamp")
+    ...     .filter(time_range=("2023-01-01", "2024-01-01"))
+    ...     .aggregate("grid", "month", {"value": "mean"}, cell_size=0.1)
+    ... )
+    >>> print(plan.explain())
+    >>> result = plan.collect()
+    """
+
+    def __init__(self, source: str, reader: str = "csv", **kwargs):
+        if reader != "csv":
+            raise ValueError(f"Unsupported reader: {reader}")
+        self.source = source
+        self.reader = reader
+        self.reader_options = kwargs
+        self._columns: Optional[List[str]] = None
+        self._index: Optional[Dict[str, Any]] = None
+        self._filters: Dict[str, Any] = {}
+        self._aggregate: Optional[Dict[str, Any]] = None
+
+    def _with(self, **changes) -> "LazyFrame":
+        """
+        Copy the plan with some steps replaced.
+        """
+        if self._aggregate is not None:
+            raise ValueError("The plan already ends with an aggregation")
+        plan = copy.copy(self)
+        plan._filters = dict(self._filters)
+        for name, value in changes.items():
+            setattr(plan, name, value)
+        return plan
+
+    def select(self, columns: Union[str, List[str]]) -> "LazyFrame":
+        """
+        Keep only the given columns (plus the indexed geometry and time columns).
+
+        Parameters
+        ----------
+        columns : str or list of str
+            Columns to keep
+
+        Returns
+        -------
+        LazyFrame
+            The extended plan
+        """
+        return self._with(_columns=_as_list(columns))
+
+    def index(
+        self,
+        spatial_column: Union[str, List[str]],
+        temporal_column: Union[str, List[str]],
+        spatial_type: str = "auto",
+        temporal_format: str = "auto",
+        crs: str = "EPSG:4326"
+    ) -> "LazyFrame":
+        """
+        Index the data spatially and temporally, as :func:`aggrada.index`.
+
+        Returns
+        -------
+        LazyFrame
+            The extended plan
+        """
+        return self._with(_index=dict(
+            spatial_columns=spatial_column,
+            temporal_columns=temporal_column,
+            spatial_type=spatial_type,
+            temporal_format=temporal_format,
+            crs=crs,
+        ))
+
+    def filter(
+        self,
+        bbox: Optional[Tuple[float, float, float, float]] = None,
+        time_range: Optional[Tuple[Any, Any]] = None
+    ) -> "LazyFrame":
+        """
+        Keep only the rows inside a bounding box and a time range.
+
+        Filters are applied to every chunk right after it is read, so rows
+        outside them are never held in memory together.
+
+        Parameters
+        ----------
+        bbox : tuple of float, optional
+            ``(minx, miny, maxx, maxy)`` in the CRS of the data
+        time_range : tuple, optional
+            ``(start, end)``; rows with ``start <= time_start < end`` are kept
+
+        Returns
+        -------
+        LazyFrame
+            The extended plan
+        """
+        if self._index is None:
+            raise ValueError("Call index() before filter()")
+        filters = dict(self._filters)
+        if bbox is not None:
+            filters["bbox"] = _intersect_bbox(filters.get("bbox"), bbox)
+        if time_range is not None:
+            filters["time_range"] = _intersect_time_range(filters.get("time_range"), time_range)
+        return self._with(_filters=filters)
+
+    def aggregate(
+        self,
+        spatial_granularity: str,
+        temporal_granularity: str,
+        agg_functions: Dict[str, str] = None,
+        **kwargs
+    ) -> "LazyFrame":
+        """
+        Aggregate the data, as :func:`aggrada.aggregate`.
+
+        Returns
+        -------
+        LazyFrame
+            The extended plan
+        """
+        if self._index is None:
+            raise ValueError("Call index() before aggregate()")
+        return self._with(_aggregate=dict(
+            spatial_granularity=spatial_granularity,
+            temporal_granularity=temporal_granularity,
+            agg_functions=dict(agg_functions or {}),
+            options=kwargs,
+        ))
+
+    def required_columns(self) -> Optional[List[str]]:
+        """
+        Columns the plan reads from the source, or None for all columns.
+
+        Returns
+        -------
+        list of str or None
+            Column names passed to the reader as ``usecols``
+        """
+        if self._aggregate is None and self._columns is None:
+            return None
+
+        columns = []
+        if self._index is not None:
+            columns += _as_list(self._index["spatial_columns"])
+            columns += _as_list(self._index["temporal_columns"])
+        if self._aggregate is not None:
+            columns += [
+                col for col, func in self._aggregate["agg_functions"].items()
+                if func != "size" and col != "geometry"
+            ]
+            if self._aggregate["spatial_granularity"].lower() == "custom":
+                columns.append("spatial_group")
+            if self._aggregate["temporal_granularity"].lower() == "custom":
+                columns.append("custom_temporal_group")
+        else:
+            columns += self._columns
+        return list(dict.fromkeys(columns))
+
+    def explain(self) -> str:
+        """
+        Describe the optimized plan.
+
+        Returns
+        -------
+        str
+            One line per step, from the read to the last step
+        """
+        columns = self.required_columns()
+        lines = [f"read {self.reader} {self.source!r} columns={columns if columns is not None else 'all'}"]
+        if self._index is not None:
+            lines.append("index {spatial_columns!r} {temporal_columns!r}".format(**self._index))
+        for name, value in self._filters.items():
+            lines.append(f"filter {name}={value!r} (per chunk)")
+        if self._aggregate is not None:
+            mode = "streaming" if self._streaming() else "in memory"
+            lines.append(
+                "aggregate {spatial_granularity} {temporal_granularity} {agg_functions!r}".format(**self._aggregate)
+                + f" ({mode})"
+            )
+        return "\n".join(lines)
+
+    def collect(self, chunksize: Optional[int] = None) -> Union[pd.DataFrame, gpd.GeoDataFrame]:
+        """
+        Run the plan.
+
+        Parameters
+        ----------
+        chunksize : int, optional
+            Rows read at a time. Aggregations with mergeable functions are
+            then computed chunk by chunk, so memory is bounded by the chunk
+            size. Grids must have a fixed ``cell_size`` or ``hex_size``.
+
+        Returns
+        -------
+        DataFrame or GeoDataFrame
+            The result of the last step
+        """
+        from aggrada.readers.csv import read_csv
+        from aggrada.core import aggregate, aggregate_chunks
+
+        options = dict(self.reader_options)
+        columns = self.required_columns()
+        if columns is not None:
+            options["usecols"] = columns
+        if self._index is not None:
+            options.update(self._index, index_data=True, **self._filters)
+
+        if self._aggregate is not None:
+            spec = self._aggregate
+            if chunksize is not None and self._streaming():
+                chunks = read_csv(self.source, chunksize=chunksize, **options)
+                return aggregate_chunks(
+                    chunks, spec["spatial_granularity"], spec["temporal_granularity"],
+                    spec["agg_functions"], **spec["options"]
+                )
+            data = read_csv(self.source, **options)
+            return aggregate(
+                data, spec["spatial_granularity"], spec["temporal_granularity"],
+                spec["agg_functions"], **spec["options"]
+            )
+
+        if chunksize is not None:
+            chunks = list(read_csv(self.source, chunksize=chunksize, **options))
+            if not chunks:
+                raise ValueError("Data is empty")
+            data = pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+        else:
+            data = read_csv(self.source, **options)
+        if self._columns is not None:
+            keep = [col for col in data.columns if col in self._columns or col in ["geometry", "time_start", "time_end"]]
+            data = data[keep]
+        return data
+
+    def _streaming(self) -> bool:
+        """
+        Check whether the aggregation can be computed chunk by chunk.
+        """
+        spec = self._aggregate
+        if not all(is_mergeable(func) for func in spec["agg_functions"].values()):
+            return False
+        granularity = spec["spatial_granularity"].lower()
+        options = spec["options"]
+        return granularity not in ["grid", "hexgrid"] or \
+            options.get("cell_size") is not None or options.get("hex_size") is not None
+
+    def __repr__(self) -> str:
+        return f"<LazyFrame\n{self.explain()}\n>"
+
+
+def _as_list(columns: Union[str, List[str]]) -> List[str]:
+    """
+    Turn a column name or list of names into a list.
+    """
+    return [columns] if isinstance(columns, str) else list(columns)
+
+
+def _intersect_bbox(
+    current: Optional[Tuple[float, float, float, float]],
+    bbox: Tuple[float, float, float, float]
+) -> Tuple[float, float, float, float]:
+    """
+    Combine two bounding box filters into one.
+    """
+    if current is None:
+        return tuple(bbox)
+    return (
+        max(current[0], bbox[0]), max(current[1], bbox[1]),
+        min(current[2], bbox[2]), min(current[3], bbox[3]),
+    )
+
+
+def _intersect_time_range(
+    current: Optional[Tuple[Any, Any]],
+    time_range: Tuple[Any, Any]
+) -> Tuple[Any, Any]:
+    """
+    Combine two time range filters into one.
+    """
+    if current is None:
+        return tuple(time_range)
+    starts = [pd.Timestamp(t) for t in (current[0], time_range[0]) if t is not None]
+    ends = [pd.Timestamp(t) for t in (current[1], time_range[1]) if t is not None]
+    return (max(starts) if starts else None, min(ends) if ends else None)
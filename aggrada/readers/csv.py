@@ -6,9 +6,12 @@ This module provides functions for reading data from CSV files.
 
 import pandas as pd
 import geopandas as gpd
-from typing import Union, Optional, Dict, Any, List
+from typing import Union, Optional, Dict, Any, List, Iterator, Tuple
 
+from aggrada.utils.cache import cached
 
+
+@cached("read_csv", skip=lambda arguments: arguments["chunksize"] is not None)
 def read_csv(
     filepath_or_buffer: str,
     spatial_columns: Optional[Union[str, List[str]]] = None,
@@ -17,8 +20,11 @@ def read_csv(
     temporal_format: str = "auto",
     crs: str = "EPSG:4326",
     index_data: bool = False,
+    chunksize: Optional[int] = None,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+    time_range: Optional[Tuple[Any, Any]] = None,
     **kwargs
-) -> Union[pd.DataFrame, gpd.GeoDataFrame]:
+) -> Union[pd.DataFrame, gpd.GeoDataFrame, Iterator[Union[pd.DataFrame, gpd.GeoDataFrame]]]:
     """
     Read a CSV file into a DataFrame or GeoDataFrame.
 
@@ -38,28 +44,148 @@ def read_csv(
         Coordinate reference system
     index_data : bool, default False
         Whether to automatically index the data spatially and temporally
+    chunksize : int, optional
+        Number of rows per chunk. If given, an iterator of chunks is returned
+        instead of a single DataFrame, and each chunk is indexed on its own,
+        so memory use is bounded by the chunk size. Pass the iterator to
+        :func:`aggrada.aggregate_chunks` to aggregate a file larger than memory.
+    bbox : tuple of float, optional
+        ``(minx, miny, maxx, maxy)``; keep only rows intersecting the box.
+        Requires ``index_data``.
+    time_range : tuple, optional
+        ``(start, end)``; keep only rows with ``start <= time_start < end``.
+        Requires ``index_data``.
     **kwargs
         Additional arguments to pass to pandas.read_csv()
 
     Returns
     -------
-    DataFrame or GeoDataFrame
+    DataFrame or GeoDataFrame, or iterator of them
         Data from the CSV file
     """
+    index_options = None
+    if index_data and spatial_columns and temporal_columns:
+        index_options = dict(
+            spatial_columns=spatial_columns, temporal_columns=temporal_columns,
+            spatial_type=spatial_type, temporal_format=temporal_format, crs=crs,
+            bbox=bbox, time_range=time_range
+        )
+    elif bbox is not None or time_range is not None:
+        raise ValueError("bbox and time_range filters require index_data with spatial and temporal columns")
+    
+    if chunksize is not None:
+        return _read_csv_chunks(filepath_or_buffer, index_options, chunksize, **kwargs)
+    
+    if bbox is not None or time_range is not None:
+        # Filter chunk by chunk so that only matching rows are ever held together
+        chunks = list(_read_csv_chunks(filepath_or_buffer, index_options, _FILTER_CHUNKSIZE, **kwargs))
+        if not chunks:
+            raise ValueError("Data is empty")
+        return pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+    
     # Read the CSV file using pandas
     data = pd.read_csv(filepath_or_buffer, **kwargs)
     
     # If spatial and temporal columns are provided and index_data is True,
     # index the data spatially and temporally
-    if index_data and spatial_columns and temporal_columns:
-        from aggrada.core import index
-        data = index(
-            data,
-            spatial_column=spatial_columns,
-            temporal_column=temporal_columns,
-            spatial_type=spatial_type,
-            temporal_format=temporal_format,
-            crs=crs
-        )
+    if index_options is not None:
+        data = _index_chunk(data, **index_options)
     
     return data
+
+
+def scan_csv(filepath_or_buffer: str, **kwargs) -> Any:
+    """
+    Start a lazy query over a CSV file.
+
+    Nothing is read until ``collect()`` is called on the plan; the columns
+    and filters of the query are then pushed down into :func:`read_csv`.
+
+    Parameters
+    ----------
+    filepath_or_buffer : str
+        Path to the CSV file or URL
+    **kwargs
+        Additional arguments to pass to pandas.read_csv()
+
+    Returns
+    -------
+    LazyFrame
+        Query plan reading the file
+    """
+    from aggrada.lazy import LazyFrame
+    return LazyFrame(filepath_or_buffer, reader="csv", **kwargs)
+
+
+# Rows read at a time when filtering a CSV file
+_FILTER_CHUNKSIZE = 1_000_000
+
+
+def _read_csv_chunks(
+    filepath_or_buffer: str,
+    index_options: Optional[Dict[str, Any]],
+    chunksize: int,
+    **kwargs
+) -> Iterator[Union[pd.DataFrame, gpd.GeoDataFrame]]:
+    """
+    Read a CSV file chunk by chunk, indexing and filtering every chunk if requested.
+
+    Chunks left without rows by the filters are skipped; if every chunk is,
+    a single empty indexed chunk is yielded.
+    """
+    empty = None
+    with pd.read_csv(filepath_or_buffer, chunksize=chunksize, **kwargs) as reader:
+        for chunk in reader:
+            if index_options is not None:
+                chunk = _index_chunk(chunk, **index_options)
+                if chunk.empty:
+                    empty = chunk
+                    continue
+            empty = None
+            yield chunk
+    if empty is not None:
+        yield empty
+
+
+def _index_chunk(
+    data: pd.DataFrame,
+    spatial_columns: Union[str, List[str]],
+    temporal_columns: Union[str, List[str]],
+    spatial_type: str,
+    temporal_format: str,
+    crs: str,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+    time_range: Optional[Tuple[Any, Any]] = None
+) -> gpd.GeoDataFrame:
+    """
+    Index data read from the file and apply the row filters.
+    """
+    from aggrada.core import index
+    from aggrada.transformers.filters import filter_data, filter_coordinates
+    if bbox is not None:
+        # Drop rows outside the box before their geometry is built
+        data = filter_coordinates(data, spatial_columns, bbox, spatial_type)
+        if data.empty:
+            return _empty_indexed(data, crs)
+    data = index(
+        data,
+        spatial_column=spatial_columns,
+        temporal_column=temporal_columns,
+        spatial_type=spatial_type,
+        temporal_format=temporal_format,
+        crs=crs
+    )
+    if bbox is not None or time_range is not None:
+        data = filter_data(data, bbox=bbox, time_range=time_range)
+    return data
+
+
+def _empty_indexed(data: pd.DataFrame, crs: str) -> gpd.GeoDataFrame:
+    """
+    Indexed GeoDataFrame without rows, with the columns of the raw data.
+    """
+    empty = data.iloc[:0].copy()
+    empty["geometry"] = gpd.GeoSeries([], index=empty.index, crs=crs)
+    empty["time_start"] = pd.Series([], index=empty.index, dtype="datetime64[ns]")
+    empty["time_end"] = pd.Series([], index=empty.index, dtype="datetime64[ns]")
+    return gpd.GeoDataFrame(empty, geometry="geometry", crs=crs)
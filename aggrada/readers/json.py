@@ -1,13 +1,41 @@
 """
 JSON reader module for the Aggrada package.
 
-This module provides functions for reading data from JSON files.
+This module provides functions for reading data from JSON files, including
+GeoJSON and newline-delimited JSON, either whole or in bounded chunks.
 """
 
+import os
+import re
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import geopandas as gpd
 import json
-from typing import Union, Optional, Dict, Any, List
+from typing import Union, Optional, Dict, Any, List, Iterator, Tuple
+import numpy as np
+import shapely
+
+from aggrada.readers.csv import _index_chunk
+
+
+# Extensions of newline-delimited JSON files
+_LINE_EXTENSIONS = (".ndjson", ".jsonl", ".ldjson", ".geojsonl", ".geojsons")
+
+# Characters read to detect the layout of a file
+_SNIFF_SIZE = 1 << 20
+
+# Characters read from the file at a time when streaming a document
+_BLOCK_SIZE = 1 << 20
+
+# Rows read at a time when filtering a JSON file
+_FILTER_CHUNKSIZE = 1_000_000
+
+# CRS of GeoJSON coordinates (RFC 7946)
+_GEOJSON_CRS = "EPSG:4326"
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
 
 
 def read_json(
@@ -18,11 +46,19 @@ def read_json(
     temporal_format: str = "auto",
     crs: str = "EPSG:4326",
     index_data: bool = False,
+    chunksize: Optional[int] = None,
+    lines: Optional[bool] = None,
+    n_jobs: Optional[int] = None,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+    time_range: Optional[Tuple[Any, Any]] = None,
     **kwargs
-) -> Union[pd.DataFrame, gpd.GeoDataFrame]:
+) -> Union[pd.DataFrame, gpd.GeoDataFrame, Iterator[Union[pd.DataFrame, gpd.GeoDataFrame]]]:
     """
     Read a JSON file into a DataFrame or GeoDataFrame.
 
+    GeoJSON FeatureCollections and newline-delimited features are read as
+    GeoDataFrames, other JSON as DataFrames.
+
     Parameters
     ----------
     filepath_or_buffer : str
@@ -39,39 +75,356 @@ def read_json(
         Coordinate reference system
     index_data : bool, default False
         Whether to automatically index the data spatially and temporally
+    chunksize : int, optional
+        Number of features or records per chunk. If given, an iterator of
+        chunks is returned instead of a single DataFrame. The file is parsed
+        incrementally, so memory use is bounded by the chunk size, and each
+        chunk is indexed on its own. Supported for GeoJSON
+        FeatureCollections, top-level JSON arrays of records and
+        newline-delimited JSON. Pass the iterator to
+        :func:`aggrada.aggregate_chunks` to aggregate a file larger than memory.
+    lines : bool, optional
+        Whether the file holds one JSON value per line. Detected from the
+        file extension and content when not given.
+    n_jobs : int, optional
+        Number of worker processes parsing (and indexing) the chunks of a
+        newline-delimited file; -1 uses all CPUs. Requires ``chunksize``.
+    bbox : tuple of float, optional
+        ``(minx, miny, maxx, maxy)``; keep only rows intersecting the box.
+        Requires ``index_data``.
+    time_range : tuple, optional
+        ``(start, end)``; keep only rows with ``start <= time_start < end``.
+        Requires ``index_data``.
     **kwargs
-        Additional arguments to pass to pandas.read_json()
+        Additional arguments to pass to pandas.read_json(); not supported
+        with ``chunksize``
 
     Returns
     -------
-    DataFrame or GeoDataFrame
+    DataFrame or GeoDataFrame, or iterator of them
         Data from the JSON file
     """
-    # Check if the file is GeoJSON
-    try:
-        with open(filepath_or_buffer, 'r') as f:
-            first_chars = f.read(50)
-            is_geojson = '"type"' in first_chars and ('"FeatureCollection"' in first_chars or '"Feature"' in first_chars)
-    except:
-        is_geojson = False
-    
+    index_options = None
+    if index_data and spatial_columns and temporal_columns:
+        index_options = dict(
+            spatial_columns=spatial_columns, temporal_columns=temporal_columns,
+            spatial_type=spatial_type, temporal_format=temporal_format, crs=crs,
+            bbox=bbox, time_range=time_range
+        )
+    elif bbox is not None or time_range is not None:
+        raise ValueError("bbox and time_range filters require index_data with spatial and temporal columns")
+    if n_jobs is not None and n_jobs != 1 and chunksize is None:
+        raise ValueError("n_jobs requires chunksize")
+
+    layout = _sniff_json(filepath_or_buffer, lines)
+
+    if chunksize is not None:
+        if kwargs:
+            raise TypeError(f"Unsupported arguments when reading in chunks: {', '.join(kwargs)}")
+        if chunksize <= 0:
+            raise ValueError("chunksize must be positive")
+        return _read_json_chunks(filepath_or_buffer, layout, index_options, chunksize, n_jobs)
+
+    if bbox is not None or time_range is not None or layout == "feature_lines":
+        # Stream the file so that only matching rows are ever held together
+        chunks = list(_read_json_chunks(filepath_or_buffer, layout, index_options, _FILTER_CHUNKSIZE, None))
+        if not chunks:
+            return pd.DataFrame()
+        return pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+
     # Read the file
-    if is_geojson:
+    if layout == "geojson":
         data = gpd.read_file(filepath_or_buffer)
     else:
+        if layout == "lines":
+            kwargs.setdefault("lines", True)
         data = pd.read_json(filepath_or_buffer, **kwargs)
-    
+
     # If spatial and temporal columns are provided and index_data is True,
     # index the data spatially and temporally
-    if index_data and spatial_columns and temporal_columns:
-        from aggrada.core import index
-        data = index(
-            data,
-            spatial_column=spatial_columns,
-            temporal_column=temporal_columns,
-            spatial_type=spatial_type,
-            temporal_format=temporal_format,
-            crs=crs
-        )
-    
+    if index_options is not None:
+        data = _index_chunk(data, **index_options)
+
     return data
+
+
+def _sniff_json(filepath_or_buffer: str, lines: Optional[bool] = None) -> str:
+    """
+    Detect the layout of a JSON file from its start.
+
+    Returns "geojson" for a GeoJSON document, "array" for a top-level array,
+    "lines" or "feature_lines" for one record or feature per line and
+    "document" for any other JSON value.
+    """
+    try:
+        with open(filepath_or_buffer, "r", encoding="utf-8-sig") as f:
+            head = f.read(_SNIFF_SIZE)
+    except (OSError, TypeError, ValueError):
+        return "lines" if lines else "document"
+
+    text = head.lstrip()
+    if lines is None:
+        lines = str(filepath_or_buffer).lower().endswith(_LINE_EXTENSIONS) or _is_line_delimited(text)
+    if lines:
+        first = text.split("\n", 1)[0]
+        return "feature_lines" if re.search(r'"type"\s*:\s*"Feature"', first) else "lines"
+    if text.startswith("["):
+        return "array"
+    if re.search(r'"type"\s*:\s*"(FeatureCollection|Feature)"', text):
+        return "geojson"
+    return "document"
+
+
+def _is_line_delimited(text: str) -> bool:
+    """
+    Check whether a file starts with a complete JSON object on its first line
+    followed by another value.
+    """
+    if not text.startswith("{") or "\n" not in text:
+        return False
+    first, rest = text.split("\n", 1)
+    try:
+        value = json.loads(first)
+    except ValueError:
+        return False
+    if isinstance(value, dict) and value.get("type") == "FeatureCollection":
+        return False
+    return rest.lstrip().startswith("{")
+
+
+def _read_json_chunks(
+    filepath_or_buffer: str,
+    layout: str,
+    index_options: Optional[Dict[str, Any]],
+    chunksize: int,
+    n_jobs: Optional[int]
+) -> Iterator[Union[pd.DataFrame, gpd.GeoDataFrame]]:
+    """
+    Read a JSON file chunk by chunk, indexing and filtering every chunk if requested.
+    """
+    if layout in ("lines", "feature_lines"):
+        if n_jobs is not None and n_jobs != 1:
+            yield from _read_lines_parallel(filepath_or_buffer, index_options, chunksize, n_jobs)
+            return
+        with open(filepath_or_buffer, "rb") as f:
+            start = 0
+            while True:
+                block = list(itertools.islice(f, chunksize))
+                if not block:
+                    break
+                chunk = _parse_lines((block, start, index_options))
+                start += len(block)
+                del block
+                yield chunk
+        return
+
+    with open(filepath_or_buffer, "r", encoding="utf-8-sig") as f:
+        start = 0
+        records = _iter_records(_JsonStream(f))
+        while True:
+            batch = list(itertools.islice(records, chunksize))
+            if not batch:
+                break
+            chunk = _records_frame(batch, start)
+            start += len(batch)
+            # Release the parsed records before the chunk is used
+            del batch
+            if index_options is not None:
+                chunk = _index_chunk(chunk, **index_options)
+            yield chunk
+
+
+def _read_lines_parallel(
+    filepath_or_buffer: str,
+    index_options: Optional[Dict[str, Any]],
+    chunksize: int,
+    n_jobs: int
+) -> Iterator[Union[pd.DataFrame, gpd.GeoDataFrame]]:
+    """
+    Read a newline-delimited file with chunks parsed and indexed in worker processes.
+
+    The lines of at most two chunks per worker are held at a time, and the
+    chunks are yielded in file order.
+    """
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=n_jobs)
+    pending = deque()
+    try:
+        with open(filepath_or_buffer, "rb") as f:
+            start = 0
+            while True:
+                while len(pending) < 2 * n_jobs:
+                    block = list(itertools.islice(f, chunksize))
+                    if not block:
+                        break
+                    pending.append(executor.submit(_parse_lines, (block, start, index_options)))
+                    start += len(block)
+                    del block
+                if not pending:
+                    break
+                yield pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _parse_lines(
+    task: Tuple[List[bytes], int, Optional[Dict[str, Any]]]
+) -> Union[pd.DataFrame, gpd.GeoDataFrame]:
+    """
+    Parse (and index) a block of JSON lines starting at a given row.
+    """
+    block, start, index_options = task
+    records = [json.loads(line) for line in block if not line.isspace()]
+    chunk = _records_frame(records, start)
+    if index_options is not None:
+        chunk = _index_chunk(chunk, **index_options)
+    return chunk
+
+
+def _records_frame(records: List[Any], start: int) -> Union[pd.DataFrame, gpd.GeoDataFrame]:
+    """
+    Build a DataFrame from parsed records, or a GeoDataFrame from GeoJSON features.
+    """
+    index = pd.RangeIndex(start, start + len(records))
+    if records and isinstance(records[0], dict) and records[0].get("type") == "Feature":
+        properties = pd.DataFrame([feature.get("properties") or {} for feature in records], index=index)
+        geometry = _feature_geometries([feature.get("geometry") for feature in records])
+        return gpd.GeoDataFrame(properties, geometry=geometry, crs=_GEOJSON_CRS)
+    return pd.DataFrame(records, index=index)
+
+
+def _feature_geometries(geometries: List[Optional[Dict[str, Any]]]) -> np.ndarray:
+    """
+    Build the geometries of GeoJSON features, creating all 2D points at once.
+    """
+    result = np.full(len(geometries), None, dtype=object)
+    points, coordinates, others = [], [], []
+    for i, geometry in enumerate(geometries):
+        if geometry is None:
+            continue
+        if geometry.get("type") == "Point" and len(geometry.get("coordinates") or ()) == 2:
+            points.append(i)
+            coordinates.append(geometry["coordinates"])
+        else:
+            others.append(i)
+    if points:
+        result[points] = shapely.points(np.asarray(coordinates, dtype=float))
+    if others:
+        result[others] = shapely.from_geojson([json.dumps(geometries[i]) for i in others])
+    return result
+
+
+def _iter_records(stream: "_JsonStream") -> Iterator[Any]:
+    """
+    Yield the items of a top-level array, or the features of a FeatureCollection.
+    """
+    opening = stream.next_char()
+    if opening == "[":
+        yield from _iter_array(stream)
+        return
+    if opening == "{":
+        # Skip the members before "features"; the ones after it are not needed
+        while stream.peek() not in ("}", ""):
+            key = stream.decode()
+            stream.expect(":")
+            if key == "features" and stream.peek() == "[":
+                stream.next_char()
+                yield from _iter_array(stream)
+                return
+            stream.decode()
+            if stream.peek() == ",":
+                stream.next_char()
+    raise ValueError(
+        "chunksize requires a GeoJSON FeatureCollection, a JSON array of records "
+        "or newline-delimited JSON"
+    )
+
+
+def _iter_array(stream: "_JsonStream") -> Iterator[Any]:
+    """
+    Yield the items of an array whose opening bracket was consumed.
+    """
+    if stream.peek() == "]":
+        return
+    while True:
+        yield stream.decode()
+        separator = stream.next_char()
+        if separator == "]":
+            return
+        if separator != ",":
+            raise ValueError(f"Invalid JSON: expected ',' or ']' but found {separator!r}")
+
+
+class _JsonStream:
+    """
+    Incremental decoder of the JSON values in a text file.
+
+    Only the block being decoded is held in memory; a value longer than the
+    block grows the buffer until it fits.
+    """
+
+    def __init__(self, file: Any, block_size: int = _BLOCK_SIZE):
+        self._file = file
+        self._block_size = block_size
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self, size: int) -> bool:
+        """
+        Append the next characters of the file to the unread part of the buffer.
+        """
+        block = self._file.read(size)
+        if not block:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + block
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        Skip whitespace and return the next character, or "" at the end of the file.
+        """
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill(self._block_size):
+                return ""
+
+    def next_char(self) -> str:
+        """
+        Consume and return the next non-whitespace character.
+        """
+        char = self.peek()
+        self._pos += len(char)
+        return char
+
+    def expect(self, char: str) -> None:
+        """
+        Consume the next non-whitespace character, which must be ``char``.
+        """
+        found = self.next_char()
+        if found != char:
+            raise ValueError(f"Invalid JSON: expected {char!r} but found {found!r}")
+
+    def decode(self) -> Any:
+        """
+        Consume and return the next JSON value.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # A number at the end of the buffer may continue in the next block
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            # Grow geometrically so that long values are decoded in few attempts
+            self._fill(max(self._block_size, len(self._buffer) - self._pos))
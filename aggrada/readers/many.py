@@ -0,0 +1,220 @@
+"""
+Multi-source reader module for the Aggrada package.
+
+This module provides a function for reading and indexing many sources
+concurrently into a single indexed GeoDataFrame.
+"""
+
+import os
+import glob
+import pandas as pd
+import geopandas as gpd
+from typing import Union, Optional, Dict, Any, List
+import numpy as np
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+
+# Reader of each file extension
+_READERS = {
+    ".csv": "csv",
+    ".txt": "csv",
+    ".xlsx": "excel",
+    ".xls": "excel",
+    ".json": "json",
+    ".geojson": "json",
+    ".ndjson": "json",
+    ".jsonl": "json",
+    ".geojsonl": "json",
+    ".shp": "shapefile",
+    ".gpkg": "shapefile",
+    ".parquet": "parquet",
+}
+
+# Options of a source that are not passed on to its reader
+_SOURCE_OPTIONS = ["path", "name", "reader"]
+
+
+def read_many(
+    sources: Union[str, List[Union[str, Dict[str, Any]]]],
+    spatial_columns: Optional[Union[str, List[str]]] = None,
+    temporal_columns: Optional[Union[str, List[str]]] = None,
+    spatial_type: str = "auto",
+    temporal_format: str = "auto",
+    crs: str = "EPSG:4326",
+    n_jobs: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    source_column: str = "source",
+    **kwargs
+) -> gpd.GeoDataFrame:
+    """
+    Read and index many sources concurrently into one GeoDataFrame.
+
+    Every source is read and indexed on its own in a pool of worker
+    processes. The results are reprojected to a common CRS, their time
+    columns are made comparable, and they are concatenated with the union
+    of their columns.
+
+    Parameters
+    ----------
+    sources : str or list
+        Glob pattern of the files to read, or a list of paths, glob patterns
+        and per-source dicts. A dict holds the ``path`` of the source and
+        optionally its ``name``, its ``reader`` ("csv", "excel", "json",
+        "shapefile" or "parquet"; detected from the extension by default)
+        and any option of the reader, e.g. its own ``spatial_columns`` and
+        ``temporal_columns``, overriding the shared options.
+    spatial_columns : str or list of str, optional
+        Column name(s) containing spatial information, for sources that do
+        not set their own
+    temporal_columns : str or list of str, optional
+        Column name(s) containing temporal information, for sources that do
+        not set their own
+    spatial_type : str, default "auto"
+        Type of spatial data. Options: "auto", "point", "polygon", "address", "code"
+    temporal_format : str, default "auto"
+        Format of temporal data. Options: "auto", "iso", "timestamp", "custom"
+    crs : str, default "EPSG:4326"
+        Coordinate reference system of the result; sources in another CRS
+        are reprojected
+    n_jobs : int, optional
+        Number of worker processes; 1 reads the sources one by one in the
+        calling process. Defaults to the number of CPUs.
+    executor : Executor, optional
+        Executor to read the sources on, e.g. a ``ThreadPoolExecutor`` for
+        sources behind slow network I/O
+    source_column : str, default "source"
+        Name of the categorical column holding the source of every row
+    **kwargs
+        Additional arguments to pass to every reader
+
+    Returns
+    -------
+    GeoDataFrame
+        Indexed rows of all sources, in source order
+
+    Notes
+    -----
+    When sources mix timezone-aware times of different zones or naive ones,
+    naive times are taken as UTC and all times are converted to UTC.
+
+    Examples
+    --------
+    >>> data = ag.read_many(
+    ...     ["daily/*.csv", {"path": "extra.xlsx", "spatial_columns": "address"}],
+    ...     spatial_columns=["latitude", "longitude"],
+    ...     temporal_columns="timestamp",
+    ... )
+    """
+    defaults = dict(
+        spatial_columns=spatial_columns, temporal_columns=temporal_columns,
+        spatial_type=spatial_type, temporal_format=temporal_format, crs=crs, **kwargs
+    )
+    specs = [{**defaults, **spec} for spec in _expand_sources(sources)]
+    if not specs:
+        raise ValueError(f"No sources found for {sources!r}")
+
+    names = [spec.get("name") or os.path.basename(spec["path"]) for spec in specs]
+    if len(set(names)) < len(names):
+        # Fall back to full paths when file names repeat across directories
+        names = [spec.get("name") or spec["path"] for spec in specs]
+    if len(set(names)) < len(names):
+        raise ValueError("Source names must be unique")
+
+    if n_jobs is None or n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    if n_jobs < 1:
+        raise ValueError("n_jobs must be a positive number of jobs or -1")
+
+    targets = [crs] * len(specs)
+    if executor is not None:
+        frames = list(executor.map(_read_source, specs, targets))
+    elif n_jobs == 1 or len(specs) == 1:
+        frames = [_read_source(spec, crs) for spec in specs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(specs))) as pool:
+            frames = list(pool.map(_read_source, specs, targets))
+
+    return _concat_sources(frames, names, crs, source_column)
+
+
+def _expand_sources(sources: Union[str, List[Union[str, Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+    """
+    Expand glob patterns into one spec per file.
+    """
+    if isinstance(sources, (str, dict)):
+        sources = [sources]
+    specs = []
+    for source in sources:
+        spec = dict(source) if isinstance(source, dict) else {"path": source}
+        if "path" not in spec:
+            raise ValueError("Every source dict needs a 'path'")
+        is_pattern = any(char in spec["path"] for char in "*?[")
+        paths = sorted(glob.glob(spec["path"])) if is_pattern else [spec["path"]]
+        if len(paths) > 1 and spec.get("name"):
+            raise ValueError(f"A name cannot be given to the glob pattern {spec['path']!r}")
+        specs.extend({**spec, "path": path} for path in paths)
+    return specs
+
+
+def _read_source(spec: Dict[str, Any], target_crs: Optional[str]) -> gpd.GeoDataFrame:
+    """
+    Read and index one source and bring it to the target CRS.
+    """
+    from aggrada.readers import read_csv, read_excel, read_json, read_shapefile, read_parquet
+    from aggrada.core import index
+
+    path = spec["path"]
+    reader = spec.get("reader") or _READERS.get(os.path.splitext(path)[1].lower())
+    if reader is None:
+        raise ValueError(f"Cannot detect the reader of {path}; give it as 'reader' in the source dict")
+    options = {key: value for key, value in spec.items() if key not in _SOURCE_OPTIONS}
+    crs = options["crs"]
+    spatial, temporal = options["spatial_columns"], options["temporal_columns"]
+
+    if reader in ["csv", "excel", "json"]:
+        read = {"csv": read_csv, "excel": read_excel, "json": read_json}[reader]
+        data = read(path, index_data=True, **options)
+    elif reader == "shapefile":
+        for key in ["spatial_columns", "spatial_type", "crs"]:
+            options.pop(key)
+        data = read_shapefile(path, index_data=True, **options)
+    elif reader == "parquet":
+        for key in ["spatial_columns", "temporal_columns", "spatial_type", "temporal_format", "crs"]:
+            options.pop(key)
+        data = read_parquet(path, **options)
+        if "time_start" not in data.columns and spatial and temporal:
+            data = index(data, spatial, temporal, spec["spatial_type"], spec["temporal_format"], crs)
+    else:
+        raise ValueError(f"Unsupported reader: {reader}")
+
+    if not isinstance(data, gpd.GeoDataFrame) or "time_start" not in data.columns:
+        raise ValueError(f"Source {path} was not indexed; give its spatial_columns and temporal_columns")
+    if target_crs is not None and data.crs is not None and not data.crs.equals(target_crs):
+        data = data.to_crs(target_crs)
+    return data
+
+
+def _concat_sources(
+    frames: List[gpd.GeoDataFrame],
+    names: List[str],
+    crs: str,
+    source_column: str
+) -> gpd.GeoDataFrame:
+    """
+    Concatenate indexed sources with the union of their columns and a source column.
+    """
+    time_columns = ["time_start", "time_end"]
+    dtypes = [frame[col].dtype for frame in frames for col in time_columns]
+    if any(getattr(dtype, "tz", None) is not None for dtype in dtypes) and len(set(map(str, dtypes))) > 1:
+        for i, frame in enumerate(frames):
+            frame = frame.copy(deep=False)
+            for col in time_columns:
+                times = frame[col]
+                frame[col] = times.dt.tz_convert("UTC") if times.dt.tz is not None else times.dt.tz_localize("UTC")
+            frames[i] = frame
+
+    frames = [frame.rename_geometry("geometry") if frame.geometry.name != "geometry" else frame for frame in frames]
+    result = pd.concat(frames, ignore_index=True)
+    codes = np.repeat(np.arange(len(frames)), [len(frame) for frame in frames])
+    result[source_column] = pd.Categorical.from_codes(codes, categories=names)
+    return gpd.GeoDataFrame(result, geometry="geometry", crs=crs if crs is not None else frames[0].crs)
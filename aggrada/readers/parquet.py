@@ -0,0 +1,210 @@
+"""
+Parquet reader module for the Aggrada package.
+
+This module provides functions for reading and writing indexed data as
+GeoParquet, so that indexing does not have to be repeated on every load.
+"""
+
+import pandas as pd
+import geopandas as gpd
+from typing import Union, Optional, Dict, Any, List, Tuple
+import numpy as np
+import shapely
+
+
+# Rows per Parquet row group written by to_parquet
+ROW_GROUP_SIZE = 100_000
+
+# Indexed columns always read along with a column projection
+_INDEX_COLUMNS = ["geometry", "time_start", "time_end"]
+
+
+def read_parquet(
+    path: str,
+    columns: Optional[List[str]] = None,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+    time_range: Optional[Tuple[Any, Any]] = None,
+    **kwargs
+) -> Union[pd.DataFrame, gpd.GeoDataFrame]:
+    """
+    Read a (Geo)Parquet file or directory of files.
+
+    Only the requested columns are read, and row groups whose statistics
+    show they hold no row in the bounding box or time range are skipped.
+
+    Parameters
+    ----------
+    path : str
+        Path to the Parquet file or directory
+    columns : list of str, optional
+        Columns to read. The geometry, time_start and time_end columns of
+        indexed data are always read.
+    bbox : tuple of float, optional
+        ``(minx, miny, maxx, maxy)``; keep only rows whose geometry bounds
+        intersect the box. Uses the bbox covering columns written by
+        :func:`to_parquet`.
+    time_range : tuple, optional
+        ``(start, end)``; keep only rows with ``start <= time_start < end``.
+        Either bound may be None.
+    **kwargs
+        Additional arguments to pass to geopandas.read_parquet() (or
+        pandas.read_parquet() for files without geometry), e.g. ``filters``
+
+    Returns
+    -------
+    GeoDataFrame or DataFrame
+        Data from the file; a GeoDataFrame if it holds GeoParquet geometry
+    """
+    dataset = _import_pyarrow_dataset()
+    schema = dataset.dataset(path, format="parquet").schema
+    is_geo = schema.metadata is not None and b"geo" in schema.metadata
+
+    if columns is not None:
+        columns = list(dict.fromkeys(
+            list(columns) + [col for col in _INDEX_COLUMNS if col in schema.names and col not in columns]
+        ))
+
+    filters = kwargs.pop("filters", None)
+    if time_range is not None:
+        time_filter = _time_filter(schema, time_range)
+        if filters is not None:
+            import pyarrow.parquet as pq
+            filters = pq.filters_to_expression(filters) & time_filter
+        else:
+            filters = time_filter
+
+    if is_geo:
+        return gpd.read_parquet(path, columns=columns, bbox=bbox, filters=filters, **kwargs)
+    if bbox is not None:
+        raise ValueError("bbox filtering requires a GeoParquet file")
+    return pd.read_parquet(path, columns=columns, filters=filters, **kwargs)
+
+
+def to_parquet(
+    data: gpd.GeoDataFrame,
+    path: str,
+    row_group_size: int = ROW_GROUP_SIZE,
+    sort: bool = True,
+    **kwargs
+) -> None:
+    """
+    Write indexed data as GeoParquet.
+
+    The geometry is stored as WKB with bbox covering columns, and
+    time_start/time_end as timestamps. Every row group gets min/max
+    statistics, which :func:`read_parquet` uses to skip row groups.
+
+    Parameters
+    ----------
+    data : GeoDataFrame
+        Indexed data with geometry and temporal_range columns
+    path : str
+        Path of the Parquet file
+    row_group_size : int, default 100000
+        Maximum number of rows per row group
+    sort : bool, default True
+        Whether to order the rows by day and then along a Z-order curve over
+        their location, so that every row group covers a short time span
+        and a compact area and can be skipped by time and bbox filters
+    **kwargs
+        Additional arguments to pass to geopandas.GeoDataFrame.to_parquet().
+        The index is not written unless ``index=True`` is given.
+    """
+    _import_pyarrow_dataset()
+    if not isinstance(data, gpd.GeoDataFrame):
+        raise TypeError("Data must be a GeoDataFrame; index it with aggrada.index() first")
+
+    if sort and len(data) > 0:
+        data = data.take(_sort_order(data))
+
+    kwargs.setdefault("index", False)
+    data.to_parquet(
+        path,
+        write_covering_bbox=True,
+        schema_version="1.1.0",
+        row_group_size=row_group_size,
+        **kwargs
+    )
+
+
+def _import_pyarrow_dataset() -> Any:
+    """
+    Import pyarrow.dataset, with a helpful error when pyarrow is missing.
+    """
+    try:
+        import pyarrow.dataset as dataset
+    except ImportError:
+        raise ImportError(
+            "Parquet support requires pyarrow. Install it with: pip install aggrada[parquet]"
+        )
+    return dataset
+
+
+def _time_filter(schema: Any, time_range: Tuple[Any, Any]) -> Any:
+    """
+    Build a pyarrow filter expression on time_start.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as dataset
+
+    if "time_start" not in schema.names:
+        raise ValueError("time_range filtering requires a time_start column")
+    field_type = schema.field("time_start").type
+    time_start = dataset.field("time_start")
+
+    def bound(value):
+        value = pd.Timestamp(value)
+        tz = getattr(field_type, "tz", None)
+        if tz is not None and value.tz is None:
+            value = value.tz_localize(tz)
+        elif tz is None and value.tz is not None:
+            value = value.tz_localize(None)
+        return pa.scalar(value, type=field_type)
+
+    start, end = time_range
+    expression = None
+    if start is not None:
+        expression = time_start >= bound(start)
+    if end is not None:
+        upper = time_start < bound(end)
+        expression = upper if expression is None else expression & upper
+    return expression if expression is not None else dataset.scalar(True)
+
+
+def _sort_order(data: gpd.GeoDataFrame) -> np.ndarray:
+    """
+    Order rows by day of time_start, then by the Z-order of their bounds center.
+    """
+    bounds = shapely.bounds(np.asarray(data.geometry.values))
+    x = (bounds[:, 0] + bounds[:, 2]) / 2
+    y = (bounds[:, 1] + bounds[:, 3]) / 2
+    keys = [_z_order(x, y)]
+    if "time_start" in data.columns:
+        times = data["time_start"]
+        if getattr(times.dt, "tz", None) is not None:
+            times = times.dt.tz_localize(None)
+        days = times.to_numpy().astype("datetime64[D]").astype(np.int64)
+        keys.append(days)
+    return np.lexsort(keys)
+
+
+def _z_order(x: np.ndarray, y: np.ndarray, bits: int = 16) -> np.ndarray:
+    """
+    Z-order (Morton) code of coordinates on a 2**bits grid over their extent.
+    """
+    def scale(values):
+        with np.errstate(invalid="ignore"):
+            low, high = np.nanmin(values), np.nanmax(values)
+        span = high - low if np.isfinite(high - low) and high > low else 1.0
+        cells = np.nan_to_num((values - low) / span * (2 ** bits - 1), nan=0.0)
+        return cells.astype(np.uint64)
+
+    def spread(v):
+        # Insert a zero bit between each of the lower 16 bits
+        v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF)
+        v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F)
+        v = (v | (v << np.uint64(2))) & np.uint64(0x33333333)
+        v = (v | (v << np.uint64(1))) & np.uint64(0x55555555)
+        return v
+
+    return spread(scale(x)) | (spread(scale(y)) << np.uint64(1))
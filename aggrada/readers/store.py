@@ -0,0 +1,333 @@
+"""
+Partitioned dataset store module for the Aggrada package.
+
+This module provides a persistent store of indexed data partitioned by
+period and spatial tile in a Hive-style directory layout, e.g.
+``year=2024/month=05/tile=12_7/part-<id>.parquet``.
+"""
+
+import os
+import json
+import uuid
+import pandas as pd
+import geopandas as gpd
+from typing import Union, Optional, Dict, Any, List, Tuple
+import numpy as np
+import shapely
+
+from aggrada.readers.parquet import read_parquet, to_parquet
+
+
+# Settings file kept at the root of every store
+_SETTINGS_FILE = "_aggrada_store.json"
+
+# Partition value for rows without a time or a location
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+# Partition levels of each temporal granularity
+_PARTITION_LEVELS = {
+    "year": ["year"],
+    "month": ["year", "month"],
+    "day": ["year", "month", "day"],
+}
+
+
+class DatasetStore:
+    """
+    Indexed data stored as Parquet files partitioned by period and tile.
+
+    Every row goes to the partition of the period of its time_start and of
+    the square tile holding the center of its bounds. Queries only open the
+    partitions that can hold rows in the requested time range and bounding
+    box, and filter rows inside them with the Parquet row-group statistics.
+
+    Parameters
+    ----------
+    root : str
+        Directory of the store; created on first append
+    temporal_granularity : str, default "month"
+        Period of the time partitions: "year", "month" or "day"
+    tile_size : float, default 1.0
+        Size of the square spatial tiles, in CRS units
+
+    Notes
+    -----
+    The partitioning of an existing store is read from its settings file and
+    must match the given options.
+
+    Examples
+    --------
+    >>> store = DatasetStore("archive", temporal_granularity="month", tile_size=1.0)
+    >>> store.append(ag.index(batch, ["latitude", "longitude"], "timestamp"))
+    >>> one_year = store.query(time_range=("2024-01-01", "2025-01-01"), bbox=(-47, -24, -46, -23))
+    >>> aggregated = ag.aggregate(one_year, "grid", "month", {"value": "mean"})
+    """
+
+    def __init__(
+        self,
+        root: str,
+        temporal_granularity: str = "month",
+        tile_size: float = 1.0
+    ):
+        temporal_granularity = temporal_granularity.lower()
+        if temporal_granularity not in _PARTITION_LEVELS:
+            raise ValueError(
+                f"Unsupported partition granularity: {temporal_granularity}. "
+                f"Options are: {', '.join(_PARTITION_LEVELS)}"
+            )
+        if tile_size <= 0:
+            raise ValueError("tile_size must be positive")
+
+        self.root = root
+        self.temporal_granularity = temporal_granularity
+        self.tile_size = float(tile_size)
+        self.crs = None
+        # Largest distance from a geometry's bounds center to its bounds edge
+        self.max_extent = 0.0
+
+        settings_path = os.path.join(root, _SETTINGS_FILE)
+        if os.path.exists(settings_path):
+            with open(settings_path) as f:
+                settings = json.load(f)
+            if (settings["temporal_granularity"], settings["tile_size"]) != (temporal_granularity, self.tile_size):
+                raise ValueError(
+                    f"Store at {root} is partitioned by {settings['temporal_granularity']} "
+                    f"and tile_size {settings['tile_size']}"
+                )
+            self.crs = settings.get("crs")
+            self.max_extent = settings.get("max_extent", 0.0)
+
+    @classmethod
+    def open(cls, root: str) -> "DatasetStore":
+        """
+        Open an existing store with its own partitioning.
+
+        Parameters
+        ----------
+        root : str
+            Directory of the store
+
+        Returns
+        -------
+        DatasetStore
+            The store
+        """
+        with open(os.path.join(root, _SETTINGS_FILE)) as f:
+            settings = json.load(f)
+        return cls(root, settings["temporal_granularity"], settings["tile_size"])
+
+    def append(self, data: gpd.GeoDataFrame) -> List[str]:
+        """
+        Write a batch of indexed data into its partitions.
+
+        Every touched partition gets one new file; existing files are never
+        rewritten.
+
+        Parameters
+        ----------
+        data : GeoDataFrame
+            Indexed data with geometry and temporal_range columns
+
+        Returns
+        -------
+        list of str
+            Paths of the written files
+        """
+        if not isinstance(data, gpd.GeoDataFrame) or "time_start" not in data.columns:
+            raise ValueError("Data must be indexed, with geometry and time_start/time_end columns")
+        if len(data) == 0:
+            return []
+        crs = data.crs.to_string() if data.crs is not None else None
+        if self.crs is not None and crs != self.crs:
+            raise ValueError(f"Data CRS {crs} does not match the store CRS {self.crs}")
+
+        # Partition key of every row
+        bounds = shapely.bounds(np.asarray(data.geometry.values))
+        keys = self._period_keys(data["time_start"])
+        keys["tile"] = self._tile_keys(bounds)
+        groups = pd.DataFrame(keys).groupby(list(keys), sort=True).indices
+
+        written = []
+        batch_id = uuid.uuid4().hex
+        for values, positions in groups.items():
+            directory = os.path.join(self.root, *(f"{name}={value}" for name, value in zip(keys, values)))
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part-{batch_id}.parquet")
+            to_parquet(data.iloc[positions], path)
+            written.append(path)
+
+        with np.errstate(invalid="ignore"):
+            extent = np.nanmax(np.maximum(bounds[:, 2] - bounds[:, 0], bounds[:, 3] - bounds[:, 1])) / 2
+        self.crs = crs
+        self.max_extent = max(self.max_extent, float(extent) if np.isfinite(extent) else 0.0)
+        self._write_settings()
+        return written
+
+    def partitions(
+        self,
+        time_range: Optional[Tuple[Any, Any]] = None,
+        bbox: Optional[Tuple[float, float, float, float]] = None
+    ) -> List[str]:
+        """
+        List the partition directories that can hold rows matching the filters.
+
+        Parameters
+        ----------
+        time_range : tuple, optional
+            ``(start, end)`` timestamps, as in :meth:`query`
+        bbox : tuple of float, optional
+            ``(minx, miny, maxx, maxy)``, as in :meth:`query`
+
+        Returns
+        -------
+        list of str
+            Partition directories, in path order
+        """
+        if not os.path.isdir(self.root):
+            return []
+        levels = _PARTITION_LEVELS[self.temporal_granularity] + ["tile"]
+        directories = [(self.root, {})]
+        for level in levels:
+            found = []
+            for directory, values in directories:
+                for name in sorted(os.listdir(directory)):
+                    prefix = f"{level}="
+                    path = os.path.join(directory, name)
+                    if name.startswith(prefix) and os.path.isdir(path):
+                        found.append((path, {**values, level: name[len(prefix):]}))
+            directories = [
+                (path, values) for path, values in found
+                if self._keep_partition(values, level, time_range, bbox)
+            ]
+        return [path for path, _ in directories]
+
+    def query(
+        self,
+        time_range: Optional[Tuple[Any, Any]] = None,
+        bbox: Optional[Tuple[float, float, float, float]] = None,
+        columns: Optional[List[str]] = None
+    ) -> gpd.GeoDataFrame:
+        """
+        Read the rows in a time range and bounding box.
+
+        Parameters
+        ----------
+        time_range : tuple, optional
+            ``(start, end)``; rows with ``start <= time_start < end`` are
+            read. Either bound may be None.
+        bbox : tuple of float, optional
+            ``(minx, miny, maxx, maxy)``; rows whose geometry bounds
+            intersect the box are read
+        columns : list of str, optional
+            Columns to read besides geometry, time_start and time_end
+
+        Returns
+        -------
+        GeoDataFrame
+            The matching rows
+        """
+        parts = [
+            read_parquet(path, columns=columns, bbox=bbox, time_range=time_range)
+            for path in self.partitions(time_range, bbox)
+        ]
+        parts = [part for part in parts if len(part) > 0] or parts[:1]
+        if not parts:
+            return gpd.GeoDataFrame(columns=["geometry", "time_start", "time_end"], geometry="geometry", crs=self.crs)
+        if len(parts) == 1:
+            return parts[0]
+        return gpd.GeoDataFrame(pd.concat(parts, ignore_index=True), geometry="geometry", crs=parts[0].crs)
+
+    def _period_keys(self, times: pd.Series) -> Dict[str, np.ndarray]:
+        """
+        Partition values of the period of every time.
+        """
+        if getattr(times.dt, "tz", None) is not None:
+            times = times.dt.tz_localize(None)
+        missing = times.isna().to_numpy()
+        keys = {}
+        for level in _PARTITION_LEVELS[self.temporal_granularity]:
+            if level == "year":
+                values = times.dt.year.to_numpy(dtype=float, na_value=np.nan)
+                labels = np.char.mod("%04d", np.nan_to_num(values).astype(np.int64))
+            else:
+                values = getattr(times.dt, level).to_numpy(dtype=float, na_value=np.nan)
+                labels = np.char.mod("%02d", np.nan_to_num(values).astype(np.int64))
+            keys[level] = np.where(missing, NULL_PARTITION, labels).astype(object)
+        return keys
+
+    def _tile_keys(self, bounds: np.ndarray) -> np.ndarray:
+        """
+        Partition values of the tile holding the center of every bounds.
+        """
+        with np.errstate(invalid="ignore"):
+            tx = np.floor((bounds[:, 0] + bounds[:, 2]) / 2 / self.tile_size)
+            ty = np.floor((bounds[:, 1] + bounds[:, 3]) / 2 / self.tile_size)
+        missing = ~(np.isfinite(tx) & np.isfinite(ty))
+        tx = np.nan_to_num(tx).astype(np.int64).astype(str)
+        ty = np.nan_to_num(ty).astype(np.int64).astype(str)
+        labels = np.char.add(np.char.add(tx, "_"), ty)
+        return np.where(missing, NULL_PARTITION, labels).astype(object)
+
+    def _keep_partition(
+        self,
+        values: Dict[str, str],
+        level: str,
+        time_range: Optional[Tuple[Any, Any]],
+        bbox: Optional[Tuple[float, float, float, float]]
+    ) -> bool:
+        """
+        Check whether a partition can hold rows matching the filters.
+        """
+        value = values[level]
+        if level == "tile":
+            if bbox is None:
+                return True
+            if value == NULL_PARTITION:
+                return False
+            tx, ty = (int(v) for v in value.split("_"))
+            # Rows are tiled by their bounds center, which lies within max_extent of the box
+            minx, miny, maxx, maxy = bbox
+            grow = self.max_extent
+            return (
+                (tx + 1) * self.tile_size >= minx - grow and tx * self.tile_size <= maxx + grow
+                and (ty + 1) * self.tile_size >= miny - grow and ty * self.tile_size <= maxy + grow
+            )
+
+        if time_range is None:
+            return True
+        if value == NULL_PARTITION:
+            return False
+        # Period covered by the partition at this level
+        year = int(values["year"])
+        month = int(values.get("month", 1))
+        day = int(values.get("day", 1))
+        start = pd.Timestamp(year=year, month=month, day=day)
+        end = start + {"year": pd.DateOffset(years=1), "month": pd.DateOffset(months=1),
+                       "day": pd.DateOffset(days=1)}[level]
+        low, high = time_range
+        if low is not None and end <= _naive(low):
+            return False
+        if high is not None and start >= _naive(high):
+            return False
+        return True
+
+    def _write_settings(self) -> None:
+        """
+        Save the partitioning settings at the root of the store.
+        """
+        settings = {
+            "temporal_granularity": self.temporal_granularity,
+            "tile_size": self.tile_size,
+            "crs": self.crs,
+            "max_extent": self.max_extent,
+        }
+        with open(os.path.join(self.root, _SETTINGS_FILE), "w") as f:
+            json.dump(settings, f, indent=2)
+
+
+def _naive(value: Any) -> pd.Timestamp:
+    """
+    Convert a time bound to a naive Timestamp on local wall time.
+    """
+    value = pd.Timestamp(value)
+    return value.tz_localize(None) if value.tz is not None else value
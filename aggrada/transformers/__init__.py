@@ -5,7 +5,8 @@ This module provides functions for transforming data.
 """
 
 from aggrada.transformers.spatial import create_geometry
-from aggrada.transformers.temporal import create_temporal_range
+from aggrada.transformers.temporal import create_temporal_range, parse_times
 from aggrada.transformers.flatten import flatten_object
+from aggrada.transformers.filters import filter_data, filter_coordinates
 
-__all__ = ["create_geometry", "create_temporal_range", "flatten_object"]
+__all__ = ["create_geometry", "create_temporal_range", "parse_times", "flatten_object", "filter_data", "filter_coordinates"]
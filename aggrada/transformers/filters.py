@@ -0,0 +1,119 @@
+"""
+Filter transformer module for the Aggrada package.
+
+This module provides functions for selecting indexed rows by time range
+and bounding box.
+"""
+
+import pandas as pd
+import geopandas as gpd
+from typing import Union, Dict, List, Optional, Tuple, Any
+import numpy as np
+import shapely
+
+
+def filter_data(
+    data: gpd.GeoDataFrame,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+    time_range: Optional[Tuple[Any, Any]] = None
+) -> gpd.GeoDataFrame:
+    """
+    Keep the indexed rows inside a bounding box and a time range.
+
+    Parameters
+    ----------
+    data : GeoDataFrame
+        Indexed data with geometry and temporal_range columns
+    bbox : tuple of float, optional
+        ``(minx, miny, maxx, maxy)`` in the CRS of the data. Rows whose
+        geometry intersects the box are kept.
+    time_range : tuple, optional
+        ``(start, end)`` timestamps; rows with ``start <= time_start < end``
+        are kept. Either bound may be None.
+
+    Returns
+    -------
+    GeoDataFrame
+        The matching rows
+    """
+    mask = np.ones(len(data), dtype=bool)
+
+    if bbox is not None:
+        box = shapely.box(*bbox)
+        shapely.prepare(box)
+        mask &= shapely.intersects(box, np.asarray(data.geometry.values))
+
+    if time_range is not None:
+        if "time_start" not in data.columns:
+            raise ValueError("Data must have time_start and time_end columns")
+        start, end = time_range
+        times = data["time_start"]
+        if start is not None:
+            mask &= (times >= _as_timestamp(start, times)).to_numpy(dtype=bool, na_value=False)
+        if end is not None:
+            mask &= (times < _as_timestamp(end, times)).to_numpy(dtype=bool, na_value=False)
+
+    if mask.all():
+        return data
+    return data[mask]
+
+
+def filter_coordinates(
+    data: pd.DataFrame,
+    spatial_column: Union[str, List[str]],
+    bbox: Tuple[float, float, float, float],
+    spatial_type: str = "auto"
+) -> pd.DataFrame:
+    """
+    Keep the raw rows whose coordinates fall in a bounding box, before indexing.
+
+    Point geometry is expensive to build, so filtering latitude/longitude
+    columns first avoids building it for rows that would be dropped. Data
+    that does not hold point coordinates in separate columns is returned
+    unchanged; use :func:`filter_data` after indexing for it.
+
+    Parameters
+    ----------
+    data : DataFrame
+        Raw data, before :func:`aggrada.index`
+    spatial_column : str or list of str
+        Column name(s) containing spatial information, as passed to ``index``
+    bbox : tuple of float
+        ``(minx, miny, maxx, maxy)`` in longitude/latitude (or x/y) units
+    spatial_type : str, default "auto"
+        Type of spatial data, as passed to ``index``
+
+    Returns
+    -------
+    DataFrame
+        Rows inside the box (bounds included)
+    """
+    from aggrada.transformers.spatial import _coordinate_columns, _detect_spatial_type
+
+    columns = [spatial_column] if isinstance(spatial_column, str) else list(spatial_column)
+    if isinstance(data, gpd.GeoDataFrame):
+        return data
+    if spatial_type == "auto":
+        spatial_type = _detect_spatial_type(data, columns)
+    lat_col, lon_col = _coordinate_columns(columns)
+    if spatial_type != "point" or lat_col not in data.columns or lon_col not in data.columns:
+        return data
+
+    minx, miny, maxx, maxy = bbox
+    x = pd.to_numeric(data[lon_col], errors="coerce").to_numpy(dtype=float)
+    y = pd.to_numeric(data[lat_col], errors="coerce").to_numpy(dtype=float)
+    mask = (x >= minx) & (x <= maxx) & (y >= miny) & (y <= maxy)
+    if mask.all():
+        return data
+    return data[mask]
+
+
+def _as_timestamp(value: Any, times: pd.Series) -> pd.Timestamp:
+    """
+    Convert a time bound to a Timestamp comparable with the time column.
+    """
+    value = pd.Timestamp(value)
+    tz = getattr(times.dt, "tz", None)
+    if tz is not None and value.tz is None:
+        return value.tz_localize(tz)
+    return value
@@ -5,7 +5,13 @@ This module provides functions for flattening nested data structures.
 """
 
 import pandas as pd
-from typing import Dict, Any, List, Union
+import numpy as np
+from collections import Counter
+from typing import Dict, Any, List, Union, Optional, Tuple, Callable
+
+
+# Records sampled to infer the nested structure of a column
+SAMPLE_SIZE = 1000
 
 
 def flatten_object(
@@ -30,34 +36,43 @@ def flatten_object(
     dict
         Flattened dictionary
     """
-    items = []
+    flat = {}
+    _flatten_into(obj, parent_key, separator, flat)
+    return flat
+
+
+def _flatten_into(obj: Dict[str, Any], parent_key: str, separator: str, flat: Dict[str, Any]) -> None:
+    """
+    Write the flattened items of a nested dictionary into ``flat``.
+    """
     for key, value in obj.items():
         new_key = f"{parent_key}{separator}{key}" if parent_key else key
-        
+
         if isinstance(value, dict):
-            items.extend(flatten_object(value, new_key, separator).items())
-        elif isinstance(value, list):
-            if len(value) > 0 and isinstance(value[0], dict):
-                # Handle list of dictionaries
-                for i, item in enumerate(value):
-                    items.extend(flatten_object(item, f"{new_key}{separator}{i}", separator).items())
-            else:
-                # Handle simple lists
-                items.append((new_key, value))
+            _flatten_into(value, new_key, separator, flat)
+        elif isinstance(value, list) and len(value) > 0 and isinstance(value[0], dict):
+            # Handle list of dictionaries
+            for i, item in enumerate(value):
+                _flatten_into(item, f"{new_key}{separator}{i}", separator, flat)
         else:
-            items.append((new_key, value))
-    
-    return dict(items)
+            # Handle values and simple lists
+            flat[new_key] = value
 
 
 def flatten_dataframe(
     df: pd.DataFrame,
     columns: Union[str, List[str]] = None,
-    separator: str = '_'
+    separator: str = '_',
+    sample_size: int = SAMPLE_SIZE
 ) -> pd.DataFrame:
     """
     Flatten nested columns in a DataFrame.
 
+    The nested structure of each column is inferred from a sample of its
+    records and compiled into an extractor that reads every key path of a
+    record directly into the output columns. Records with another
+    structure are flattened one by one with :func:`flatten_object`.
+
     Parameters
     ----------
     df : DataFrame
@@ -67,6 +82,8 @@ def flatten_dataframe(
         If None, all object columns will be checked.
     separator : str, default '_'
         The separator to use between keys
+    sample_size : int, default 1000
+        Number of records sampled to infer the structure of a column
 
     Returns
     -------
@@ -75,30 +92,204 @@ def flatten_dataframe(
     """
     # Make a copy to avoid modifying the original
     result = df.copy()
-    
+
     # If columns not specified, check all object columns
     if columns is None:
         columns = result.select_dtypes(include=['object']).columns.tolist()
     elif isinstance(columns, str):
         columns = [columns]
-    
+
     # Process each column
     for col in columns:
         if col not in result.columns:
             continue
-        
+
         # Check if column contains dictionaries
-        if result[col].apply(lambda x: isinstance(x, dict)).any():
-            # Flatten each dictionary in the column
-            flattened = result[col].apply(lambda x: flatten_object(x, '', separator) if isinstance(x, dict) else {})
-            
-            # Convert to DataFrame and join with original
-            flat_df = pd.json_normalize(flattened.tolist())
-            
+        records = result[col].tolist()
+        if any(isinstance(record, dict) for record in records):
+            flat_df = _flatten_records(records, separator, sample_size)
+            flat_df.index = result.index
+
             # Rename columns to include original column name
             flat_df.columns = [f"{col}{separator}{c}" for c in flat_df.columns]
-            
+
             # Join with original DataFrame
             result = pd.concat([result.drop(columns=[col]), flat_df], axis=1)
-    
+
     return result
+
+
+def _flatten_records(records: List[Any], separator: str, sample_size: int) -> pd.DataFrame:
+    """
+    Flatten a list of nested records into a DataFrame, one row per record.
+
+    Records that are not dictionaries give rows of missing values, and keys
+    missing from a record are NaN, as in pandas.json_normalize.
+    """
+    n = len(records)
+    extract, leaves = _compile_extractor(_infer_paths(records, sample_size))
+    names = [separator.join(str(key) for key in path) for path in leaves]
+
+    # Output columns, in the order their keys first appear
+    values = {name: [np.nan] * n for name in dict.fromkeys(names)}
+    fallback_rows = []
+    extract(records, [values[name] for name in names], fallback_rows.append)
+
+    fallback_positions = {i for i, _ in fallback_rows}
+    first_match = next(
+        (i for i, record in enumerate(records) if isinstance(record, dict) and i not in fallback_positions),
+        None
+    )
+    order = {}
+    for i, record in fallback_rows:
+        if first_match is not None and first_match < i:
+            order.update(dict.fromkeys(names))
+        flat = flatten_object(record, '', separator)
+        for name, value in flat.items():
+            if name not in values:
+                values[name] = [np.nan] * n
+            values[name][i] = value
+        order.update(dict.fromkeys(flat))
+    if first_match is not None:
+        order.update(dict.fromkeys(names))
+
+    return pd.DataFrame({name: values[name] for name in order}, index=pd.RangeIndex(n))
+
+
+def _infer_paths(records: List[Any], sample_size: int) -> List[Tuple[Any, ...]]:
+    """
+    Key paths of the most common nested structure in a sample of the records.
+    """
+    structures = Counter()
+    for record in records:
+        if isinstance(record, dict):
+            structures[tuple(_record_paths(record, ()))] += 1
+            if sum(structures.values()) >= sample_size:
+                break
+    if not structures:
+        return []
+    return list(structures.most_common(1)[0][0])
+
+
+def _record_paths(obj: Dict[Any, Any], prefix: Tuple[Any, ...]) -> List[Tuple[Any, ...]]:
+    """
+    Key paths of the leaves of a nested record, as flattened by flatten_object.
+
+    Empty nested dictionaries are kept as paths ending in an empty dict marker
+    so that the structure check matches them.
+    """
+    paths = []
+    for key, value in obj.items():
+        path = prefix + (key,)
+        if isinstance(value, dict):
+            paths.extend(_record_paths(value, path) if value else [path + (_EMPTY,)])
+        elif isinstance(value, list) and len(value) > 0 and isinstance(value[0], dict):
+            for i, item in enumerate(value):
+                paths.extend(_record_paths(item, path + (_Index(i),)) if item else [path + (_Index(i), _EMPTY)])
+        else:
+            paths.append(path)
+    return paths
+
+
+class _Index(int):
+    """
+    Position in a list of dictionaries within a key path.
+    """
+
+
+class _Empty:
+    """
+    Marker of an empty nested dictionary within a key path.
+    """
+
+    def __repr__(self) -> str:
+        return "_EMPTY"
+
+
+_EMPTY = _Empty()
+
+
+class _Mismatch(Exception):
+    """
+    Raised by a compiled extractor for a record with another structure.
+    """
+
+
+def _compile_extractor(paths: List[Tuple[Any, ...]]) -> Tuple[Callable, List[Tuple[Any, ...]]]:
+    """
+    Compile key paths into a function extracting them from a list of records.
+
+    Returns the function and the paths of the leaves it extracts. The
+    function ``extract(records, columns, fallback)`` writes the value at the
+    i-th leaf of every matching record into ``columns[i]`` and
+    calls ``fallback((position, record))`` for the dictionaries with another
+    structure: missing or extra keys, or nested values where a leaf is
+    expected.
+    """
+    # Tree of the nested structure: node path -> child keys, in order
+    children: Dict[Tuple[Any, ...], Dict[Any, None]] = {(): {}}
+    leaves = []
+    for path in paths:
+        if path[-1] is _EMPTY:
+            path = path[:-1]
+            for depth in range(len(path)):
+                children.setdefault(path[:depth], {})[path[depth]] = None
+            children.setdefault(path, {})
+            continue
+        for depth in range(len(path) - 1):
+            children.setdefault(path[:depth], {})[path[depth]] = None
+            children.setdefault(path[:depth + 1], {})
+        children[path[:-1]][path[-1]] = None
+        leaves.append(path)
+
+    # Every nested node is looked up once from its parent's slot and checked
+    # for shape: (parent slot, key, type, number of keys), parents first
+    slots = {(): 0}
+    nodes = []
+
+    def slot(path):
+        if path not in slots:
+            parent = slot(path[:-1])
+            keys = children[path]
+            is_list = bool(keys) and isinstance(next(iter(keys)), _Index)
+            nodes.append((parent, _lookup_key(path[-1]), list if is_list else dict, len(keys)))
+            slots[path] = len(slots)
+        return slots[path]
+
+    for path in children:
+        if path:
+            slot(path)
+    getters = [(slot(path[:-1]), _lookup_key(path[-1])) for path in leaves]
+    n_keys = len(children[()])
+
+    def extract(records, columns, fallback):
+        for i, record in enumerate(records):
+            if not isinstance(record, dict):
+                continue
+            try:
+                if len(record) != n_keys:
+                    raise _Mismatch
+                found = [record]
+                for parent, key, kind, size in nodes:
+                    value = found[parent][key]
+                    if not isinstance(value, kind) or len(value) != size:
+                        raise _Mismatch
+                    found.append(value)
+                values = [found[parent][key] for parent, key in getters]
+                for value in values:
+                    if isinstance(value, dict) or (isinstance(value, list) and value and isinstance(value[0], dict)):
+                        raise _Mismatch
+            except (_Mismatch, KeyError, IndexError, TypeError):
+                fallback((i, record))
+                continue
+            for column, value in zip(columns, values):
+                column[i] = value
+
+    return extract, leaves
+
+
+def _lookup_key(key: Any) -> Any:
+    """
+    Key of a path step as used to index its node: list positions as plain ints.
+    """
+    return int(key) if isinstance(key, _Index) else key
@@ -10,13 +10,15 @@ from typing import Union, List, Optional, Tuple, Dict, Any
 import numpy as np
 from shapely.geometry import Point, Polygon, MultiPolygon
 import re
+from pyproj import CRS
 
 
 def create_geometry(
     data: pd.DataFrame,
     spatial_column: Union[str, List[str]],
     spatial_type: str = "auto",
-    crs: str = "EPSG:4326"
+    crs: str = "EPSG:4326",
+    copy: bool = True
 ) -> gpd.GeoDataFrame:
     """
     Create geometry from spatial column(s).
@@ -31,14 +33,18 @@ def create_geometry(
         Type of spatial data. Options: "auto", "point", "polygon", "address", "code"
     crs : str, default "EPSG:4326"
         Coordinate reference system
+    copy : bool, default True
+        Whether to copy the data. If False, the result shares the column
+        data of the input and only the geometry column is newly allocated.
+        The input itself is never modified.
 
     Returns
     -------
     GeoDataFrame
         Data with geometry column
     """
-    # Make a copy to avoid modifying the original
-    result = data.copy()
+    # Copy to avoid modifying the original; a shallow copy shares column data
+    result = data.copy(deep=copy)
     
     # Convert to list if single column
     if isinstance(spatial_column, str):
@@ -148,38 +154,54 @@ def _create_point_geometry(
             return data
     
     # Try to identify latitude and longitude columns
-    lat_col = None
-    lon_col = None
-    
-    # Check for common latitude/longitude column names
-    for col in columns:
-        col_lower = col.lower()
-        if any(term in col_lower for term in ["lat", "latitude", "y"]):
-            lat_col = col
-        elif any(term in col_lower for term in ["lon", "longitude", "lng", "x"]):
-            lon_col = col
+    lat_col, lon_col = _coordinate_columns(columns)
     
     # If lat/lon columns identified, create points
     if lat_col and lon_col and lat_col in data.columns and lon_col in data.columns:
-        geometry = [Point(xy) for xy in zip(data[lon_col], data[lat_col])]
-        return gpd.GeoDataFrame(data, geometry=geometry, crs=crs)
+        lon = pd.to_numeric(data[lon_col], errors="coerce").to_numpy(dtype=float)
+        lat = pd.to_numeric(data[lat_col], errors="coerce").to_numpy(dtype=float)
+        geometry = _points_from_coordinates(lon, lat, crs)
+        return gpd.GeoDataFrame(data, geometry=geometry, crs=crs, copy=False)
     
     # If single column with coordinate pairs, parse them
     if len(columns) == 1 and columns[0] in data.columns:
         col = columns[0]
-        if data[col].dtype == object:  # String column
-            try:
-                # Try to parse "lat,lon" format
-                coords = data[col].str.split(',', expand=True).astype(float)
-                geometry = [Point(xy) for xy in zip(coords[1], coords[0])]
-                return gpd.GeoDataFrame(data, geometry=geometry, crs=crs)
-            except:
-                pass
+        if _is_string_column(data[col]):
+            # Parse "lat,lon" format
+            lat, lon = _parse_coordinate_pairs(data[col])
+            if np.isfinite(lat).any() and np.isfinite(lon).any():
+                geometry = _points_from_coordinates(lon, lat, crs)
+                return gpd.GeoDataFrame(data, geometry=geometry, crs=crs, copy=False)
     
     # If can't create points, raise error
     raise ValueError("Could not create point geometry from the provided columns")
 
 
+def _coordinate_columns(columns: List[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Identify the latitude and longitude columns by their common names.
+    
+    Parameters
+    ----------
+    columns : list of str
+        Column names containing point information
+        
+    Returns
+    -------
+    tuple
+        Latitude and longitude column names, None where not found
+    """
+    lat_col = None
+    lon_col = None
+    for col in columns:
+        col_lower = col.lower()
+        if any(term in col_lower for term in ["lat", "latitude", "y"]):
+            lat_col = col
+        elif any(term in col_lower for term in ["lon", "longitude", "lng", "x"]):
+            lon_col = col
+    return lat_col, lon_col
+
+
 def _create_polygon_geometry(
     data: pd.DataFrame,
     columns: List[str],
@@ -210,12 +232,12 @@ def _create_polygon_geometry(
     # If single column with WKT, parse it
     if len(columns) == 1 and columns[0] in data.columns:
         col = columns[0]
-        if data[col].dtype == object:  # String column
+        if _is_string_column(data[col]):
             try:
                 # Try to parse WKT format
                 from shapely import wkt
                 geometry = data[col].apply(wkt.loads)
-                return gpd.GeoDataFrame(data, geometry=geometry, crs=crs)
+                return gpd.GeoDataFrame(data, geometry=geometry, crs=crs, copy=False)
             except:
                 pass
     
@@ -223,6 +245,91 @@ def _create_polygon_geometry(
     raise ValueError("Could not create polygon geometry from the provided columns")
 
 
+def _is_string_column(series: pd.Series) -> bool:
+    """
+    Check whether a column holds strings (object or pandas string dtype).
+    """
+    return series.dtype == object or pd.api.types.is_string_dtype(series.dtype)
+
+
+def _parse_coordinate_pairs(
+    values: pd.Series
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Parse "lat,lon" strings into latitude and longitude arrays.
+    
+    All strings are split in one vectorized pass. Values without exactly
+    two numeric parts become NaN in both arrays.
+    
+    Parameters
+    ----------
+    values : Series
+        Strings in "lat,lon" format
+        
+    Returns
+    -------
+    tuple of ndarray
+        Latitude and longitude arrays of dtype float64
+    """
+    parts = values.astype("string").str.split(",", expand=True, regex=False)
+    if parts.shape[1] < 2:
+        nan = np.full(len(values), np.nan)
+        return nan, nan.copy()
+    
+    lat = pd.to_numeric(parts[0], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    lon = pd.to_numeric(parts[1], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    # Values with a third part are not pairs
+    invalid = parts.iloc[:, 2:].notna().any(axis=1).to_numpy() | np.isnan(lat) | np.isnan(lon)
+    lat[invalid] = np.nan
+    lon[invalid] = np.nan
+    return lat, lon
+
+
+def _points_from_coordinates(
+    x: np.ndarray,
+    y: np.ndarray,
+    crs: str
+) -> gpd.array.GeometryArray:
+    """
+    Build a point geometry array directly from coordinate arrays.
+    
+    Rows with missing or non-finite coordinates (or coordinates outside
+    the valid longitude/latitude range for a geographic CRS) get a missing
+    geometry and are reported with a warning.
+    
+    Parameters
+    ----------
+    x : ndarray
+        X coordinates (longitude)
+    y : ndarray
+        Y coordinates (latitude)
+    crs : str
+        Coordinate reference system
+        
+    Returns
+    -------
+    GeometryArray
+        Point geometries
+    """
+    invalid = ~(np.isfinite(x) & np.isfinite(y))
+    if crs is not None and CRS.from_user_input(crs).is_geographic:
+        with np.errstate(invalid="ignore"):
+            invalid |= (np.abs(x) > 180) | (np.abs(y) > 90)
+    
+    geometry = gpd.points_from_xy(x, y, crs=crs)
+    
+    n_invalid = int(invalid.sum())
+    if n_invalid:
+        geometry[invalid] = None
+        import warnings
+        warnings.warn(
+            f"{n_invalid} of {len(geometry)} rows have missing or invalid coordinates; "
+            "their geometry is set to None."
+        )
+    
+    return geometry
+
+
 def _create_geometry_from_address(
     data: pd.DataFrame,
     columns: List[str],
@@ -259,7 +366,7 @@ def _create_geometry_from_address(
     
     # Create placeholder points at (0, 0)
     geometry = [Point(0, 0) for _ in range(len(data))]
-    return gpd.GeoDataFrame(data, geometry=geometry, crs=crs)
+    return gpd.GeoDataFrame(data, geometry=geometry, crs=crs, copy=False)
 
 
 def _create_geometry_from_code(
@@ -298,4 +405,4 @@ def _create_geometry_from_code(
     
     # Create placeholder points at (0, 0)
     geometry = [Point(0, 0) for _ in range(len(data))]
-    return gpd.GeoDataFrame(data, geometry=geometry, crs=crs)
+    return gpd.GeoDataFrame(data, geometry=geometry, crs=crs, copy=False)
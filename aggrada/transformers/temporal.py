@@ -4,15 +4,29 @@ Temporal transformer module for the Aggrada package.
 This module provides functions for temporal transformations.
 """
 
+import warnings
 import pandas as pd
+import numpy as np
 from typing import Union, List, Optional, Tuple, Dict, Any
 from datetime import datetime, timedelta
+from pandas.tseries.api import guess_datetime_format
+
+
+# Distinct values sampled to infer the format of a time column
+FORMAT_SAMPLE_SIZE = 100
+
+# Leading values sampled to decide whether a time column is worth factorizing
+CARDINALITY_SAMPLE_SIZE = 10_000
+
+# Largest absolute epoch value of each unit, for dates before year ~5000
+_EPOCH_UNITS = [("s", 1e11), ("ms", 1e14), ("us", 1e17), ("ns", np.inf)]
 
 
 def create_temporal_range(
     data: pd.DataFrame,
     temporal_column: Union[str, List[str]],
-    temporal_format: str = "auto"
+    temporal_format: str = "auto",
+    copy: bool = True
 ) -> pd.DataFrame:
     """
     Create temporal range from temporal column(s).
@@ -25,14 +39,18 @@ def create_temporal_range(
         Column name(s) containing temporal information
     temporal_format : str, default "auto"
         Format of temporal data. Options: "auto", "iso", "timestamp", "custom"
+    copy : bool, default True
+        Whether to copy the data. If False, the result shares the column
+        data of the input and only the time columns are newly allocated.
+        The input itself is never modified.
 
     Returns
     -------
     DataFrame
         Data with temporal_range column
     """
-    # Make a copy to avoid modifying the original
-    result = data.copy()
+    # Copy to avoid modifying the original; a shallow copy shares column data
+    result = data.copy(deep=copy)
     
     # Convert to list if single column
     if isinstance(temporal_column, str):
@@ -51,32 +69,23 @@ def create_temporal_range(
         col = temporal_column[0]
         # Try parsing as single datetime column
         try:
-            if temporal_format == "iso":
-                # Use ISO8601 format for ISO strings
-                parsed_time = pd.to_datetime(result[col], format="ISO8601")
-            else:
-                parsed_time = pd.to_datetime(result[col], format=None if temporal_format == "auto" else temporal_format)
+            parsed_time = parse_times(result[col], temporal_format)
             start_time = parsed_time
             end_time = parsed_time
         except Exception as e1:
             # Try parsing as range string (e.g., "2023-01-01/2023-01-31")
             try:
                 ranges = result[col].str.split("[/,-]", expand=True)
-                start_time = pd.to_datetime(ranges[0].str.strip())
-                end_time = pd.to_datetime(ranges[1].str.strip())
+                start_time = parse_times(ranges[0].str.strip())
+                end_time = parse_times(ranges[1].str.strip())
             except Exception as e2:
                 raise ValueError(f"Could not parse temporal column '{col}': {e1}. {e2}")
     elif len(temporal_column) == 2:
         # Assume start and end columns
         start_col, end_col = temporal_column
         try:
-            if temporal_format == "iso":
-                # Use ISO8601 format for ISO strings
-                start_time = pd.to_datetime(result[start_col], format="ISO8601")
-                end_time = pd.to_datetime(result[end_col], format="ISO8601")
-            else:
-                start_time = pd.to_datetime(result[start_col], format=None if temporal_format == "auto" else temporal_format)
-                end_time = pd.to_datetime(result[end_col], format=None if temporal_format == "auto" else temporal_format)
+            start_time = parse_times(result[start_col], temporal_format)
+            end_time = parse_times(result[end_col], temporal_format)
         except Exception as e:
             raise ValueError(f"Could not parse temporal columns '{start_col}', '{end_col}': {e}")
     else:
@@ -87,8 +96,147 @@ def create_temporal_range(
     result["time_start"] = start_time
     result["time_end"] = end_time
     
-    # Drop original temporal columns if they are not start/end
+    # Drop original temporal columns if they are not start/end.
+    # Deleting in place avoids the full copy made by DataFrame.drop.
     cols_to_drop = [col for col in temporal_column if col not in ["time_start", "time_end"]]
-    result = result.drop(columns=cols_to_drop, errors="ignore")
+    for col in cols_to_drop:
+        if col in result.columns:
+            del result[col]
     
     return result
+
+
+def parse_times(values: pd.Series, temporal_format: str = "auto") -> pd.Series:
+    """
+    Parse a column of times.
+
+    Every distinct value is parsed once and the results are broadcast back
+    to the rows, so columns with repeated values are parsed in a fraction
+    of the time. In "auto" mode the format is inferred from a sample of the
+    distinct values and applied to all of them at once.
+
+    Parameters
+    ----------
+    values : Series
+        Times as strings, numbers or datetimes
+    temporal_format : str, default "auto"
+        Format of the times: "auto", "iso", "timestamp" (seconds,
+        milliseconds, microseconds or nanoseconds since the Unix epoch,
+        detected from their magnitude) or a strftime format such as
+        ``"%d/%m/%Y %H:%M"``
+
+    Returns
+    -------
+    Series
+        Parsed times, with the index of ``values``
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    if temporal_format == "timestamp":
+        return _parse_epoch(values)
+
+    codes, uniques = _distinct_values(values)
+    if temporal_format == "iso":
+        time_format = "ISO8601"
+    elif temporal_format == "auto":
+        time_format = _infer_format(uniques)
+    else:
+        time_format = temporal_format
+
+    try:
+        parsed = pd.to_datetime(uniques, format=time_format)
+    except (ValueError, TypeError):
+        if temporal_format != "auto" or time_format is None:
+            raise
+        # The sample did not show every format; let pandas infer it again
+        parsed = pd.to_datetime(uniques, format=None)
+    if codes is None:
+        return pd.Series(pd.DatetimeIndex(parsed).array, index=values.index, name=values.name)
+    times = pd.DatetimeIndex(parsed).array.take(codes, allow_fill=True)
+    return pd.Series(times, index=values.index, name=values.name)
+
+
+def _distinct_values(values: pd.Series) -> Tuple[Optional[np.ndarray], Any]:
+    """
+    Factorize a column into codes and distinct values for parsing.
+
+    Runs of equal consecutive values, as in time-sorted files, are found
+    first with a vectorized comparison of Arrow strings, so that only one
+    value per run is hashed. Columns whose leading sample holds no repeated
+    value are not factorized: ``(None, values)`` is returned.
+    """
+    n = len(values)
+    sample = values.iloc[:CARDINALITY_SAMPLE_SIZE]
+    if n > len(sample) and sample.nunique(dropna=False) == len(sample):
+        return None, values
+
+    if getattr(values.dtype, "storage", None) == "pyarrow" and n > 1:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        strings = pa.chunked_array(pa.array(values.array))
+        changed = pc.fill_null(pc.not_equal(strings.slice(1), strings.slice(0, n - 1)), True)
+        starts = np.flatnonzero(np.concatenate([[True], changed.to_numpy(zero_copy_only=False)]))
+        if len(starts) <= n // 4:
+            run_codes, uniques = pd.factorize(values.iloc[starts])
+            return np.repeat(run_codes, np.diff(np.append(starts, n))), uniques
+
+    return pd.factorize(values)
+
+
+def _infer_format(uniques: Any) -> Optional[str]:
+    """
+    Infer the strftime format that parses a sample of distinct time strings.
+
+    Candidates are guessed from the sampled strings with month-first and
+    day-first readings, and the first one parsing the whole sample wins, so
+    that "05/03/2023" is not read month-first when "25/03/2023" follows.
+    """
+    sample = [value for value in uniques[:FORMAT_SAMPLE_SIZE] if isinstance(value, str)]
+    if not sample:
+        return None
+
+    candidates = {}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for value in sample[:10]:
+            for dayfirst in [False, True]:
+                guess = guess_datetime_format(value, dayfirst=dayfirst)
+                if guess is not None:
+                    candidates[guess] = None
+    for candidate in candidates:
+        try:
+            pd.to_datetime(sample, format=candidate)
+        except (ValueError, TypeError):
+            continue
+        return candidate
+    return None
+
+
+def _parse_epoch(values: pd.Series) -> pd.Series:
+    """
+    Convert epoch numbers to times with integer arithmetic.
+
+    The unit is detected from the largest magnitude: seconds, milliseconds,
+    microseconds or nanoseconds. Times have microsecond resolution, or
+    nanosecond resolution for nanosecond input.
+    """
+    try:
+        numbers = pd.to_numeric(values)
+    except (ValueError, TypeError):
+        raise ValueError("The 'timestamp' format expects numbers of seconds or milliseconds since the epoch")
+    numbers = numbers.to_numpy(dtype=float, na_value=np.nan) if numbers.hasnans else numbers.to_numpy()
+
+    missing = np.isnan(numbers) if numbers.dtype.kind == "f" else np.zeros(len(numbers), dtype=bool)
+    largest = np.abs(numbers[~missing]).max() if (~missing).any() else 0
+    unit = next(unit for unit, limit in _EPOCH_UNITS if largest < limit)
+    resolution = "ns" if unit == "ns" else "us"
+
+    if numbers.dtype.kind in "iu":
+        # Integers are reinterpreted in their own unit and rescaled exactly
+        times = numbers.astype(np.int64).astype(f"datetime64[{unit}]").astype(f"datetime64[{resolution}]")
+    else:
+        scale = {"s": 10 ** 6, "ms": 10 ** 3, "us": 1, "ns": 1}[unit]
+        ticks = np.round(np.where(missing, 0, numbers) * scale).astype(np.int64)
+        times = ticks.astype(f"datetime64[{resolution}]")
+        times[missing] = np.datetime64("NaT")
+    return pd.Series(times, index=values.index, name=values.name)
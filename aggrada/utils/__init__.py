@@ -1,10 +1,12 @@
 """
 Utility module for the Aggrada package.
 
-This module provides utility functions for validation and visualization.
+This module provides utility functions for validation, visualization and
+caching of results.
 """
 
 from aggrada.utils.validation import validate_data
 from aggrada.utils.visualization import plot_data
+from aggrada.utils.cache import ResultCache, set_cache, get_cache
 
-__all__ = ["validate_data", "plot_data"]
+__all__ = ["validate_data", "plot_data", "ResultCache", "set_cache", "get_cache"]
@@ -0,0 +1,404 @@
+"""
+Result cache module for the Aggrada package.
+
+This module provides an opt-in on-disk cache of read, indexed and
+aggregated data, keyed by a fingerprint of the input and the parameters of
+the call.
+"""
+
+import os
+import glob
+import hashlib
+import inspect
+import functools
+import threading
+import pandas as pd
+import geopandas as gpd
+from typing import Union, Dict, List, Optional, Tuple, Any, Callable, Iterable
+import numpy as np
+import shapely
+
+
+# Default size cap of a cache directory: 1 GiB
+DEFAULT_CACHE_BYTES = 1 << 30
+
+# Cache in use, or None when caching is off
+_CACHE: Optional["ResultCache"] = None
+
+# Calls made while computing a cached result are not cached themselves
+_COMPUTING = threading.local()
+
+
+class ResultCache:
+    """
+    Directory of cached results stored as Parquet files.
+
+    Every result is one file named after its key. Reading a result marks it
+    as recently used, and when the files outgrow ``max_bytes`` the least
+    recently used ones are removed. Several processes can share a directory.
+
+    Parameters
+    ----------
+    directory : str
+        Directory of the cached files; created if needed
+    max_bytes : int, default 1 GiB
+        Size cap of the directory
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_CACHE_BYTES):
+        from aggrada.readers.parquet import _import_pyarrow_dataset
+        _import_pyarrow_dataset()
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be a positive number of bytes")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        Read a cached result.
+
+        Parameters
+        ----------
+        key : str
+            Key of the result
+
+        Returns
+        -------
+        DataFrame or None
+            The cached result, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            result = _read_result(path)
+            # The modification time orders the entries for eviction
+            os.utime(path)
+        except (OSError, ValueError):
+            # Missing, evicted meanwhile, or partially written by an older version
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def put(self, key: str, result: pd.DataFrame) -> bool:
+        """
+        Store a result and evict the least recently used ones over the size cap.
+
+        Parameters
+        ----------
+        key : str
+            Key of the result
+        result : DataFrame
+            Result to store
+
+        Returns
+        -------
+        bool
+            True if the result was stored, False if it cannot be written as
+            Parquet (e.g. columns of mixed types)
+        """
+        path = self._path(key)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            _write_result(result, temporary)
+        except (ValueError, TypeError, NotImplementedError):
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            return False
+        # Readers never see a partially written file
+        os.replace(temporary, path)
+        self._evict()
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Hit and miss counts of this session and the current size of the cache.
+
+        Returns
+        -------
+        dict
+            ``hits``, ``misses`` and ``evictions`` since the cache was set,
+            and the number of ``entries`` and ``bytes`` in the directory
+        """
+        entries = self._entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+        }
+
+    def clear(self) -> None:
+        """
+        Remove every cached result.
+        """
+        for _, _, path in self._entries():
+            _remove(path)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.parquet")
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """
+        Modification time, size and path of every cached file.
+        """
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, "*.parquet")):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self) -> None:
+        """
+        Remove the least recently used files until the directory fits the size cap.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if _remove(path):
+                self.evictions += 1
+            total -= size
+
+
+def set_cache(directory: Optional[str], max_bytes: int = DEFAULT_CACHE_BYTES) -> Optional[ResultCache]:
+    """
+    Turn the result cache on or off.
+
+    While the cache is on, ``read_csv``, ``index`` and ``aggregate`` look up
+    their result by a fingerprint of their input and parameters before
+    computing it, and store new results. Files are fingerprinted by path,
+    modification time and size; DataFrames by a hash of their contents.
+    Results that cannot be fingerprinted or stored are computed as usual.
+
+    Parameters
+    ----------
+    directory : str or None
+        Cache directory, or None to turn caching off
+    max_bytes : int, default 1 GiB
+        Size cap of the directory, enforced by evicting the least recently
+        used results
+
+    Returns
+    -------
+    ResultCache or None
+        The cache in use
+
+    Examples
+    --------
+    >>> cache = ag.set_cache("~/.cache/aggrada", max_bytes=10 * 2**30)
+    >>> daily = ag.aggregate(indexed_data, "grid", "day", {"value": "sum"}, cell_size=0.01)
+    >>> cache.stats()
+    {'hits': 0, 'misses': 1, 'evictions': 0, 'entries': 1, 'bytes': 52817}
+    """
+    global _CACHE
+    _CACHE = None if directory is None else ResultCache(os.path.expanduser(directory), max_bytes)
+    return _CACHE
+
+
+def get_cache() -> Optional[ResultCache]:
+    """
+    Get the result cache in use.
+
+    Returns
+    -------
+    ResultCache or None
+        The cache in use, or None when caching is off
+    """
+    return _CACHE
+
+
+def fingerprint(source: Any) -> str:
+    """
+    Fingerprint the input of a call.
+
+    Parameters
+    ----------
+    source : str, path or DataFrame
+        Path of an existing file, fingerprinted by its absolute path,
+        modification time and size, or a DataFrame, fingerprinted by a hash
+        of its index, columns, dtypes, values and CRS
+
+    Returns
+    -------
+    str
+        Hex digest identifying the input
+
+    Raises
+    ------
+    TypeError
+        If the input cannot be fingerprinted
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(source, (str, os.PathLike)) and os.path.isfile(source):
+        stat = os.stat(source)
+        digest.update(f"file:{os.path.abspath(source)}:{stat.st_mtime_ns}:{stat.st_size}".encode())
+        return digest.hexdigest()
+    if not isinstance(source, pd.DataFrame):
+        raise TypeError(f"Cannot fingerprint {type(source).__name__}")
+
+    digest.update(repr([(str(col), str(dtype)) for col, dtype in source.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(source.index).to_numpy().tobytes())
+    for col in range(source.shape[1]):
+        values = source.iloc[:, col]
+        if isinstance(values.dtype, gpd.array.GeometryDtype):
+            _update_geometry(digest, values)
+        else:
+            digest.update(pd.util.hash_pandas_object(values, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def cached(
+    name: str,
+    ignore: Iterable[str] = (),
+    skip: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    context: Optional[Callable[[Dict[str, Any]], List[Any]]] = None
+) -> Callable:
+    """
+    Cache the results of a function in the cache set with :func:`set_cache`.
+
+    The first argument of the function is its input and is fingerprinted;
+    the other arguments are part of the key as they are.
+
+    Parameters
+    ----------
+    name : str
+        Name of the function in the keys
+    ignore : iterable of str
+        Arguments that do not change the result (e.g. ``n_jobs``)
+    skip : callable, optional
+        Function of the arguments returning True for calls not to cache
+    context : callable, optional
+        Function of the arguments returning other state the result depends
+        on, such as a registered boundary layer
+
+    Returns
+    -------
+    callable
+        Decorator
+    """
+    ignore = set(ignore)
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = _CACHE
+            if cache is None or getattr(_COMPUTING, "active", False):
+                return func(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            for parameter in signature.parameters.values():
+                if parameter.kind == inspect.Parameter.VAR_KEYWORD:
+                    arguments.update(arguments.pop(parameter.name))
+            if skip is not None and skip(arguments):
+                return func(*args, **kwargs)
+            try:
+                key = _cache_key(name, arguments, ignore, [] if context is None else context(arguments))
+            except TypeError:
+                return func(*args, **kwargs)
+
+            result = cache.get(key)
+            if result is not None:
+                return result
+            _COMPUTING.active = True
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                _COMPUTING.active = False
+            if isinstance(result, pd.DataFrame):
+                cache.put(key, result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def _cache_key(name: str, arguments: Dict[str, Any], ignore: set, context: List[Any]) -> str:
+    """
+    Key of a call: its name, the package version, the input fingerprint and the other arguments.
+    """
+    import aggrada
+
+    (_, source), *others = arguments.items()
+    parts = [name, aggrada.__version__, fingerprint(source)]
+    parts.extend(f"{key}={_canonical(value)}" for key, value in others if key not in ignore)
+    parts.extend(_canonical(value) for value in context)
+    return hashlib.blake2b("\n".join(parts).encode(), digest_size=16).hexdigest()
+
+
+def _canonical(value: Any) -> str:
+    """
+    Stable text of an argument value; raises TypeError for values without one.
+    """
+    if value is None or isinstance(value, (bool, int, float, str, np.generic, pd.Timestamp, pd.Timedelta)):
+        return f"{type(value).__name__}:{value!r}"
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{','.join(_canonical(item) for item in value)}]"
+    if isinstance(value, dict):
+        return "dict{" + ",".join(f"{_canonical(k)}:{_canonical(v)}" for k, v in value.items()) + "}"
+    if isinstance(value, pd.DataFrame):
+        return f"frame:{fingerprint(value)}"
+    raise TypeError(f"Cannot fingerprint {type(value).__name__}")
+
+
+def _update_geometry(digest: Any, geometry: pd.Series) -> None:
+    """
+    Hash a geometry column and its CRS, points by their coordinates.
+    """
+    values = np.asarray(geometry.array)
+    crs = geometry.array.crs
+    # The same CRS reads back from Parquet as PROJJSON, so compare by EPSG code
+    epsg = None if crs is None else crs.to_epsg()
+    digest.update((f"EPSG:{epsg}" if epsg is not None else str(crs and crs.to_wkt())).encode())
+    if len(values) and (shapely.get_type_id(values) == 0).all() and not shapely.is_empty(values).any():
+        digest.update(shapely.get_coordinates(values, include_z=True).tobytes())
+    else:
+        digest.update(b"\0".join(wkb or b"" for wkb in shapely.to_wkb(values)))
+
+
+def _write_result(result: pd.DataFrame, path: str) -> None:
+    """
+    Write a result as Parquet, with points in the faster geoarrow encoding.
+    """
+    if not isinstance(result, gpd.GeoDataFrame):
+        result.to_parquet(path)
+        return
+    try:
+        result.to_parquet(path, geometry_encoding="geoarrow")
+    except (TypeError, ValueError, NotImplementedError):
+        # Mixed geometry types
+        result.to_parquet(path)
+
+
+def _read_result(path: str) -> pd.DataFrame:
+    """
+    Read a result written by :func:`_write_result`.
+    """
+    import pyarrow.parquet as pq
+    metadata = pq.read_schema(path).metadata
+    if metadata is not None and b"geo" in metadata:
+        return gpd.read_parquet(path)
+    return pd.read_parquet(path)
+
+
+def _remove(path: str) -> bool:
+    """
+    Remove a file, unless another process already did.
+    """
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return False
+    return True
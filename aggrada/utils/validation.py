@@ -8,6 +8,8 @@ import pandas as pd
 import geopandas as gpd
 from typing import Union, List, Optional, Tuple, Dict, Any
 
+from aggrada.aggregators.sketches import parse_quantile
+
 
 def validate_data(
     data: Union[pd.DataFrame, gpd.GeoDataFrame],
@@ -113,10 +115,13 @@ def validate_aggregation_parameters(
             raise TypeError("agg_functions must be a dictionary")
         
         # Check if all values are valid pandas aggregation functions
-        valid_aggs = ["sum", "mean", "median", "min", "max", "count", "std", "var", "first", "last", "size"]
-        invalid_aggs = [agg for agg in agg_functions.values() if agg not in valid_aggs]
+        valid_aggs = ["sum", "mean", "median", "min", "max", "count", "std", "var", "first", "last", "size", "approx_nunique"]
+        invalid_aggs = [
+            agg for agg in agg_functions.values() if agg not in valid_aggs and parse_quantile(agg) is None
+        ]
         if invalid_aggs:
             raise ValueError(f"Invalid aggregation functions: {invalid_aggs}. "
-                            f"Valid options are: {', '.join(valid_aggs)}")
+                            f"Valid options are: {', '.join(valid_aggs)}, "
+                            f"and quantiles such as p50, p90, p99 or quantile(0.95)")
     
     return True
@@ -0,0 +1,129 @@
+"""
+Peak memory benchmark for ``aggrada.index``.
+
+Builds a wide DataFrame, runs ``index`` once and reports how much the peak
+resident set size grew relative to the in-memory size of the input. Each
+measurement runs in a fresh subprocess so that peaks do not carry over.
+
+Usage::
+
+    python benchmarks/bench_index_memory.py --rows 1000000 --columns 30
+    python benchmarks/bench_index_memory.py --inplace --max-ratio 1.0
+"""
+
+import argparse
+import gc
+import json
+import resource
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+def make_data(n_rows: int, n_columns: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Create a wide DataFrame with coordinates, timestamps and numeric columns.
+    """
+    rng = np.random.default_rng(seed)
+    data = {f"value_{i}": rng.random(n_rows) for i in range(n_columns)}
+    data["latitude"] = rng.uniform(-33.0, 5.0, n_rows)
+    data["longitude"] = rng.uniform(-73.0, -35.0, n_rows)
+    data["timestamp"] = pd.Timestamp("2024-01-01") + pd.to_timedelta(
+        rng.integers(0, 365 * 24 * 3600, n_rows), unit="s"
+    )
+    return pd.DataFrame(data)
+
+
+def _status_bytes(field: str) -> int:
+    """
+    Read a memory field (e.g. ``VmRSS``) from /proc/self/status in bytes.
+    """
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) * 1024
+    raise KeyError(field)
+
+
+def reset_peak_rss() -> int:
+    """
+    Reset the peak RSS counter and return the current RSS in bytes.
+
+    On Linux the high-water mark is reset through /proc/self/clear_refs so
+    that allocations made while building the input are not counted. On other
+    platforms the current peak is used as the baseline.
+    """
+    if sys.platform.startswith("linux"):
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return _status_bytes("VmRSS")
+    return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> int:
+    """
+    Return the peak resident set size of this process in bytes.
+    """
+    if sys.platform.startswith("linux"):
+        return _status_bytes("VmHWM")
+    # ru_maxrss is reported in bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(n_rows: int, n_columns: int, inplace: bool) -> dict:
+    """
+    Index a freshly built DataFrame and return the memory figures.
+    """
+    import aggrada as ag
+
+    data = make_data(n_rows, n_columns)
+    input_bytes = int(data.memory_usage(deep=True).sum())
+    gc.collect()
+    before = reset_peak_rss()
+
+    ag.index(
+        data,
+        spatial_column=["latitude", "longitude"],
+        temporal_column="timestamp",
+        spatial_type="point",
+        inplace=inplace,
+    )
+
+    growth = peak_rss_bytes() - before
+    return {"input_bytes": input_bytes, "peak_growth_bytes": growth}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--columns", type=int, default=30)
+    parser.add_argument("--inplace", action="store_true")
+    parser.add_argument("--max-ratio", type=float, default=1.5,
+                        help="fail if peak growth exceeds this multiple of the input size")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args.rows, args.columns, args.inplace)))
+        return
+
+    command = [sys.executable, __file__, "--worker", "--rows", str(args.rows),
+               "--columns", str(args.columns)]
+    if args.inplace:
+        command.append("--inplace")
+    result = json.loads(subprocess.check_output(command))
+
+    ratio = result["peak_growth_bytes"] / result["input_bytes"]
+    print(f"rows:             {args.rows:,}")
+    print(f"input size:       {result['input_bytes'] / 2**20:,.1f} MiB")
+    print(f"peak RSS growth:  {result['peak_growth_bytes'] / 2**20:,.1f} MiB")
+    print(f"growth / input:   {ratio:.2f}x (limit {args.max_ratio:.2f}x)")
+
+    if ratio > args.max_ratio:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
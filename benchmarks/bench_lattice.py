@@ -0,0 +1,75 @@
+"""
+Benchmark for ``aggrada.aggregate_lattice``.
+
+Compares one lattice sweep over several grid and calendar granularities
+with a separate ``aggregate`` call for every pair, and with a single
+aggregation at the finest pair.
+
+Usage::
+
+    python benchmarks/bench_lattice.py --rows 2000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import aggrada as ag
+
+
+CELL_SIZES = [0.5, 1.0, 2.0, 2.5, 5.0, 10.0]
+TEMPORAL_LEVELS = ["day", "week", "month", "quarter", "year"]
+
+
+def make_data(n_rows: int, seed: int = 0):
+    """
+    Create indexed points spread over three years.
+    """
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({
+        "latitude": rng.uniform(-10.0, 0.0, n_rows),
+        "longitude": rng.uniform(-50.0, -40.0, n_rows),
+        "timestamp": pd.Timestamp("2021-01-01") + pd.to_timedelta(
+            rng.integers(0, 3 * 365 * 24 * 3600, n_rows), unit="s"
+        ),
+        "value": rng.random(n_rows),
+    })
+    return ag.index(data, ["latitude", "longitude"], "timestamp", spatial_type="point")
+
+
+def timed(func, *args, **kwargs) -> float:
+    """
+    Run a function once and return the elapsed seconds.
+    """
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    data = make_data(args.rows)
+    agg_functions = {"value": "mean", "count": "size"}
+    spatial_levels = [("grid", {"cell_size": size}) for size in CELL_SIZES]
+
+    single = timed(ag.aggregate, data, "grid", TEMPORAL_LEVELS[0], agg_functions, cell_size=CELL_SIZES[0])
+    separate = sum(
+        timed(ag.aggregate, data, "grid", temporal, agg_functions, cell_size=size)
+        for size in CELL_SIZES for temporal in TEMPORAL_LEVELS
+    )
+    lattice = timed(ag.aggregate_lattice, data, spatial_levels, TEMPORAL_LEVELS, agg_functions)
+
+    pairs = len(CELL_SIZES) * len(TEMPORAL_LEVELS)
+    print(f"rows:                  {args.rows:,}")
+    print(f"finest pair:           {single:.2f} s")
+    print(f"{pairs} separate calls:      {separate:.2f} s")
+    print(f"lattice of {pairs} pairs:     {lattice:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark for point geometry construction in ``create_geometry``.
+
+Times the numeric latitude/longitude path and the "lat,lon" string path
+for increasing row counts, so the scaling of both paths can be compared.
+
+Usage::
+
+    python benchmarks/bench_point_geometry.py --sizes 10000 100000 1000000
+"""
+
+import argparse
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from aggrada.transformers.spatial import create_geometry
+
+
+def make_data(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Create a DataFrame with random coordinates in numeric and string form.
+    """
+    rng = np.random.default_rng(seed)
+    lat = rng.uniform(-33.0, 5.0, n_rows).round(6)
+    lon = rng.uniform(-73.0, -35.0, n_rows).round(6)
+    return pd.DataFrame({
+        "latitude": lat,
+        "longitude": lon,
+        "location": pd.Series(lat).astype(str) + "," + pd.Series(lon).astype(str),
+    })
+
+
+def time_call(func, repeat: int = 3) -> float:
+    """
+    Return the best wall time of ``repeat`` calls to ``func``.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'numeric (s)':>12} {'rows/s':>14} {'string (s)':>12} {'rows/s':>14}")
+    for n_rows in args.sizes:
+        data = make_data(n_rows)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            numeric = time_call(
+                lambda: create_geometry(data, ["latitude", "longitude"], "point"), args.repeat
+            )
+            string = time_call(
+                lambda: create_geometry(data, "location", "point"), args.repeat
+            )
+        print(
+            f"{n_rows:>12,} {numeric:>12.4f} {n_rows / numeric:>14,.0f} "
+            f"{string:>12.4f} {n_rows / string:>14,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -19,26 +19,33 @@ setup(
         "Intended Audience :: Science/Research",
         "License :: OSI Approved :: MIT License",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
         "Programming Language :: Python :: 3.11",
         "Topic :: Scientific/Engineering :: GIS",
         "Topic :: Scientific/Engineering :: Information Analysis",
     ],
-    python_requires=">=3.8",
+    python_requires=">=3.9",
     install_requires=[
-        "pandas>=1.3.0",
-        "geopandas>=0.10.0",
-        "shapely>=1.8.0",
-        "numpy>=1.20.0",
+        "pandas>=2.2.0",
+        "geopandas>=1.0.0",
+        "shapely>=2.0.0",
+        "numpy>=1.22.4",
         "matplotlib>=3.4.0",
-        "pyproj>=3.1.0",
+        "pyproj>=3.3.0",
     ],
     extras_require={
+        "parquet": [
+            "pyarrow>=12.0.0",
+        ],
+        "polars": [
+            "polars>=0.20.0",
+        ],
         "dev": [
             "pytest>=7.0.0",
             "pytest-cov>=4.0.0",
+            "pyarrow>=12.0.0",
+            "polars>=0.20.0",
             "flake8>=6.0.0",
             "black>=23.0.0",
             "sphinx>=7.0.0",
@@ -6,6 +6,7 @@ import pytest
 import pandas as pd
 import geopandas as gpd
 import numpy as np
+import shapely
 from shapely.geometry import Point
 
 import aggrada as ag
@@ -32,6 +33,90 @@ def test_aggregate_spatial_grid(sample_indexed_data):
     assert len(aggregated) <= len(sample_indexed_data)
 
 
+def test_aggregate_spatial_grid_cell_size(sample_indexed_data):
+    """
+    Test spatial aggregation using a grid with a fixed cell size.
+    """
+    aggregated = aggregate_spatial(
+        sample_indexed_data,
+        spatial_granularity="grid",
+        agg_functions={"value": "sum", "count": "size"},
+        cell_size=0.004,
+        origin=(-74.015, 40.705)
+    )
+    
+    assert isinstance(aggregated, gpd.GeoDataFrame)
+    assert aggregated["cell_id"].dtype == np.int64
+    assert aggregated["value"].sum() == sample_indexed_data["value"].sum()
+    assert aggregated["count"].sum() == len(sample_indexed_data)
+    
+    # Each cell polygon is a 0.004 x 0.004 square containing its points
+    assert np.allclose(shapely.area(aggregated.geometry.values), 0.004 ** 2)
+    joined = sample_indexed_data.sjoin(aggregated[["cell_id", "geometry"]], predicate="within")
+    assert len(joined) == len(sample_indexed_data)
+
+    # Cell coordinates past int32 would collide in the packed ids
+    with pytest.raises(ValueError, match="int32"):
+        aggregate_spatial(sample_indexed_data, "grid", {"value": "sum"}, cell_size=1e-9, origin=(-180.0, -90.0))
+
+
+def test_aggregate_spatial_hexgrid(sample_indexed_data):
+    """
+    Test spatial aggregation using a hexagonal grid.
+    """
+    aggregated = aggregate_spatial(
+        sample_indexed_data,
+        spatial_granularity="hexgrid",
+        agg_functions={"value": "sum", "count": "size"},
+        hex_size=0.003
+    )
+    
+    assert isinstance(aggregated, gpd.GeoDataFrame)
+    assert aggregated["count"].sum() == len(sample_indexed_data)
+    assert aggregated["cell_id"].is_unique
+    assert (shapely.get_num_coordinates(aggregated.geometry.values) == 7).all()
+    
+    # Every point falls inside the hexagon of its cell
+    joined = sample_indexed_data.sjoin(aggregated[["cell_id", "geometry"]], predicate="intersects")
+    assert len(joined) == len(sample_indexed_data)
+    assert joined.groupby("cell_id")["value"].sum().to_dict() == aggregated.set_index("cell_id")["value"].to_dict()
+
+
+def test_aggregate_spatial_admin_level(sample_indexed_data):
+    """
+    Test spatial aggregation by registered administrative boundaries.
+    """
+    from shapely.geometry import box
+    from aggrada.aggregators.boundaries import get_boundaries
+    
+    boundaries = gpd.GeoDataFrame(
+        {"code": ["WEST", "EAST"]},
+        geometry=[box(-74.02, 40.70, -74.007, 40.72), box(-74.007, 40.70, -74.00, 40.72)],
+        crs="EPSG:4326"
+    )
+    ag.register_boundaries("state", boundaries, id_column="code")
+    try:
+        for _ in range(2):
+            aggregated = aggregate_spatial(
+                sample_indexed_data,
+                spatial_granularity="state",
+                agg_functions={"value": "sum", "count": "size"}
+            )
+        
+        # The spatial index is built once and reused
+        assert len(get_boundaries("state")._indexes) == 1
+    finally:
+        ag.unregister_boundaries("state")
+    
+    assert isinstance(aggregated, gpd.GeoDataFrame)
+    result = aggregated.set_index("admin_id")
+    # WEST has points with values 15, 20 and 30; EAST has 10 and 25
+    assert result.loc["WEST", "value"] == 65
+    assert result.loc["EAST", "value"] == 35
+    assert result.loc["WEST", "count"] == 3
+    assert result.loc["WEST"].geometry.equals(boundaries.geometry.iloc[0])
+
+
 def test_aggregate_spatial_custom(sample_indexed_data):
     """
     Test spatial aggregation using custom groups.
@@ -154,3 +239,188 @@ def test_aggregate_temporal_custom(sample_indexed_data):
     # Afternoon has 2 points with values 20 and 30
     assert abs(afternoon["value"].iloc[0] - 25) < 0.1  # Mean of 20, 30
     assert afternoon["count"].iloc[0] == 2
+
+
+def test_temporal_groups_are_integer_codes(sample_indexed_data):
+    """
+    Test that temporal groups are integer period codes labelled only for output.
+    """
+    from aggrada.aggregators.temporal import _create_temporal_groups, _temporal_group_labels
+    
+    codes = _create_temporal_groups(sample_indexed_data, "week")
+    assert codes.dtype == np.int64
+    
+    expected = sample_indexed_data["time_start"].dt.to_period("W")
+    assert (codes.to_numpy() == expected.array.asi8).all()
+    assert list(_temporal_group_labels(codes.unique(), "week")) == ["2023-01-09/2023-01-15", "2023-01-16/2023-01-22"]
+    
+    aggregated = aggregate_temporal(sample_indexed_data, "month", {"value": "sum"})
+    assert aggregated["temporal_group"].tolist() == ["2023-01"]
+
+
+def test_aggregate_groups_kernels_match_groupby():
+    """
+    Test that the numpy reduction kernels match pandas groupby.
+    """
+    from aggrada.aggregators.groupby import aggregate_groups
+    
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({
+        "int": rng.integers(-100, 100, 200),
+        "float": rng.normal(size=200),
+        "label": rng.choice(["a", "b"], 200),
+    })
+    data.loc[data.index[::7], "float"] = np.nan
+    codes = rng.integers(-1, 10, 200)
+    codes[codes == 3] = -1  # group 3 has no rows
+    
+    for func in ["sum", "mean", "count", "min", "max", "std", "var"]:
+        functions = {"int": func, "float": func, "label": "first"}
+        result = aggregate_groups(data, codes, 10, functions)
+        valid = codes >= 0
+        expected = data[valid].groupby(codes[valid]).agg(functions).reindex(pd.RangeIndex(10))
+        pd.testing.assert_frame_equal(result, expected)
+
+
+def test_quantile_digests_merge():
+    """
+    Test that merged quantile digests stay small and accurate.
+    """
+    from aggrada.aggregators.sketches import compute_digests, merge_digests, digest_quantiles
+    
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(3, 1, 40000)
+    codes = np.repeat([0, 1], 20000)
+    parts = [compute_digests(values[i::4], codes[i::4], 2) for i in range(4)]
+    digests = merge_digests(np.concatenate(parts), np.tile([0, 1], 4), 2)
+    
+    assert all(digest.shape[1] <= 200 for digest in digests)
+    for q in [0.5, 0.95, 0.99]:
+        for group, estimate in enumerate(digest_quantiles(digests, q)):
+            group_values = np.sort(values[codes == group])
+            rank = np.searchsorted(group_values, estimate) / len(group_values)
+            assert abs(rank - q) < 0.005
+
+
+def test_quantile_digests_weighted():
+    """
+    Test that weights act as repeat counts in digest quantiles.
+    """
+    from aggrada.aggregators.sketches import compute_digests, merge_digests, digest_quantiles
+
+    values = np.array([7.0, 50.0, 3.0, 12.0, 7.0])
+    weights = np.array([3, 2, 4, 1, 2])
+    codes = np.array([0, 0, 0, 0, 1])
+    parts = [compute_digests(values[i::2], codes[i::2], 2, weights[i::2]) for i in range(2)]
+    digests = merge_digests(np.concatenate(parts), np.tile([0, 1], 2), 2)
+    for q in [0, 0.1, 0.3, 0.5, 0.6, 0.75, 0.9, 1]:
+        expected = np.quantile(np.repeat(values[:4], weights[:4]), q)
+        assert digest_quantiles(digests, q)[0] == pytest.approx(expected)
+        assert digest_quantiles(digests, q)[1] == 7.0
+
+    # A whole row and a small part of another stay close to the whole row
+    digest = compute_digests(np.array([7.0, 50.0]), np.zeros(2, dtype=np.int64), 1, np.array([1, 0.18]))
+    assert digest_quantiles(digest, 0.5)[0] < 11
+
+
+def test_hyperloglog_registers_merge():
+    """
+    Test that merged HyperLogLog registers estimate distinct counts within their error bound.
+    """
+    from aggrada.aggregators.sketches import compute_registers, merge_registers, estimate_cardinality
+    
+    rng = np.random.default_rng(0)
+    values = pd.Series(rng.integers(0, 50000, 200000))
+    codes = np.repeat([0, 1], 100000)
+    parts = [compute_registers(values[i::4], codes[i::4], 2) for i in range(4)]
+    registers = merge_registers(np.concatenate(parts), np.tile([0, 1], 4), 2)
+    
+    assert all(r.dtype == np.uint8 and r.nbytes == 4096 for r in registers)
+    exact = values.groupby(codes).nunique().to_numpy()
+    # Three standard errors of 1.6%
+    np.testing.assert_allclose(estimate_cardinality(registers), exact, rtol=0.05)
+
+    # Integral floats hash as integers whatever else their chunk holds
+    chunks = [np.arange(1000, dtype=float), np.r_[np.arange(1000), 0.5], np.arange(1000)]
+    parts = [compute_registers(chunk, np.zeros(len(chunk), dtype=np.int64), 1) for chunk in chunks]
+    merged = merge_registers(np.concatenate(parts), np.zeros(3, dtype=np.int64), 1)
+    assert estimate_cardinality(merged)[0] == pytest.approx(1001, rel=0.05)
+    assert estimate_cardinality(merged) == estimate_cardinality(parts[1])
+
+    # Integers hash alike in int64, nullable Int64 and object columns
+    chunks = [
+        pd.Series(np.arange(1000)),
+        pd.Series(np.arange(500, 1500), dtype="Int64"),
+        pd.Series(list(range(1000, 2000)), dtype=object),
+    ]
+    parts = [compute_registers(chunk, np.zeros(len(chunk), dtype=np.int64), 1) for chunk in chunks]
+    merged = merge_registers(np.concatenate(parts), np.zeros(3, dtype=np.int64), 1)
+    assert estimate_cardinality(merged)[0] == pytest.approx(2000, rel=0.05)
+    assert estimate_cardinality(parts[2]) == estimate_cardinality(
+        compute_registers(np.arange(1000, 2000), np.zeros(1000, dtype=np.int64), 1)
+    )
+
+
+def test_materialized_aggregate_append(sample_indexed_data):
+    """
+    Test that appending batches matches aggregating all rows at once.
+    """
+    agg_functions = {"value": "mean", "id": "min", "count": "size"}
+    store = ag.MaterializedAggregate("grid", "day", agg_functions, cell_size=0.004)
+    
+    first = ag.aggregate(sample_indexed_data.iloc[:3], "grid", "day", agg_functions, cell_size=0.004)
+    second = ag.aggregate(sample_indexed_data.iloc[3:], "grid", "day", agg_functions, cell_size=0.004)
+    expected = ag.aggregate(sample_indexed_data, "grid", "day", agg_functions, cell_size=0.004)
+    
+    # Each append touches only the groups of its batch
+    assert store.append(sample_indexed_data.iloc[:3]) == len(first)
+    assert store.append(sample_indexed_data.iloc[3:]) == len(second)
+    assert len(store) == len(expected)
+    
+    result = store.result()
+    pd.testing.assert_frame_equal(
+        pd.DataFrame(result.drop(columns="geometry")),
+        pd.DataFrame(expected.drop(columns="geometry")),
+        check_dtype=False
+    )
+    assert result.geometry.geom_equals(expected.geometry).all()
+    
+    # Stored states can be merged into another aggregate
+    copy = ag.MaterializedAggregate("grid", "day", agg_functions, cell_size=0.004)
+    copy.merge(store.states)
+    assert copy.result()["value"].tolist() == result["value"].tolist()
+
+
+def test_materialized_aggregate_integer_states():
+    """
+    Test that integer sums, minima and maxima stay exact integers across appends.
+    """
+    big = 2 ** 53 + 1
+    data = gpd.GeoDataFrame({
+        "value": pd.array([big, 5, None, 3], dtype="Int64"),
+        "geometry": [Point(0.5, 0.5), Point(1.5, 0.5), Point(2.5, 0.5), Point(0.5, 0.5)],
+        "time_start": pd.to_datetime(["2023-01-01"] * 4),
+        "time_end": pd.to_datetime(["2023-01-01"] * 4),
+    }, crs="EPSG:4326")
+    agg_functions = {"value": "max", "count": "size"}
+    store = ag.MaterializedAggregate("grid", "day", agg_functions, cell_size=1.0)
+    # The second batch has a group without values, so its min and max states are floats
+    store.append(data.iloc[:2])
+    store.append(data.iloc[2:])
+
+    expected = ag.aggregate(data, "grid", "day", agg_functions, cell_size=1.0)
+    assert expected["value"].tolist()[0] == big
+    assert store.result()["value"].tolist() == expected["value"].tolist()
+
+    store = ag.MaterializedAggregate("grid", "day", {"value": "sum"}, cell_size=1.0)
+    store.append(data.iloc[:2].astype({"value": "int64"}))
+    store.append(data.iloc[:1].astype({"value": "int64"}))
+    assert store.result()["value"].tolist() == [2 * big, 5]
+
+
+def test_materialized_aggregate_requires_fixed_grid():
+    """
+    Test that a materialized grid aggregate needs a fixed cell size.
+    """
+    with pytest.raises(ValueError):
+        ag.MaterializedAggregate("grid", "day", {"value": "mean"})
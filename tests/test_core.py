@@ -10,7 +10,7 @@ from shapely.geometry import Point
 import matplotlib.pyplot as plt
 
 import aggrada as ag
-from aggrada.core import index, aggregate, evaluate_consistency, plot
+from aggrada.core import index, aggregate, aggregate_chunks, aggregate_lattice, aggregate_rolling, evaluate_consistency, plot
 
 
 def test_index_point_data(sample_point_data):
@@ -36,6 +36,66 @@ def test_index_point_data(sample_point_data):
     assert len(indexed) == len(sample_point_data)
 
 
+def test_index_does_not_modify_input(sample_point_data):
+    """
+    Test that indexing leaves the input DataFrame unchanged.
+    """
+    original = sample_point_data.copy()
+    
+    index(
+        sample_point_data,
+        spatial_column=["latitude", "longitude"],
+        temporal_column="timestamp",
+        spatial_type="point"
+    )
+    
+    pd.testing.assert_frame_equal(sample_point_data, original)
+
+
+def test_index_writes_to_result_do_not_reach_input(sample_point_data):
+    """
+    Test that writing to the indexed data leaves the input DataFrame unchanged.
+    """
+    original = sample_point_data.copy()
+    
+    indexed = index(
+        sample_point_data,
+        spatial_column=["latitude", "longitude"],
+        temporal_column="timestamp",
+        spatial_type="point"
+    )
+    indexed.loc[0, "value"] = -1
+    indexed.loc[1, "latitude"] = 0.0
+    
+    pd.testing.assert_frame_equal(sample_point_data, original)
+
+
+def test_index_inplace(sample_point_data):
+    """
+    Test that inplace indexing only adds geometry and time columns to the input.
+    """
+    original_columns = sample_point_data.columns.tolist()
+    
+    indexed = index(
+        sample_point_data,
+        spatial_column=["latitude", "longitude"],
+        temporal_column="timestamp",
+        spatial_type="point",
+        inplace=True
+    )
+    
+    assert isinstance(indexed, gpd.GeoDataFrame)
+    assert sample_point_data.columns.tolist() == original_columns + ["geometry", "time_start", "time_end"]
+    assert indexed.geometry.equals(
+        index(
+            sample_point_data[original_columns],
+            spatial_column=["latitude", "longitude"],
+            temporal_column="timestamp",
+            spatial_type="point"
+        ).geometry
+    )
+
+
 def test_index_invalid_data(sample_point_data):
     """
     Test indexing with invalid parameters.
@@ -91,6 +151,296 @@ def test_aggregate_custom_year(sample_indexed_data):
     assert len(aggregated) <= len(data_with_group)
 
 
+def test_aggregate_per_group_per_period(sample_indexed_data):
+    """
+    Test that aggregation yields one row per spatial group and period.
+    """
+    data_with_group = sample_indexed_data.copy()
+    data_with_group["spatial_group"] = ["A", "B", "A", "A", "B"]
+    
+    aggregated = aggregate(
+        data_with_group,
+        spatial_granularity="custom",
+        temporal_granularity="day",
+        agg_functions={"value": "sum", "count": "size"}
+    )
+    
+    result = aggregated.set_index(["spatial_group", "temporal_group"])
+    assert len(result) == 4
+    assert result.loc[("A", "2023-01-15"), "value"] == 30  # 10 + 20
+    assert result.loc[("B", "2023-01-15"), "value"] == 15
+    assert result.loc[("A", "2023-01-16"), "value"] == 25
+    assert result.loc[("B", "2023-01-16"), "value"] == 30
+    assert result["count"].tolist() == [2, 1, 1, 1]
+    
+    # Spatial groups keep the geometry of their first row
+    assert result.loc[("A", "2023-01-15")].geometry.equals(data_with_group.geometry.iloc[0])
+
+
+def test_aggregate_parallel_matches_serial(sample_indexed_data):
+    """
+    Test that aggregating in worker processes matches the serial aggregation.
+    """
+    agg_functions = {"value": "mean", "id": "max", "count": "size"}
+    expected = aggregate(sample_indexed_data, "grid", "day", agg_functions)
+    result = aggregate(sample_indexed_data, "grid", "day", agg_functions, n_jobs=2)
+    
+    pd.testing.assert_frame_equal(
+        pd.DataFrame(result.drop(columns="geometry")),
+        pd.DataFrame(expected.drop(columns="geometry")),
+        check_dtype=False
+    )
+    assert result.geometry.geom_equals(expected.geometry).all()
+    
+    with pytest.raises(ValueError, match="median"):
+        aggregate(sample_indexed_data, "grid", "day", {"value": "median"}, n_jobs=2)
+
+
+def test_aggregate_parallel_admin_level(sample_indexed_data):
+    """
+    Test that workers load registered boundaries once and match the serial aggregation.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from shapely.geometry import box
+
+    # Projected boundaries are reprojected to the CRS of the data before the workers get them
+    boundaries = gpd.GeoDataFrame(
+        {"code": ["WEST", "EAST"]},
+        geometry=[box(-74.02, 40.70, -74.007, 40.72), box(-74.007, 40.70, -74.00, 40.72)],
+        crs="EPSG:4326"
+    ).to_crs("EPSG:3857")
+    ag.register_boundaries("state", boundaries, id_column="code")
+    agg_functions = {"value": "sum", "count": "size"}
+    try:
+        expected = aggregate(sample_indexed_data, "state", "day", agg_functions)
+        result = aggregate(sample_indexed_data, "state", "day", agg_functions, n_jobs=2)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            threaded = aggregate(sample_indexed_data, "state", "day", agg_functions, n_jobs=3, executor=executor)
+    finally:
+        ag.unregister_boundaries("state")
+
+    assert set(expected["admin_id"]) == {"WEST", "EAST"}
+    for parallel in [result, threaded]:
+        pd.testing.assert_frame_equal(
+            pd.DataFrame(parallel.drop(columns="geometry")),
+            pd.DataFrame(expected.drop(columns="geometry")),
+            check_dtype=False
+        )
+        assert parallel.geometry.geom_equals(expected.geometry).all()
+
+
+def test_aggregate_parallel_custom_executor(sample_indexed_data):
+    """
+    Test parallel aggregation of custom groups on a caller-provided executor.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    
+    data_with_group = sample_indexed_data.copy()
+    data_with_group["spatial_group"] = ["A", "B", "A", "A", "B"]
+    
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        result = aggregate(
+            data_with_group, "custom", "day", {"value": "sum"}, n_jobs=3, executor=executor
+        )
+    
+    result = result.set_index(["spatial_group", "temporal_group"])
+    assert result.loc[("A", "2023-01-15"), "value"] == 30
+    assert result.loc[("B", "2023-01-16"), "value"] == 30
+    # Groups keep the geometry of their first row
+    assert result.loc[("B", "2023-01-15")].geometry.equals(data_with_group.geometry.iloc[1])
+
+
+def test_aggregate_chunks_matches_aggregate(temp_csv_file):
+    """
+    Test that aggregating a CSV file chunk by chunk matches aggregating it at once.
+    """
+    agg_functions = {"value": "mean", "id": "sum", "count": "size"}
+    read_options = dict(spatial_columns=["latitude", "longitude"], temporal_columns="timestamp", index_data=True)
+    
+    chunks = ag.read_csv(temp_csv_file, chunksize=2, **read_options)
+    result = aggregate_chunks(chunks, "grid", "day", agg_functions, cell_size=0.004)
+    expected = aggregate(ag.read_csv(temp_csv_file, **read_options), "grid", "day", agg_functions, cell_size=0.004)
+    
+    pd.testing.assert_frame_equal(
+        pd.DataFrame(result.drop(columns="geometry")),
+        pd.DataFrame(expected.drop(columns="geometry")),
+        check_dtype=False
+    )
+
+
+def test_aggregate_mergeable_string_columns(sample_indexed_data):
+    """
+    Test that counts, minima and maxima of string columns work in every mergeable path.
+    """
+    data = sample_indexed_data.copy()
+    # The first chunk has no device at all
+    data["device"] = pd.array([None, None, "c", "a", "b"], dtype="string")
+    agg_functions = {"device": "count", "id": "max", "value": "sum"}
+    extremes = {"device": "max"}
+    expected = aggregate(data, "grid", "day", agg_functions, cell_size=1.0)
+    expected_extremes = aggregate(data, "grid", "day", extremes, cell_size=1.0)
+
+    runs = [
+        lambda functions: aggregate_chunks([data.iloc[:2], data.iloc[2:]], "grid", "day", functions, cell_size=1.0),
+        lambda functions: aggregate(data, "grid", "day", functions, n_jobs=2, cell_size=1.0),
+        lambda functions: aggregate(data, "grid", "day", functions, apportion=True, cell_size=1.0),
+        lambda functions: aggregate_lattice(data, [("grid", {"cell_size": 1.0})], ["day"], functions)[
+            ("grid(cell_size=1.0)", "day")
+        ],
+    ]
+    for run in runs:
+        for functions, reference in [(agg_functions, expected), (extremes, expected_extremes)]:
+            pd.testing.assert_frame_equal(
+                pd.DataFrame(run(functions).drop(columns="geometry")),
+                pd.DataFrame(reference.drop(columns="geometry")),
+                check_dtype=False
+            )
+
+    rolling = aggregate_rolling(data, "grid", 2, "day", extremes, cell_size=1.0)
+    assert rolling["device"].tolist() == ["c", "c"]
+
+
+def test_aggregate_chunks_rejects_median(sample_indexed_data):
+    """
+    Test that non-decomposable functions are rejected before reading chunks.
+    """
+    with pytest.raises(ValueError, match="median"):
+        aggregate_chunks([sample_indexed_data], "grid", "day", {"value": "median"}, cell_size=0.004)
+
+
+def test_aggregate_apportion(sample_indexed_data):
+    """
+    Test that apportioning splits intervals across periods by overlap duration.
+    """
+    data = gpd.GeoDataFrame({
+        "value": [50.0],
+        "geometry": [Point(-74.006, 40.712)],
+        "time_start": pd.to_datetime(["2023-01-20"]),
+        "time_end": pd.to_datetime(["2023-03-11"]),
+    }, crs="EPSG:4326")
+    result = aggregate(data, "grid", "month", {"value": "sum", "count": "size"}, apportion=True, cell_size=0.01)
+    # 12 days in January, 28 in February and 10 in March
+    np.testing.assert_allclose(result["value"], [12.0, 28.0, 10.0])
+    np.testing.assert_allclose(result["count"], [12 / 50, 28 / 50, 10 / 50])
+
+    # Rows without a duration fall in the period of their time_start
+    agg_functions = {"value": "mean", "id": "max", "count": "size"}
+    expected = aggregate(sample_indexed_data, "grid", "day", agg_functions, cell_size=0.004)
+    result = aggregate(sample_indexed_data, "grid", "day", agg_functions, apportion=True, cell_size=0.004)
+    pd.testing.assert_frame_equal(
+        pd.DataFrame(result.drop(columns="geometry")),
+        pd.DataFrame(expected.drop(columns="geometry")),
+        check_dtype=False
+    )
+
+    # Fractional weights have no sample variance
+    with pytest.raises(ValueError, match="std or var"):
+        aggregate(data, "grid", "month", {"value": "std"}, apportion=True, cell_size=0.01)
+
+
+def test_aggregate_quantiles(sample_indexed_data):
+    """
+    Test that quantile functions are exact in one pass and mergeable across chunks.
+    """
+    agg_functions = {"value": "p50", "id": "quantile(0.9)", "count": "size"}
+    expected = aggregate(sample_indexed_data, "grid", "day", agg_functions, cell_size=1.0)
+    assert expected["value"].tolist() == [15.0, 27.5]
+    np.testing.assert_allclose(expected["id"], [2.8, 4.9])
+    
+    # Digests of a few values are exact, so merged partial aggregates match
+    chunks = aggregate_chunks(
+        [sample_indexed_data.iloc[:2], sample_indexed_data.iloc[2:]], "grid", "day", agg_functions, cell_size=1.0
+    )
+    parallel = aggregate(sample_indexed_data, "grid", "day", agg_functions, n_jobs=2, cell_size=1.0)
+    for result in [chunks, parallel]:
+        pd.testing.assert_frame_equal(
+            pd.DataFrame(result.drop(columns="geometry")),
+            pd.DataFrame(expected.drop(columns="geometry")),
+            check_dtype=False
+        )
+
+
+def test_aggregate_approx_nunique(sample_indexed_data):
+    """
+    Test that distinct counts merge across chunks and the day to month rollup.
+    """
+    agg_functions = {"id": "approx_nunique"}
+    expected = aggregate(sample_indexed_data, "grid", "day", agg_functions, cell_size=1.0)
+    assert expected["id"].tolist() == [3.0, 2.0]
+    
+    # The row shared by both chunks is counted once
+    chunks = aggregate_chunks(
+        [sample_indexed_data.iloc[:2], sample_indexed_data.iloc[1:]], "grid", "day", agg_functions, cell_size=1.0
+    )
+    parallel = aggregate(sample_indexed_data, "grid", "day", agg_functions, n_jobs=2, cell_size=1.0)
+    for result in [chunks, parallel]:
+        pd.testing.assert_frame_equal(
+            pd.DataFrame(result.drop(columns="geometry")),
+            pd.DataFrame(expected.drop(columns="geometry")),
+            check_dtype=False
+        )
+    
+    # Registers merged from days count a repeated id once per month
+    lattice = aggregate_lattice(sample_indexed_data, [("grid", {"cell_size": 1.0})], ["day", "month"], agg_functions)
+    assert lattice[("grid(cell_size=1.0)", "month")]["id"].tolist() == [5.0]
+
+
+def test_aggregate_lattice_matches_aggregate(sample_indexed_data):
+    """
+    Test that every level of a lattice matches a direct aggregation.
+    """
+    agg_functions = {"value": "mean", "id": "max", "count": "size"}
+    spatial_levels = [("grid", {"cell_size": 0.002}), ("grid", {"cell_size": 0.004})]
+    temporal_levels = ["day", "week", "month", "year"]
+    
+    lattice = aggregate_lattice(sample_indexed_data, spatial_levels, temporal_levels, agg_functions)
+    
+    assert len(lattice) == 8
+    for (label, temporal_granularity), result in lattice.items():
+        cell_size = 0.002 if label == "grid(cell_size=0.002)" else 0.004
+        expected = aggregate(
+            sample_indexed_data, "grid", temporal_granularity, agg_functions, cell_size=cell_size
+        )
+        pd.testing.assert_frame_equal(
+            pd.DataFrame(result.drop(columns="geometry")),
+            pd.DataFrame(expected.drop(columns="geometry")),
+            check_dtype=False
+        )
+        assert result.geometry.geom_equals(expected.geometry).all()
+
+
+def test_aggregate_lattice_rejects_unmergeable(sample_indexed_data):
+    """
+    Test that functions without mergeable partials are rejected.
+    """
+    with pytest.raises(ValueError):
+        aggregate_lattice(sample_indexed_data, ["grid"], ["day"], {"value": "median"})
+
+
+def test_aggregate_rolling(sample_indexed_data):
+    """
+    Test trailing windows of days per grid cell.
+    """
+    agg_functions = {"value": "sum", "id": "max", "count": "size"}
+    result = aggregate_rolling(sample_indexed_data, "grid", [1, 2], "day", agg_functions, cell_size=1.0)
+    
+    # One-day windows are the daily aggregates
+    daily = result[result["window"] == 1].drop(columns="window").reset_index(drop=True)
+    expected = aggregate(sample_indexed_data, "grid", "day", agg_functions, cell_size=1.0)
+    pd.testing.assert_frame_equal(
+        pd.DataFrame(daily.drop(columns="geometry")),
+        pd.DataFrame(expected.drop(columns="geometry")),
+        check_dtype=False
+    )
+    
+    # The two-day window ending on the 16th covers both days
+    trailing = result[result["window"] == 2]
+    assert trailing["temporal_group"].tolist() == ["2023-01-15", "2023-01-16"]
+    assert trailing["value"].tolist() == [45, 100]
+    assert trailing["id"].tolist() == [3, 5]
+    assert trailing["count"].tolist() == [3, 5]
+
+
 def test_evaluate_consistency(sample_indexed_data):
     """
     Test consistency evaluation.
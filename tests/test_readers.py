@@ -9,7 +9,7 @@ import numpy as np
 import os
 
 import aggrada as ag
-from aggrada.readers import read_csv, read_excel, read_shapefile, read_json
+from aggrada.readers import read_csv, read_excel, read_shapefile, read_json, read_parquet, to_parquet, read_many
 
 
 def test_read_csv(temp_csv_file):
@@ -40,6 +40,83 @@ def test_read_csv(temp_csv_file):
     assert "time_end" in indexed_data.columns
 
 
+def test_scan_csv_pushdown(temp_csv_file):
+    """
+    Test that a lazy CSV query reads only the needed columns and rows.
+    """
+    plan = (
+        ag.scan_csv(temp_csv_file)
+        .index(["latitude", "longitude"], "timestamp")
+        .filter(time_range=("2023-01-15T08:30:00", None), bbox=(-74.011, 40.70, -74.0, 40.72))
+        .aggregate("grid", "day", {"value": "sum", "count": "size"}, cell_size=0.01)
+    )
+    
+    # Nothing is read until collect(); "id" is never read
+    assert plan.required_columns() == ["latitude", "longitude", "timestamp", "value"]
+    assert "streaming" in plan.explain()
+    
+    indexed = (
+        ag.scan_csv(temp_csv_file)
+        .select(["value"])
+        .index(["latitude", "longitude"], "timestamp")
+        .filter(time_range=("2023-01-15T08:30:00", None), bbox=(-74.011, 40.70, -74.0, 40.72))
+    )
+    result = indexed.collect(chunksize=2)
+    assert "id" not in result.columns
+    # Only the row at 10:00 (-74.008, 40.710) is after 08:30 and inside the box
+    assert result["value"].tolist() == [20]
+    assert isinstance(result, gpd.GeoDataFrame)
+
+
+def test_scan_csv_aggregate_matches_eager(temp_csv_file):
+    """
+    Test that a lazy aggregation matches reading, indexing and aggregating eagerly.
+    """
+    agg_functions = {"value": "mean", "count": "size"}
+    plan = (
+        ag.scan_csv(temp_csv_file)
+        .index(["latitude", "longitude"], "timestamp")
+        .aggregate("grid", "day", agg_functions, cell_size=0.004)
+    )
+    data = read_csv(temp_csv_file, ["latitude", "longitude"], "timestamp", index_data=True)
+    expected = ag.aggregate(data, "grid", "day", agg_functions, cell_size=0.004)
+    
+    for result in [plan.collect(), plan.collect(chunksize=2)]:
+        pd.testing.assert_frame_equal(
+            pd.DataFrame(result.drop(columns="geometry")),
+            pd.DataFrame(expected.drop(columns="geometry")),
+            check_dtype=False
+        )
+
+
+def test_read_csv_bbox_empty_chunks(tmp_path):
+    """
+    Test that chunks without rows inside the bbox are skipped instead of failing.
+    """
+    path = str(tmp_path / "points.csv")
+    pd.DataFrame({
+        "latitude": [10.0, 10.1, 40.712, 40.714],
+        "longitude": [10.0, 10.1, -74.006, -74.012],
+        "timestamp": ["2023-01-15T08:00:00"] * 4,
+        "value": [1, 2, 3, 4]
+    }).to_csv(path, index=False)
+    options = dict(spatial_columns=["latitude", "longitude"], temporal_columns="timestamp", index_data=True)
+    bbox = (-74.02, 40.70, -74.0, 40.72)
+    
+    # The first chunk of two rows has nothing inside the box
+    chunks = list(read_csv(path, chunksize=2, bbox=bbox, **options))
+    assert [chunk["value"].tolist() for chunk in chunks] == [[3, 4]]
+    assert read_csv(path, bbox=bbox, **options)["value"].tolist() == [3, 4]
+    assert ag.scan_csv(path).index(["latitude", "longitude"], "timestamp").filter(bbox=bbox) \
+        .collect(chunksize=2)["value"].tolist() == [3, 4]
+    
+    # No row at all inside the box gives an empty indexed frame
+    empty = read_csv(path, bbox=(0, 0, 1, 1), **options)
+    assert isinstance(empty, gpd.GeoDataFrame)
+    assert len(empty) == 0
+    assert {"geometry", "time_start", "time_end"} <= set(empty.columns)
+
+
 def test_read_excel(temp_excel_file):
     """
     Test reading data from an Excel file.
@@ -126,3 +203,120 @@ def test_read_json(tmp_path):
     assert "geometry" in indexed_data.columns
     assert "time_start" in indexed_data.columns
     assert "time_end" in indexed_data.columns
+
+
+def test_read_json_chunks(sample_geo_data, tmp_path):
+    """
+    Test reading GeoJSON and newline-delimited JSON in chunks.
+    """
+    # FeatureCollection, streamed feature by feature
+    geojson_path = os.path.join(tmp_path, "test.geojson")
+    sample_geo_data.to_file(geojson_path, driver="GeoJSON")
+    expected = read_json(geojson_path)
+    chunks = list(read_json(geojson_path, chunksize=2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    streamed = pd.concat(chunks)
+    assert isinstance(streamed, gpd.GeoDataFrame)
+    assert streamed.crs == expected.crs
+    assert streamed.geometry.geom_equals(expected.geometry).all()
+    assert streamed["value"].tolist() == expected["value"].tolist()
+
+    # Newline-delimited records, indexed and aggregated chunk by chunk
+    lines_path = os.path.join(tmp_path, "test.ndjson")
+    records = pd.DataFrame({
+        "latitude": [40.712, 40.714, 40.710, 40.716, 40.718],
+        "longitude": [-74.006, -74.012, -74.008, -74.010, -74.004],
+        "timestamp": [f"2023-01-{day}T08:00:00" for day in [15, 15, 16, 16, 17]],
+        "value": [10, 15, 20, 25, 30]
+    })
+    records.to_json(lines_path, orient="records", lines=True)
+    options = dict(spatial_columns=["latitude", "longitude"], temporal_columns="timestamp", index_data=True)
+    expected = ag.aggregate(read_json(lines_path, **options), "grid", "day", {"value": "mean"}, cell_size=0.004)
+
+    for n_jobs in [None, 2]:
+        chunks = read_json(lines_path, chunksize=2, n_jobs=n_jobs, **options)
+        result = ag.aggregate_chunks(chunks, "grid", "day", {"value": "mean"}, cell_size=0.004)
+        pd.testing.assert_frame_equal(
+            pd.DataFrame(result.drop(columns="geometry")),
+            pd.DataFrame(expected.drop(columns="geometry")),
+            check_dtype=False
+        )
+
+
+def test_read_many(sample_geo_data, tmp_path):
+    """
+    Test reading and indexing several heterogeneous sources into one GeoDataFrame.
+    """
+    for day in [15, 16]:
+        pd.DataFrame({
+            "latitude": [40.712, 40.714],
+            "longitude": [-74.006, -74.012],
+            "timestamp": [f"2023-01-{day}T08:00:00", f"2023-01-{day}T09:00:00"],
+            "value": [10, 15]
+        }).to_csv(os.path.join(tmp_path, f"day_{day}.csv"), index=False)
+    shapefile_path = os.path.join(tmp_path, "extra.shp")
+    sample_geo_data.to_crs("EPSG:3857").to_file(shapefile_path)
+    sources = [
+        os.path.join(tmp_path, "day_*.csv"),
+        {"path": shapefile_path, "name": "extra", "temporal_columns": "timestamp"},
+    ]
+
+    serial = read_many(sources, ["latitude", "longitude"], "timestamp", n_jobs=1)
+    parallel = read_many(sources, ["latitude", "longitude"], "timestamp", n_jobs=2)
+
+    assert isinstance(serial, gpd.GeoDataFrame)
+    assert serial.crs == "EPSG:4326"
+    assert len(serial) == 2 + 2 + len(sample_geo_data)
+    assert serial["source"].dtype == "category"
+    assert serial["source"].cat.categories.tolist() == ["day_15.csv", "day_16.csv", "extra"]
+    assert serial["id"].isna().sum() == 4
+    assert serial.geometry.x.between(-74.02, -74.0).all()
+    pd.testing.assert_frame_equal(pd.DataFrame(serial), pd.DataFrame(parallel))
+
+
+def test_parquet_round_trip(sample_indexed_data, tmp_path):
+    """
+    Test writing indexed data to GeoParquet and reading it back with filters.
+    """
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "indexed.parquet")
+    to_parquet(sample_indexed_data, path, row_group_size=2)
+    
+    data = read_parquet(path)
+    assert isinstance(data, gpd.GeoDataFrame)
+    assert len(data) == len(sample_indexed_data)
+    assert data.crs == sample_indexed_data.crs
+    assert data["time_start"].dtype == sample_indexed_data["time_start"].dtype
+    assert "bbox" not in data.columns
+    
+    # Projection keeps the indexed columns; filters keep the matching rows
+    day = read_parquet(path, columns=["value"], time_range=("2023-01-16", "2023-01-17"))
+    assert list(day.columns) == ["value", "geometry", "time_start", "time_end"]
+    assert sorted(day["value"]) == [25, 30]
+    
+    box = read_parquet(path, bbox=(-74.0065, 40.7115, -74.0035, 40.7185))
+    assert sorted(box["value"]) == [10, 25]
+
+
+def test_dataset_store_append_and_query(sample_indexed_data, tmp_path):
+    """
+    Test that a partitioned store only opens the partitions a query needs.
+    """
+    pytest.importorskip("pyarrow")
+    store = ag.DatasetStore(str(tmp_path / "store"), temporal_granularity="day", tile_size=0.005)
+    
+    store.append(sample_indexed_data.iloc[:3])
+    store.append(sample_indexed_data.iloc[3:])
+    partitions = store.partitions()
+    assert all(os.path.relpath(p, store.root).startswith("year=2023") for p in partitions)
+    assert any(p.endswith(os.path.join("month=01", "day=16", "tile=-14801_8143")) for p in partitions)
+    
+    # One day only opens that day's partitions
+    day = ("2023-01-16", "2023-01-17")
+    assert all("day=16" in p for p in store.partitions(time_range=day))
+    result = store.query(time_range=day, columns=["value"])
+    assert sorted(result["value"]) == [25, 30]
+    
+    result = ag.DatasetStore.open(store.root).query(bbox=(-74.0065, 40.7115, -74.0035, 40.7185))
+    assert sorted(result["value"]) == [10, 25]
+    assert len(store.query()) == len(sample_indexed_data)
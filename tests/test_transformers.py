@@ -10,7 +10,7 @@ from shapely.geometry import Point, Polygon
 
 import aggrada as ag
 from aggrada.transformers.spatial import create_geometry
-from aggrada.transformers.temporal import create_temporal_range
+from aggrada.transformers.temporal import create_temporal_range, parse_times
 from aggrada.transformers.flatten import flatten_object, flatten_dataframe
 
 
@@ -30,6 +30,55 @@ def test_create_geometry_point(sample_point_data):
     assert all(isinstance(geom, Point) for geom in gdf.geometry)
 
 
+def test_create_geometry_point_from_string_pairs():
+    """
+    Test creating point geometry from "lat,lon" strings.
+    """
+    data = pd.DataFrame({
+        "id": [1, 2],
+        "location": ["40.712,-74.006", "40.714, -74.012"]
+    })
+    
+    gdf = create_geometry(data, spatial_column="location", spatial_type="point")
+    
+    assert isinstance(gdf, gpd.GeoDataFrame)
+    assert gdf.geometry.x.tolist() == [-74.006, -74.012]
+    assert gdf.geometry.y.tolist() == [40.712, 40.714]
+
+
+def test_create_geometry_point_from_malformed_string_pairs():
+    """
+    Test that strings without exactly two numeric parts are reported and left empty.
+    """
+    data = pd.DataFrame({
+        "location": ["40.712,-74.006", '40.7"14,-74.012', "3,4,5", "40.710,-74.008"],
+        "timestamp": ["2023-01-15T10:00:00"] * 4
+    })
+    
+    with pytest.warns(UserWarning, match="2 of 4 rows"):
+        gdf = create_geometry(data, spatial_column="location", spatial_type="point")
+    assert gdf.geometry.isna().tolist() == [False, True, True, False]
+    
+    with pytest.warns(UserWarning, match="2 of 4 rows"):
+        indexed = ag.index(data, spatial_column="location", temporal_column="timestamp", spatial_type="point")
+    assert indexed.geometry.isna().tolist() == [False, True, True, False]
+
+
+def test_create_geometry_point_invalid_coordinates():
+    """
+    Test that missing and invalid coordinates are reported and left empty.
+    """
+    data = pd.DataFrame({
+        "latitude": [40.712, np.nan, 95.0, 40.710],
+        "longitude": [-74.006, -74.012, -74.008, -74.008]
+    })
+    
+    with pytest.warns(UserWarning, match="2 of 4 rows"):
+        gdf = create_geometry(data, spatial_column=["latitude", "longitude"], spatial_type="point")
+    
+    assert gdf.geometry.isna().tolist() == [False, True, True, False]
+
+
 def test_create_geometry_polygon():
     """
     Test creating polygon geometry from WKT.
@@ -109,6 +158,27 @@ def test_create_temporal_range_two_columns():
     assert (df["time_start"] < df["time_end"]).all()
 
 
+def test_parse_times():
+    """
+    Test parsing repeated times with an inferred format and epoch timestamps.
+    """
+    # Day-first dates, repeated; the first one is also valid month-first
+    values = pd.Series(["05/03/2023 10:00", "25/03/2023 11:30", None, "05/03/2023 10:00"] * 3)
+    times = parse_times(values)
+    expected = pd.to_datetime(values, format="%d/%m/%Y %H:%M")
+    pd.testing.assert_series_equal(times, expected, check_dtype=False)
+
+    # Epoch seconds and milliseconds, with a missing value
+    seconds = pd.Series([1673769600, 1673773200])
+    milliseconds = pd.Series([1673769600000.0, np.nan])
+    assert parse_times(seconds, "timestamp").tolist() == [
+        pd.Timestamp("2023-01-15 08:00:00"), pd.Timestamp("2023-01-15 09:00:00")
+    ]
+    parsed = parse_times(milliseconds, "timestamp")
+    assert parsed.iloc[0] == pd.Timestamp("2023-01-15 08:00:00")
+    assert pd.isna(parsed.iloc[1])
+
+
 def test_flatten_object():
     """
     Test flattening a nested dictionary.
@@ -158,3 +228,41 @@ def test_flatten_dataframe():
     assert flattened_df["info_name"].tolist() == ["A", "B"]
     assert flattened_df["info_value"].tolist() == [10, 20]
     assert flattened_df["info_details_status"].tolist() == ["ok", "error"]
+
+
+def test_flatten_dataframe_mixed_structures():
+    """
+    Test that records with another structure than the sampled one are flattened too.
+    """
+    data = pd.DataFrame({
+        "info": [
+            {"name": "A", "details": {"status": "ok"}},
+            {"name": "B", "details": {"status": "error", "code": 2}},
+            None,
+            {"details": {"status": "ok"}, "name": "D"}
+        ]
+    }, index=[10, 11, 12, 13])
+
+    flattened_df = flatten_dataframe(data, columns="info", sample_size=1)
+
+    assert flattened_df.columns.tolist() == ["info_name", "info_details_status", "info_details_code"]
+    assert flattened_df.index.tolist() == [10, 11, 12, 13]
+    assert flattened_df["info_name"].tolist()[:2] + flattened_df["info_name"].tolist()[3:] == ["A", "B", "D"]
+    assert flattened_df["info_details_status"].isna().tolist() == [False, False, True, False]
+    assert flattened_df["info_details_code"].tolist()[1] == 2
+
+
+def test_flatten_dataframe_non_literal_keys():
+    """
+    Test that keys of any hashable type are flattened, not only string keys.
+    """
+    import datetime
+    day = datetime.date(2020, 1, 1)
+    nan = float("nan")
+    data = pd.DataFrame({"obj": [{day: 1, nan: {"a": 2}}, {day: 3, nan: {"a": 4}}]})
+
+    flattened_df = flatten_dataframe(data, columns="obj")
+
+    assert flattened_df.columns.tolist() == ["obj_2020-01-01", "obj_nan_a"]
+    assert flattened_df["obj_2020-01-01"].tolist() == [1, 3]
+    assert flattened_df["obj_nan_a"].tolist() == [2, 4]
@@ -148,3 +148,64 @@ def test_plot_data_auto(sample_indexed_data):
         assert isinstance(fig, plt.Figure)
     finally:
         plt.close("all")
+
+
+def test_result_cache_hits_and_invalidation(sample_indexed_data, temp_csv_file, tmp_path):
+    """
+    Test that repeated calls are served from the cache until their input changes.
+    """
+    pytest.importorskip("pyarrow")
+    cache = ag.set_cache(str(tmp_path / "cache"))
+    try:
+        agg_functions = {"value": "mean", "count": "size"}
+        first = ag.aggregate(sample_indexed_data, "grid", "day", agg_functions, cell_size=0.004)
+        # n_jobs does not change the result, so it does not change the key
+        second = ag.aggregate(sample_indexed_data, "grid", "day", agg_functions, n_jobs=2, cell_size=0.004)
+        assert cache.stats()["hits"] == 1
+        pd.testing.assert_frame_equal(pd.DataFrame(first), pd.DataFrame(second))
+        assert second.crs == first.crs
+        
+        # Changed values or parameters miss
+        changed = sample_indexed_data.copy()
+        changed.loc[0, "value"] = 11
+        ag.aggregate(changed, "grid", "day", agg_functions, cell_size=0.004)
+        ag.aggregate(sample_indexed_data, "grid", "month", agg_functions, cell_size=0.004)
+        assert cache.stats()["misses"] == 3
+        
+        # Files are keyed by path, modification time and size
+        read = ag.read_csv(temp_csv_file, ["latitude", "longitude"], "timestamp", index_data=True)
+        pd.testing.assert_frame_equal(
+            ag.read_csv(temp_csv_file, ["latitude", "longitude"], "timestamp", index_data=True), read
+        )
+        assert cache.stats()["hits"] == 2
+        with open(temp_csv_file, "a") as f:
+            f.write("6,40.719,-74.003,2023-01-17T08:00:00,35\n")
+        assert len(ag.read_csv(temp_csv_file, ["latitude", "longitude"], "timestamp", index_data=True)) == 4
+    finally:
+        ag.set_cache(None)
+
+
+def test_result_cache_lru_eviction(sample_indexed_data, tmp_path):
+    """
+    Test that the least recently used results are evicted over the size cap.
+    """
+    pytest.importorskip("pyarrow")
+    cache = ag.set_cache(str(tmp_path / "cache"))
+    try:
+        days = [sample_indexed_data.iloc[:3], sample_indexed_data.iloc[3:]]
+        ag.aggregate(days[0], "grid", "day", {"value": "sum"}, cell_size=0.004)
+        size = cache.stats()["bytes"]
+        cache.max_bytes = int(size * 2.5)
+        
+        ag.aggregate(days[1], "grid", "day", {"value": "sum"}, cell_size=0.004)
+        # Reading the first result makes the second the least recently used
+        ag.aggregate(days[0], "grid", "day", {"value": "sum"}, cell_size=0.004)
+        ag.aggregate(sample_indexed_data, "grid", "day", {"value": "sum"}, cell_size=0.004)
+        
+        assert cache.stats()["evictions"] == 1
+        ag.aggregate(days[0], "grid", "day", {"value": "sum"}, cell_size=0.004)
+        ag.aggregate(days[1], "grid", "day", {"value": "sum"}, cell_size=0.004)
+        assert cache.stats()["hits"] == 2
+        assert cache.stats()["misses"] == 4
+    finally:
+        ag.set_cache(None)